@@ -0,0 +1,93 @@
+"""
+Detail and history read latency of one ASGI server process while heavy
+simulations are being created.
+
+Drives the ASGI application in-process with `AsyncClient`: `--creates`
+Lorenz runs of `--steps` points are posted at once, and while they run
+`--readers` clients keep fetching a stored simulation and the history.
+Reports the read latencies and how long the creates took; `--creates 0`
+gives the idle baseline.
+
+    python benchmarks/concurrent_reads.py --creates 4 --steps 1000000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from asgiref.sync import async_to_sync  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import AsyncClient  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from simulations import physics, storage  # noqa: E402
+from simulations.models import Simulation  # noqa: E402
+
+
+async def run(user, stored, args):
+    client = AsyncClient()
+    await client.aforce_login(user)
+    detail = reverse("simulation-detail", args=[stored.pk])
+    history = reverse("simulation-history")
+    latencies = []
+
+    async def create(rho):
+        data = {
+            "model": "lorenz", "steps": args.steps,
+            "params": {"sigma": 10, "rho": rho, "beta": 8 / 3, "initial": [1, 1, 1]},
+        }
+        response = await client.post(reverse("simulation-create"), data, content_type="application/json")
+        assert response.status_code == 201, response.content
+
+    async def read(until):
+        while not until.done():
+            for url in (detail, history):
+                started = time.perf_counter()
+                await client.get(url)
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    creates = asyncio.gather(*(create(28 + i) for i in range(args.creates)))
+    if not args.creates:
+        creates = asyncio.ensure_future(asyncio.sleep(2))
+    await asyncio.gather(creates, *(read(creates) for _ in range(args.readers)))
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--creates", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=1000000)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+    user = User.objects.create_user(username="bench")
+    columns = physics.lorenz_attractor(1, 1, 1, steps=1000)["columns"]
+    stored = Simulation.objects.create(
+        user=user, model_type="lorenz", input_params={}, **storage.pack_results({**columns, "color": "#0000ff"}),
+    )
+
+    elapsed, latencies = async_to_sync(run)(user, stored, args)
+    latencies.sort()
+    print(f"{args.creates} creates of {args.steps} steps, {args.readers} readers: {elapsed:.2f} s")
+    print(f"reads {len(latencies):>6}  median {statistics.median(latencies) * 1000:>7.1f} ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:>7.1f} ms  max {latencies[-1] * 1000:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
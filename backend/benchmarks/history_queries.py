@@ -0,0 +1,104 @@
+"""
+History listing cost for a user with many stored runs.
+
+Seeds a throwaway test database with `--rows` simulations for one user (each
+with a real packed trajectory) and times:
+
+    legacy     the former view: every row with all columns, unpaginated
+    paginated  GET /api/simulations/history/ (first cursor page)
+    filtered   the same with ?model_type=henon&is_stable=true
+
+    python benchmarks/history_queries.py --rows 10000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from simulations import physics, storage  # noqa: E402
+from simulations.models import Simulation  # noqa: E402
+from simulations.serializers import SimulationHistorySerializer  # noqa: E402
+
+
+def seed(rows, steps):
+    user = User.objects.create_user(username="bench")
+    packed = storage.pack_results({**physics.lorenz_attractor(1, 1, 1, steps=steps)["columns"], "color": "#0000ff"})
+    models = [choice for choice, _ in Simulation.ModelTypes.choices]
+    now = timezone.now()
+
+    simulations = [
+        Simulation(
+            user=user, model_type=models[i % len(models)], is_stable=bool(i % 2),
+            input_params={"model": models[i % len(models)], "steps": steps, "params": {"initial": [1, 1, 1]}},
+            **packed,
+        )
+        for i in range(rows)
+    ]
+    Simulation.objects.bulk_create(simulations, batch_size=500)
+    # auto_now_add gives every row the same timestamp; spread them out like real history.
+    for i, pk in enumerate(Simulation.objects.filter(user=user).values_list("pk", flat=True)):
+        Simulation.objects.filter(pk=pk).update(created_at=now - timedelta(minutes=i))
+    return user
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=200, help="trajectory length of every seeded row")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+    user = seed(args.rows, args.steps)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse("simulation-history")
+
+    def legacy():
+        queryset = Simulation.objects.filter(user=user).order_by("-created_at")
+        return len(SimulationHistorySerializer(queryset, many=True).data)
+
+    def paginated():
+        return len(client.get(url).json()["results"])
+
+    def filtered():
+        return len(client.get(url, {"model_type": "henon", "is_stable": "true"}).json()["results"])
+
+    print(f"{args.rows} rows of {args.steps}-step runs for one user")
+    for name, function in (("legacy", legacy), ("paginated", paginated), ("filtered", filtered)):
+        seconds, count = timed(function, args.repeat)
+        print(f"{name:<10} {seconds * 1000:>9.1f} ms  {count:>6} rows returned")
+
+    plan = Simulation.objects.filter(user=user).order_by("-created_at")[:50].explain()
+    print(f"query plan: {plan}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Timing suite for the physics kernels and the simulation API.
+
+Times `lorenz_attractor`, `henon_map` and `thomas_attractor` for every
+`--steps` size, then the create/history/detail endpoints end-to-end through
+the test client against a throwaway test database (request parsing,
+physics, packing, the DB write and serialization included; the result cache
+is disabled so every create computes).
+
+    python benchmarks/suite.py --save benchmarks/baseline.json
+    python benchmarks/suite.py --compare benchmarks/baseline.json --threshold 0.2
+
+`--compare` exits with status 1 when any benchmark's best time is more than
+`--threshold` (a fraction) slower than in the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from itertools import chain
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from simulations import physics  # noqa: E402
+
+KERNELS = {
+    "lorenz_attractor": (physics.lorenz_attractor, (1.0, 1.0, 1.0)),
+    "henon_map": (physics.henon_map, (0.1, 0.3)),
+    "thomas_attractor": (physics.thomas_attractor, (1.0, 1.0, 1.0)),
+}
+PAYLOADS = {
+    "lorenz": {"sigma": 10, "rho": 28, "beta": 8 / 3, "initial": [1, 1, 1]},
+    "henon": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.3]},
+    "thomas": {"b": 0.18, "initial": [1, 1, 1]},
+}
+
+
+def timed(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return {"best_ms": min(durations) * 1000, "median_ms": statistics.median(durations) * 1000, "repeat": repeat}
+
+
+def kernel_benchmarks(sizes):
+    for name, (function, initial) in KERNELS.items():
+        for steps in sizes:
+            yield f"physics.{name}[steps={steps}]", lambda function=function, initial=initial, steps=steps: (
+                function(*initial, steps=steps)
+            )
+
+
+def api_benchmarks(client, sizes):
+    create_url = reverse("simulation-create")
+    created = {}
+
+    for model, params in PAYLOADS.items():
+        for steps in sizes:
+            def create(model=model, params=params, steps=steps):
+                response = client.post(create_url, {"model": model, "steps": steps, "params": params}, format="json")
+                assert response.status_code == 201, response.content
+                created[model, steps] = response.json()["id"]
+
+            yield f"api.create[{model},steps={steps}]", create
+
+    yield "api.history", lambda: client.get(reverse("simulation-history")).json()
+
+    for model in PAYLOADS:
+        for steps in sizes:
+            url = reverse("simulation-detail", args=[created[model, steps]])
+            yield f"api.detail[{model},steps={steps}]", lambda url=url: client.get(url).json()
+            yield f"api.detail[{model},steps={steps},max_points=1000]", lambda url=url: (
+                client.get(url, {"max_points": 1000}).json()
+            )
+
+
+def run(sizes, repeat, only):
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(username="bench"))
+
+    results = {}
+    with override_settings(SIMULATION_RESULT_CACHE_MAX_BYTES=0):
+        # api_benchmarks is consumed lazily: detail URLs depend on the creates run before them.
+        for name, function in chain(kernel_benchmarks(sizes), api_benchmarks(client, sizes)):
+            if only and only not in name:
+                # Creates still run once: detail benchmarks read what they stored.
+                if name.startswith("api.create"):
+                    function()
+                continue
+            results[name] = timed(function, repeat)
+            print(f"{name:<50} {results[name]['best_ms']:>10.2f} ms  (median {results[name]['median_ms']:.2f})")
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'benchmark':<50} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<50} {'-':>10} {current['best_ms']:>8.2f}ms {'new':>8}")
+            continue
+        change = current["best_ms"] / previous["best_ms"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<50} {previous['best_ms']:>8.2f}ms {current['best_ms']:>8.2f}ms {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--save", type=Path, help="write the results to this JSON baseline file")
+    parser.add_argument("--compare", type=Path, help="JSON baseline to compare the results against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+
+    results = run(args.steps, args.repeat, args.only)
+
+    if args.save:
+        args.save.write_text(json.dumps({
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "django": django.get_version(),
+                "machine": platform.platform(),
+                "steps": args.steps,
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }, indent=2) + "\n")
+        print(f"\nsaved {len(results)} results to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nno regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
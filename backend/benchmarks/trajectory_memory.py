@@ -0,0 +1,85 @@
+"""
+Peak RSS of computing and serializing one Lorenz trajectory for storage.
+
+`legacy` reproduces the former engine (a list of tuples transposed with
+`zip`), `columnar` runs the current engine that writes into preallocated
+`array('d')` column buffers. Each mode runs in a fresh interpreter so the
+peaks do not mix.
+
+    python benchmarks/trajectory_memory.py --steps 1000000
+"""
+import argparse
+import json
+import math
+import resource
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from simulations import physics  # noqa: E402
+from simulations.encoders import TrajectoryJSONEncoder  # noqa: E402
+
+
+def legacy(steps):
+    x, y, z = 1.0, 1.0, 1.0
+    sigma, rho, beta, dt = 10.0, 28.0, 8 / 3, 0.01
+    result = []
+    for _ in range(steps):
+        dx = sigma * (y - x)
+        dy = x * (rho - z) - y
+        dz = x * y - beta * z
+        x += dx * dt
+        y += dy * dt
+        z += dz * dt
+        if any(abs(v) > physics.MAX_VALUE or math.isnan(v) for v in (x, y, z)):
+            break
+        result.append((x, y, z))
+
+    xs, ys, zs = map(list, zip(*result))
+    return json.dumps({"x": xs, "y": ys, "z": zs, "color": "#0000ff"})
+
+
+def columnar(steps):
+    result = physics.lorenz_attractor(1.0, 1.0, 1.0, steps=steps)
+    return json.dumps({**result["columns"], "color": "#0000ff"}, cls=TrajectoryJSONEncoder)
+
+
+MODES = {"legacy": legacy, "columnar": columnar}
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(mode, steps):
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode, "--steps", str(steps)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=1_000_000)
+    parser.add_argument("--child", choices=MODES)
+    args = parser.parse_args()
+
+    if args.child:
+        before = peak_rss_mb()
+        MODES[args.child](args.steps)
+        print(json.dumps({"baseline_mb": before, "peak_mb": peak_rss_mb()}))
+        return
+
+    print(f"Lorenz, {args.steps} steps")
+    print(f"{'mode':<10} {'peak RSS, MB':>14} {'above baseline, MB':>20}")
+    for mode in MODES:
+        stats = measure(mode, args.steps)
+        print(f"{mode:<10} {stats['peak_mb']:>14.1f} {stats['peak_mb'] - stats['baseline_mb']:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
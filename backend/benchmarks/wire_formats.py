@@ -0,0 +1,76 @@
+"""
+Size and latency of the detail response formats for one large trajectory.
+
+Stores a Lorenz run of `--steps` points in a throwaway test database and
+fetches GET /api/simulations/detail/<id>/ as:
+
+    json        the default JSON renderer, full float64 precision
+    json-p4     JSON with ?precision=4
+    binary-f32  the columnar binary format, float32 columns
+    binary-f64  the columnar binary format, float64 columns
+
+each with and without gzip, reporting the body size and the request time.
+
+    python benchmarks/wire_formats.py --steps 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from simulations import physics, storage  # noqa: E402
+from simulations.models import Simulation  # noqa: E402
+
+FORMATS = {
+    "json": ({}, {}),
+    "json-p4": ({"precision": 4}, {}),
+    "binary-f32": ({"dtype": "float32"}, {"HTTP_ACCEPT": "application/x-trajectory"}),
+    "binary-f64": ({"dtype": "float64"}, {"HTTP_ACCEPT": "application/x-trajectory"}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+    user = User.objects.create_user(username="bench")
+    columns = physics.lorenz_attractor(1, 1, 1, steps=args.steps)["columns"]
+    simulation = Simulation.objects.create(
+        user=user, model_type="lorenz", input_params={}, **storage.pack_results({**columns, "color": "#0000ff"}),
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse("simulation-detail", args=[simulation.pk])
+
+    print(f"Lorenz trajectory of {args.steps} points")
+    for name, (query, headers) in FORMATS.items():
+        for encoding in ("identity", "gzip"):
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                response = client.get(url, query, HTTP_ACCEPT_ENCODING=encoding, **headers)
+                best = min(best, time.perf_counter() - started)
+            print(f"{name:<11} {encoding:<9} {len(response.content) / 2 ** 20:>8.2f} MiB  {best * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
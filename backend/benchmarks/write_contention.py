@@ -0,0 +1,136 @@
+"""
+Concurrent `Simulation.objects.create` throughput per SQLite storage profile.
+
+For every profile in `DATABASE_PROFILES` a fresh interpreter migrates a
+temporary database file, then `--threads` threads each store `--creates`
+simulations carrying a packed `--steps`-point trajectory, the way request
+handlers do: a read and the insert in one transaction. Meanwhile `--readers`
+threads keep loading stored trajectories. Reports creates per second and
+the writes that failed (typically "database is locked").
+
+    python benchmarks/write_contention.py --threads 16 --readers 4 --creates 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def measure(profile, path, threads, readers, creates, steps):
+    os.environ["DATABASE_PROFILE"] = profile
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    from core import settings as project_settings
+
+    project_settings.DATABASES["default"]["NAME"] = path
+
+    import django
+
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection, transaction
+
+    from simulations import physics, storage
+    from simulations.models import Simulation
+
+    call_command("migrate", verbosity=0)
+    user = User.objects.create_user(username="bench")
+    packed = storage.pack_results({**physics.lorenz_attractor(1, 1, 1, steps=steps)["columns"], "color": "#0000ff"})
+    connection.close()
+
+    errors = []
+    barrier = threading.Barrier(threads + readers)
+    writing = threading.Event()
+    writing.set()
+
+    def writer():
+        barrier.wait()
+        for _ in range(creates):
+            try:
+                with transaction.atomic():
+                    Simulation.objects.filter(user=user).exists()
+                    Simulation.objects.create(user=user, model_type="lorenz", input_params={"steps": steps}, **packed)
+            except Exception as e:
+                errors.append(str(e))
+        connection.close()
+
+    def reader():
+        barrier.wait()
+        while writing.is_set():
+            try:
+                for simulation in Simulation.objects.order_by("-pk")[:5]:
+                    simulation.get_results()
+            except Exception:
+                pass
+        connection.close()
+
+    writers = [threading.Thread(target=writer) for _ in range(threads)]
+    background = [threading.Thread(target=reader) for _ in range(readers)]
+    for worker in background:
+        worker.start()
+    started = time.perf_counter()
+    for worker in writers:
+        worker.start()
+    for worker in writers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    writing.clear()
+    for worker in background:
+        worker.join()
+
+    stored = Simulation.objects.count()
+    return {
+        "profile": profile,
+        "stored": stored,
+        "failed": len(errors),
+        "creates_per_second": stored / elapsed,
+        "errors": sorted(set(errors))[:3],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--creates", type=int, default=50, help="creates per thread")
+    parser.add_argument("--steps", type=int, default=10000, help="trajectory length of every stored run")
+    parser.add_argument("--profile", help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(measure(args.profile, args.database, args.threads, args.readers, args.creates, args.steps)))
+        return
+
+    from core.settings import DATABASE_PROFILES
+
+    print(f"{args.threads} writers x {args.creates} creates of {args.steps}-step runs, {args.readers} readers")
+    for profile in DATABASE_PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            output = subprocess.run(
+                [
+                    sys.executable, __file__, "--profile", profile,
+                    "--database", str(Path(directory) / "bench.sqlite3"),
+                    "--threads", str(args.threads), "--readers", str(args.readers),
+                    "--creates", str(args.creates), "--steps", str(args.steps),
+                ],
+                check=True, capture_output=True, text=True, cwd=BACKEND_DIR,
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{profile:<11} {result['creates_per_second']:>8.1f} creates/s  "
+              f"{result['stored']:>5} stored  {result['failed']:>5} failed")
+        for error in result["errors"]:
+            print(f"{'':<11} {error}")
+
+
+if __name__ == "__main__":
+    main()
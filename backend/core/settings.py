@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -43,6 +44,8 @@ AUTHENTICATION_BACKENDS = [
 
 
 MIDDLEWARE = [
+    'simulations.middleware.ServerTimingMiddleware',
+    'simulations.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,6 +76,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 
 
@@ -108,10 +112,35 @@ CSRF_COOKIE_SAMESITE = 'Lax'
 
 
 
+# SQLite storage profiles, picked with the DATABASE_PROFILE environment variable.
+# "concurrent" lets parallel requests write without "database is locked": WAL readers
+# do not block the writer, writers queue on the busy timeout and take the write lock
+# up front (IMMEDIATE), and connections are reused between requests.
+DATABASE_PROFILES = {
+    'default': {},
+    'concurrent': {
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA cache_size=-65536;'
+                'PRAGMA temp_store=MEMORY;'
+                'PRAGMA mmap_size=268435456;'
+            ),
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'concurrent')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        **DATABASE_PROFILES[DATABASE_PROFILE],
     }
 }
 
@@ -144,4 +173,37 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Background simulation jobs: size of the local process pool, 0 runs jobs inline.
+SIMULATION_JOB_WORKERS = 2
+
+# Process pool for batch creates; 0 computes batches inline in the request.
+SIMULATION_BATCH_WORKERS = os.cpu_count() or 1
+
+# Threads the async views run physics in, at most this many runs at once per server process.
+SIMULATION_COMPUTE_THREADS = 4
+
+# Element type of stored trajectory columns: float64 keeps full precision, float32 halves the size.
+SIMULATION_RESULTS_DTYPE = "float64"
+
+# Browser cache lifetime of detail responses of runs that can no longer change; runs that can
+# still be extended are sent with `no-cache` and revalidated by their ETag.
+SIMULATION_DETAIL_MAX_AGE = 365 * 24 * 3600
+
+# Shared cache of computed trajectories, evicted least-recently-used above this size; 0 disables it.
+SIMULATION_RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Admission control (see `simulations.admission`); costs are estimated CPU seconds.
+# Largest run served within a request; larger ones must be submitted as jobs, up to the job limit.
+SIMULATION_MAX_REQUEST_SECONDS = 20
+SIMULATION_MAX_JOB_SECONDS = 600
+SIMULATION_MAX_MEMORY_BYTES = 1024 * 1024 * 1024
+# Wall-clock budget after which a run is stopped.
+SIMULATION_REQUEST_TIMEOUT = 60
+SIMULATION_JOB_TIMEOUT = 1800
+# Per user: runs in flight (requests and unfinished jobs) and CPU seconds per rolling window.
+SIMULATION_USER_CONCURRENCY = 4
+SIMULATION_USER_QUOTA_SECONDS = 3600
+SIMULATION_USER_QUOTA_WINDOW = 3600
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Simulation
+from .models import ChaosMap, ComputeCharge, Simulation, SimulationJob, ResultCacheEntry
 
 
 @admin.register(Simulation)
@@ -7,4 +7,34 @@ class SimulationAdmin(admin.ModelAdmin):
     list_display = ('user', 'model_type', 'created_at', 'is_stable')
     list_filter = ('model_type', 'user', 'is_stable', 'created_at')
     search_fields = ('user__username', 'model_type')
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    readonly_fields = ('created_at',)
+
+
+@admin.register(SimulationJob)
+class SimulationJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'status', 'progress', 'created_at', 'finished_at')
+    list_filter = ('status', 'user', 'created_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+
+@admin.register(ResultCacheEntry)
+class ResultCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'size', 'hits', 'created_at', 'last_used_at')
+    search_fields = ('key',)
+    readonly_fields = ('created_at', 'last_used_at')
+
+
+@admin.register(ComputeCharge)
+class ComputeChargeAdmin(admin.ModelAdmin):
+    list_display = ('user', 'seconds', 'created_at', 'finished_at')
+    list_filter = ('user', 'created_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('created_at', 'finished_at')
+
+
+@admin.register(ChaosMap)
+class ChaosMapAdmin(admin.ModelAdmin):
+    list_display = ('model_type', 'x_parameter', 'y_parameter', 'resolution', 'status', 'created_at', 'finished_at')
+    list_filter = ('model_type', 'status', 'created_at')
+    readonly_fields = ('created_at', 'finished_at')
@@ -0,0 +1,222 @@
+"""
+Admission control for simulation runs.
+
+Every run is priced before it starts: `Cost` estimates its CPU seconds and
+peak memory from the number of steps, the state dimension and the
+integration method (for adaptive rk45, from the integrated time span and
+the tolerances). Runs above `SIMULATION_MAX_MEMORY_BYTES` are rejected;
+so are synchronous runs above `SIMULATION_MAX_REQUEST_SECONDS`, which can go
+through the job queue instead (up to `SIMULATION_MAX_JOB_SECONDS`).
+
+Admitted runs open a `ComputeCharge`. A user may have at most
+`SIMULATION_USER_CONCURRENCY` open charges and spend at most
+`SIMULATION_USER_QUOTA_SECONDS` per rolling `SIMULATION_USER_QUOTA_WINDOW`;
+closed charges count with the time the run really took, so cache hits are
+almost free. Runs with a progress hook are stopped by `deadline` once they
+exceed their wall-clock budget.
+"""
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.exceptions import Throttled, ValidationError
+
+from . import physics, registry
+from .models import ComputeCharge
+
+# Updates of one state variable per second: scalar kernels, vectorized NumPy kernels.
+SCALAR_RATE = 1e6
+VECTOR_RATE = 2e7
+# Cost of one step relative to Euler: measured for the scalar kernels, stage counts for NumPy ones.
+SCALAR_METHOD_COST = {"euler": 1, "rk4": 12, "rk45": 24}
+VECTOR_METHOD_COST = {"euler": 1, "rk4": 4}
+# rk45 internal steps per unit of model time at the default tolerances (the stiffest registered
+# system, Chen, needs about 80); they grow as tolerance ** -1/5, the order of the error estimate.
+RK45_STEPS_PER_TIME = 100
+# Peak bytes per stored value: the float64 columns plus the copies made while packing them.
+BYTES_PER_VALUE = 32
+
+
+class Cost(NamedTuple):
+    seconds: float
+    memory: int
+
+    def __add__(self, other):
+        return Cost(self.seconds + other.seconds, self.memory + other.memory)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def _method(system, params):
+    return "euler" if system.kind == registry.MAP else params.get("method", "euler")
+
+
+def _rk45_steps(system, params, steps):
+    """
+    Internal steps of an rk45 run: it adapts its step to the tolerances, not to
+    `dt`, so its work follows the integrated time span `steps * dt`.
+    """
+    span = steps * float(params.get("dt", system.dt))
+    rtol = float(params.get("rtol", physics.RTOL))
+    atol = float(params.get("atol", physics.ATOL))
+    tolerance = min(rtol, atol * physics.RTOL / physics.ATOL)
+    return max(steps, span * RK45_STEPS_PER_TIME * (physics.RTOL / tolerance) ** 0.2)
+
+
+def trajectory_cost(validated_data, steps=None):
+    """A single run (create, stream, job, batch item; `steps` overrides the payload's for extends)."""
+    system = registry.get(validated_data.get("model"))
+    params = validated_data.get("params", {})
+    steps = validated_data.get("steps") if steps is None else steps
+    updates = steps * system.dimension
+    method = _method(system, params)
+    work = _rk45_steps(system, params, steps) * system.dimension if method == "rk45" else updates
+    seconds = work * SCALAR_METHOD_COST[method] / SCALAR_RATE
+
+    density = validated_data.get("density")
+    if density:
+        # Only one chunk of points is alive at a time, next to the grid.
+        chunk = min(steps, physics.DENSITY_CHUNK_SIZE) * system.dimension
+        return Cost(seconds, chunk * BYTES_PER_VALUE + density["bins"] ** 2 * BYTES_PER_VALUE)
+    lyapunov = validated_data.get("lyapunov")
+    if lyapunov:
+        # Two runs, one stored point per renormalization.
+        return Cost(2 * seconds, 2 * (steps // lyapunov["interval"] + 1) * BYTES_PER_VALUE)
+    return Cost(seconds, updates * BYTES_PER_VALUE)
+
+
+def ensemble_cost(validated_data):
+    system = registry.get(validated_data.get("model"))
+    params = validated_data.get("params", {})
+    updates = len(params["initial"]) * validated_data.get("steps") * system.dimension
+    return Cost(updates * VECTOR_METHOD_COST[_method(system, params)] / VECTOR_RATE, updates * BYTES_PER_VALUE)
+
+
+def bifurcation_cost(validated_data):
+    system = registry.get(validated_data.get("model"))
+    resolution = validated_data["resolution"]
+    steps = validated_data["transient"] + validated_data["samples"]
+    seconds = resolution * steps * system.dimension * VECTOR_METHOD_COST[_method(system, validated_data["params"])]
+    return Cost(seconds / VECTOR_RATE, resolution * validated_data["samples"] * 2 * BYTES_PER_VALUE)
+
+
+def check(cost, limit):
+    """Rejects a run that is too large: above the memory cap or `limit` estimated CPU seconds."""
+    if cost.memory > settings.SIMULATION_MAX_MEMORY_BYTES:
+        raise ValidationError({"steps": (
+            f"The run needs about {cost.memory / 2 ** 20:.0f} MiB, "
+            f"the limit is {settings.SIMULATION_MAX_MEMORY_BYTES / 2 ** 20:.0f} MiB"
+        )})
+    if cost.seconds > limit:
+        message = f"The run is estimated at {cost.seconds:.0f} CPU seconds, the limit is {limit:g}"
+        if limit < settings.SIMULATION_MAX_JOB_SECONDS and cost.seconds <= settings.SIMULATION_MAX_JOB_SECONDS:
+            message += "; submit it as a background job instead"
+        raise ValidationError({"steps": message})
+
+
+def check_batch(cost, limit):
+    """
+    Rejects a batch whose items together are too large: its items queue in one
+    pool, so each fitting `limit` on its own would let a request take N times that.
+    """
+    if cost.seconds > limit or cost.memory > settings.SIMULATION_MAX_MEMORY_BYTES:
+        raise ValidationError({"simulations": (
+            f"The batch is estimated at {cost.seconds:.0f} CPU seconds and {cost.memory / 2 ** 20:.0f} MiB, "
+            f"the limits are {limit:g} s and {settings.SIMULATION_MAX_MEMORY_BYTES / 2 ** 20:.0f} MiB; "
+            "split it into smaller batches"
+        )})
+
+
+def admit(user, cost, limit=None, job=None):
+    """
+    Opens a `ComputeCharge` for `user`'s run, raising `Throttled` (429) if the user
+    already has too many runs in flight or the run does not fit in their quota.
+    """
+    if limit is not None:
+        check(cost, limit)
+
+    window = timezone.now() - timedelta(seconds=settings.SIMULATION_USER_QUOTA_WINDOW)
+    with transaction.atomic():
+        # Serializes admissions of the same user.
+        User.objects.select_for_update().filter(pk=user.pk).exists()
+        charges = ComputeCharge.objects.filter(user=user, created_at__gte=window)
+
+        if charges.filter(finished_at__isnull=True).count() >= settings.SIMULATION_USER_CONCURRENCY:
+            raise Throttled(detail=(
+                f"At most {settings.SIMULATION_USER_CONCURRENCY} simulations may run at once, "
+                "wait for one of them to finish"
+            ))
+
+        spent = charges.aggregate(total=Sum("seconds"))["total"] or 0.0
+        excess = spent + cost.seconds - settings.SIMULATION_USER_QUOTA_SECONDS
+        if excess > 0:
+            raise Throttled(wait=_quota_wait(charges, excess, window), detail=(
+                f"Compute quota of {settings.SIMULATION_USER_QUOTA_SECONDS:g} CPU seconds per "
+                f"{settings.SIMULATION_USER_QUOTA_WINDOW:g} s exhausted"
+            ))
+
+        return ComputeCharge.objects.create(user=user, job=job, seconds=cost.seconds)
+
+
+def _quota_wait(charges, excess, window):
+    """Seconds until enough of the charges in the window have aged out to free `excess`."""
+    freed = 0.0
+    for created_at, seconds in charges.order_by("created_at").values_list("created_at", "seconds"):
+        freed += seconds
+        if freed >= excess:
+            return max((created_at - window).total_seconds(), 1)
+    return settings.SIMULATION_USER_QUOTA_WINDOW
+
+
+def release(charge, seconds):
+    """Closes a charge, settling it to the `seconds` the run actually took; a closed charge stays as it is."""
+    ComputeCharge.objects.filter(pk=charge.pk, finished_at__isnull=True).update(
+        finished_at=timezone.now(), seconds=seconds
+    )
+
+
+@contextmanager
+def admitted(user, cost, limit=None):
+    """`admit` for the duration of the block."""
+    charge = admit(user, cost, limit)
+    started = time.perf_counter()
+    try:
+        yield charge
+    finally:
+        release(charge, time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def aadmitted(user, cost, limit=None):
+    """`admitted` for async views."""
+    charge = await sync_to_async(admit)(user, cost, limit)
+    started = time.perf_counter()
+    try:
+        yield charge
+    finally:
+        await sync_to_async(release)(charge, time.perf_counter() - started)
+
+
+def deadline(seconds, progress=None):
+    """
+    A `progress` callback for the physics functions that raises `BudgetExceeded`
+    once `seconds` of wall-clock time have passed, forwarding to `progress` until then.
+    """
+    stop_at = time.monotonic() + seconds
+
+    def check_deadline(fraction=None):
+        if time.monotonic() > stop_at:
+            raise BudgetExceeded(f"The run exceeded its wall-clock budget of {seconds:g} s")
+        if progress is not None and fraction is not None:
+            progress(fraction)
+
+    return check_deadline
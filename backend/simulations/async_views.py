@@ -0,0 +1,47 @@
+"""
+Async dispatch for DRF views.
+
+DRF calls handlers synchronously. `AsyncAPIViewMixin` makes a view async
+(Django serves it without a thread per request under ASGI): authentication,
+permission and throttle checks run through `sync_to_async`, since they may
+hit the database, then the `async def` handler is awaited and the response
+is rendered off the shared sync thread.
+"""
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from rest_framework.response import Response
+
+from . import timing
+
+
+class AsyncAPIViewMixin:
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        if not isinstance(self.response, Response):
+            # E.g. a 304 from a conditional GET, nothing to render.
+            return self.response
+        # Rendering a long trajectory takes a while; Django would do it on its one shared sync thread.
+        with timing.phase("render"):
+            await sync_to_async(self.response.render, thread_sensitive=False)()
+        return self.response
@@ -0,0 +1,101 @@
+"""
+Chaos maps: the largest Lyapunov exponent over a grid of two parameters.
+
+A `ChaosMap` is split into chunks of `chunk_size` cells. A chunk is one
+vectorized run (`System.lyapunov`) of all its cells at once, a reference and a
+perturbed copy per cell, so it is cheap to hand to a worker process and small
+enough to lose. Every finished chunk is saved as a `ChaosMapChunk` right away;
+`compute` skips the chunks already saved, so an interrupted map resumes
+where it stopped.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+import numpy as np
+from django.utils import timezone
+
+from . import registry
+from .models import ChaosMap, ChaosMapChunk
+
+# Cells per chunk: large enough for NumPy to pay off, small enough to checkpoint often.
+CHUNK_SIZE = 10000
+
+
+def spec(chaos_map):
+    """The picklable description of a map that `compute_chunk` needs."""
+    fields = (
+        "model_type", "x_parameter", "x_start", "x_stop", "y_parameter", "y_start", "y_stop",
+        "resolution", "params", "steps", "transient", "interval", "perturbation", "chunk_size",
+    )
+    return {field: getattr(chaos_map, field) for field in fields}
+
+
+def compute_chunk(spec, index):
+    """Exponents of the cells of chunk `index`, as little-endian float32 bytes (NaN where diverged)."""
+    system = registry.get(spec["model_type"])
+    resolution = spec["resolution"]
+    cells = np.arange(index * spec["chunk_size"], min((index + 1) * spec["chunk_size"], resolution ** 2))
+    params = spec["params"]
+
+    values = system.values(params)
+    values[spec["x_parameter"]] = np.linspace(spec["x_start"], spec["x_stop"], resolution)[cells % resolution]
+    values[spec["y_parameter"]] = np.linspace(spec["y_start"], spec["y_stop"], resolution)[cells // resolution]
+
+    options = {} if system.kind == registry.MAP else {
+        "dt": float(params.get("dt", system.dt)), "method": params.get("method", "euler"),
+    }
+    result = system.lyapunov(
+        params.get("initial", system.initial), len(cells), spec["steps"], transient=spec["transient"],
+        interval=spec["interval"], perturbation=spec["perturbation"], **options, **values,
+    )
+    return np.asarray(result["lyapunov"], dtype="<f4").tobytes()
+
+
+def missing_chunks(chaos_map):
+    done = set(chaos_map.chunks.values_list("index", flat=True))
+    return [index for index in range(chaos_map.chunk_count) if index not in done]
+
+
+def save_chunk(chaos_map, index, values):
+    ChaosMapChunk.objects.get_or_create(chaos_map=chaos_map, index=index, defaults={"values": values})
+
+
+def compute(chaos_map, workers=1, progress=None):
+    """
+    Computes the missing chunks of `chaos_map`, `workers` at a time in a process
+    pool (0 computes inline), saving each as soon as it is done; then marks the
+    map done. `progress(done, total)` is called after every saved chunk.
+    """
+    missing = missing_chunks(chaos_map)
+    total = chaos_map.chunk_count
+    done = total - len(missing)
+    description = spec(chaos_map)
+
+    def saved(index, values):
+        nonlocal done
+        save_chunk(chaos_map, index, values)
+        done += 1
+        if progress is not None:
+            progress(done, total)
+
+    if not workers:
+        for index in missing:
+            saved(index, compute_chunk(description, index))
+    elif missing:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup,
+        ) as executor:
+            futures = {executor.submit(compute_chunk, description, index): index for index in missing}
+            try:
+                for future in as_completed(futures):
+                    saved(futures[future], future.result())
+            except BaseException:
+                # Interrupted: saved chunks stay, the queued ones are dropped.
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    if not missing_chunks(chaos_map):
+        ChaosMap.objects.filter(pk=chaos_map.pk).update(status=ChaosMap.Statuses.DONE, finished_at=timezone.now())
+        chaos_map.refresh_from_db()
+    return chaos_map
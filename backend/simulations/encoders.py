@@ -0,0 +1,15 @@
+from array import array
+
+import numpy as np
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class TrajectoryJSONEncoder(DjangoJSONEncoder):
+    """Stores trajectory columns (`array('d')` buffers, NumPy arrays) in a JSONField as they are."""
+
+    def default(self, o):
+        if isinstance(o, (array, np.ndarray)):
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        return super().default(o)
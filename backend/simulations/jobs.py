@@ -0,0 +1,155 @@
+"""
+Background simulation jobs.
+
+The `SimulationJob` table is the queue: a job is claimed by atomically moving it
+from `queued` to `running`, so several web processes (each with its own local
+pool) never run the same job twice and no outside broker is needed.
+"""
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+_executor = None
+_executor_lock = threading.Lock()
+_batch_executor = None
+_compute_executor = None
+
+
+def _init_worker():
+    django.setup()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.SIMULATION_JOB_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            # Jobs left queued by a previous server process are picked up here.
+            from .models import SimulationJob
+            for job_id in SimulationJob.objects.filter(status=SimulationJob.Statuses.QUEUED).values_list("pk", flat=True):
+                _executor.submit(run_job, job_id)
+        return _executor
+
+
+def get_batch_executor():
+    """Pool for batch creates, one worker per core by default; None when batches run inline."""
+    global _batch_executor
+    with _executor_lock:
+        if _batch_executor is None and settings.SIMULATION_BATCH_WORKERS:
+            _batch_executor = ProcessPoolExecutor(
+                max_workers=settings.SIMULATION_BATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _batch_executor
+
+
+def get_compute_executor():
+    """Bounded thread pool the async views run physics in, keeping the event loop free."""
+    global _compute_executor
+    with _executor_lock:
+        if _compute_executor is None:
+            _compute_executor = ThreadPoolExecutor(
+                max_workers=settings.SIMULATION_COMPUTE_THREADS, thread_name_prefix="simulation-compute"
+            )
+        return _compute_executor
+
+
+async def offload(function, *args, **kwargs):
+    """Awaits `function(*args, **kwargs)` run in the compute pool, in the caller's context (request timing)."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        get_compute_executor(), partial(context.run, function, *args, **kwargs)
+    )
+
+
+def run_batch(function, items):
+    """
+    `function(item)` for every item, spread over the batch pool. Returns the
+    results in order; an item that raised gets its exception instead.
+    """
+    executor = get_batch_executor() if len(items) > 1 else None
+    if executor is None:
+        outcomes = []
+        for item in items:
+            try:
+                outcomes.append(function(item))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+    try:
+        futures = [executor.submit(function, item) for item in items]
+        return [future.exception() or future.result() for future in futures]
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); the next batch starts a fresh pool.
+        global _batch_executor
+        with _executor_lock:
+            if _batch_executor is executor:
+                _batch_executor = None
+        raise
+
+
+def enqueue(job):
+    if not settings.SIMULATION_JOB_WORKERS:
+        run_job(job.pk)
+        return
+    transaction.on_commit(lambda: get_executor().submit(run_job, job.pk))
+
+
+def run_job(job_id):
+    """Claims a queued job, runs its physics and stores the result as a `Simulation`."""
+    from . import admission
+    from .models import ComputeCharge, Simulation, SimulationJob
+    from .result_cache import cached_simulation
+
+    close_old_connections()
+    jobs = SimulationJob.objects.filter(pk=job_id)
+    claimed = jobs.filter(status=SimulationJob.Statuses.QUEUED).update(
+        status=SimulationJob.Statuses.RUNNING, started_at=timezone.now()
+    )
+    if not claimed:
+        return
+
+    job = jobs.get()
+    started = time.perf_counter()
+    try:
+        packed, stable = cached_simulation(job.input_params, progress=admission.deadline(
+            settings.SIMULATION_JOB_TIMEOUT, lambda fraction: jobs.update(progress=fraction)
+        ))
+
+        with transaction.atomic():
+            simulation = Simulation.objects.create(
+                user_id=job.user_id,
+                model_type=job.input_params["model"],
+                input_params=job.input_params,
+                **packed,
+                is_stable=stable,
+            )
+            jobs.update(
+                status=SimulationJob.Statuses.DONE, progress=1.0,
+                simulation=simulation, finished_at=timezone.now(),
+            )
+    except Exception as e:
+        jobs.update(
+            status=SimulationJob.Statuses.FAILED,
+            error=f"Invalid input or computation error: {str(e)}",
+            finished_at=timezone.now(),
+        )
+    finally:
+        for charge in ComputeCharge.objects.filter(job_id=job_id):
+            admission.release(charge, time.perf_counter() - started)
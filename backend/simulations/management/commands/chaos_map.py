@@ -0,0 +1,117 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from simulations import chaos, physics, registry
+from simulations.models import ChaosMap
+
+
+class Command(BaseCommand):
+    help = (
+        "Computes the largest Lyapunov exponent over a grid of two parameters of a system, "
+        "e.g. `chaos_map henon a 1.0 1.4 b 0.0 0.4` or `chaos_map lorenz sigma 5 20 rho 0 200 --method rk4`. "
+        "Finished chunks are saved as they come in; rerunning the same command (or passing "
+        "--resume) continues an interrupted map."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model")
+        parser.add_argument("x_parameter")
+        parser.add_argument("x_start", type=float)
+        parser.add_argument("x_stop", type=float)
+        parser.add_argument("y_parameter")
+        parser.add_argument("y_start", type=float)
+        parser.add_argument("y_stop", type=float)
+        parser.add_argument("--resolution", type=int, default=500, help="cells per axis")
+        parser.add_argument("--steps", type=int, default=2000, help="measured steps per cell")
+        parser.add_argument("--transient", type=int, default=1000, help="steps discarded before measuring")
+        parser.add_argument("--interval", type=int, default=physics.TWIN_INTERVAL, help="steps between renormalizations")
+        parser.add_argument("--perturbation", type=float, default=physics.TWIN_PERTURBATION)
+        parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                            help="value of another parameter (defaults otherwise)")
+        parser.add_argument("--initial", type=float, nargs="+")
+        parser.add_argument("--dt", type=float)
+        parser.add_argument("--method", choices=("euler", "rk4"))
+        parser.add_argument("--chunk-size", type=int, default=chaos.CHUNK_SIZE, help="cells per chunk")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="worker processes, 0 computes in this process")
+        parser.add_argument("--resume", type=int, metavar="ID", help="continue the chaos map with this id")
+
+    def handle(self, *args, **options):
+        if options["resume"] is not None:
+            try:
+                chaos_map = ChaosMap.objects.get(pk=options["resume"])
+            except ChaosMap.DoesNotExist:
+                raise CommandError(f"Chaos map #{options['resume']} does not exist") from None
+        else:
+            fields = self.fields(options)
+            chaos_map = ChaosMap.objects.filter(**fields).order_by("-created_at").first()
+            if chaos_map is None:
+                chaos_map = ChaosMap.objects.create(**fields)
+                self.stdout.write(f"Created chaos map #{chaos_map.pk}: {chaos_map.chunk_count} chunks")
+
+        if chaos_map.status == ChaosMap.Statuses.DONE:
+            self.stdout.write(f"Chaos map #{chaos_map.pk} is already done")
+            return
+
+        remaining = len(chaos.missing_chunks(chaos_map))
+        if remaining < chaos_map.chunk_count:
+            self.stdout.write(f"Resuming chaos map #{chaos_map.pk}: {remaining} of {chaos_map.chunk_count} chunks left")
+
+        def progress(done, total):
+            self.stdout.write(f"  chunk {done}/{total}")
+
+        try:
+            chaos.compute(chaos_map, options["workers"], progress)
+        except KeyboardInterrupt:
+            raise CommandError(f"Interrupted; rerun with --resume {chaos_map.pk} to continue") from None
+        self.stdout.write(self.style.SUCCESS(f"Chaos map #{chaos_map.pk} done"))
+
+    def fields(self, options):
+        """Validated `ChaosMap` fields from the command line."""
+        try:
+            system = registry.get(options["model"])
+        except ValueError as e:
+            raise CommandError(str(e)) from None
+
+        axes = (options["x_parameter"], options["y_parameter"])
+        for parameter in axes:
+            if parameter not in system.parameters:
+                raise CommandError(
+                    f"{system.title} has no parameter {parameter!r}, choose from {', '.join(system.parameters)}"
+                )
+        if axes[0] == axes[1]:
+            raise CommandError("The two axes must be different parameters")
+        if options["resolution"] < 2:
+            raise CommandError("The resolution must be at least 2")
+        for option in ("steps", "interval", "chunk_size"):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be positive")
+
+        params = {}
+        for assignment in options["param"]:
+            name, _, value = assignment.partition("=")
+            if name not in system.parameters or name in axes:
+                raise CommandError(f"Invalid --param {assignment!r}")
+            try:
+                params[name] = float(value)
+            except ValueError:
+                raise CommandError(f"Invalid --param {assignment!r}") from None
+        if options["initial"] is not None:
+            if len(options["initial"]) != system.dimension:
+                raise CommandError(f"{system.title} needs {system.dimension} initial values")
+            params["initial"] = options["initial"]
+        if system.kind == registry.FLOW:
+            if options["dt"] is not None:
+                params["dt"] = options["dt"]
+            if options["method"] is not None:
+                params["method"] = options["method"]
+
+        return {
+            "model_type": system.name,
+            "x_parameter": axes[0], "x_start": options["x_start"], "x_stop": options["x_stop"],
+            "y_parameter": axes[1], "y_start": options["y_start"], "y_stop": options["y_stop"],
+            "resolution": options["resolution"], "params": params,
+            "steps": options["steps"], "transient": options["transient"], "interval": options["interval"],
+            "perturbation": options["perturbation"], "chunk_size": options["chunk_size"],
+        }
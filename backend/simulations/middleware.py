@@ -0,0 +1,75 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.middleware.gzip import GZipMiddleware
+
+from . import timing
+
+
+class ServerTimingMiddleware:
+    """
+    Times every request and sends its phases in a `Server-Timing` header:
+    the phases recorded by the view, `render` for DRF responses and `total`.
+    Requests annotated by their view are aggregated into `timing` metrics.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        token = timing.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            timer = timing.stop(token)
+        return self.finish(request, response, timer)
+
+    async def __acall__(self, request):
+        token = timing.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timer = timing.stop(token)
+        return self.finish(request, response, timer)
+
+    def finish(self, request, response, timer):
+        if getattr(request, "_render_started", None) is not None:
+            timer.add("render", time.perf_counter() - request._render_started)
+        timer.add("total", time.perf_counter() - timer.started)
+        response["Server-Timing"] = timer.server_timing()
+
+        if timer.model is not None and request.resolver_match is not None:
+            size = None if response.streaming else len(response.content)
+            timing.record(timer, request.resolver_match.url_name, size)
+        return response
+
+    def process_template_response(self, request, response):
+        request._render_started = time.perf_counter()
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Gzip for JSON and other text responses. Streams are left alone (gzip would
+    hold chunks back until its buffer fills) and so is the binary trajectory
+    format, which barely compresses.
+
+    Compressed responses keep Django's BREACH padding, so their bytes differ between
+    requests and their ETag is weakened to `W/"..."`: a strong one would be false.
+    """
+
+    UNCOMPRESSED_TYPES = ("application/x-trajectory", "application/x-ndjson", "text/event-stream")
+
+    def process_response(self, request, response):
+        if response.get("Content-Type", "").split(";")[0] in self.UNCOMPRESSED_TYPES:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:46
+
+import simulations.encoders
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='simulation',
+            name='results',
+            field=models.JSONField(encoder=simulations.encoders.TrajectoryJSONEncoder),
+        ),
+    ]
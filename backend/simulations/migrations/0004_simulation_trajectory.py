@@ -0,0 +1,85 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:51
+
+from io import BytesIO
+
+import numpy as np
+from django.db import migrations, models
+
+# A frozen copy of the blob format `simulations.storage` wrote when this
+# migration was added: later changes to that module must not change what
+# the migration does.
+AXES = ("x", "y", "z")
+
+
+def pack_results(results):
+    axes = [axis for axis in AXES if axis in results]
+    metadata = {key: value for key, value in results.items() if key not in axes}
+    arrays = {}
+
+    first = results[axes[0]]
+    if isinstance(first, (list, tuple)) and len(first) > 0 and hasattr(first[0], "__len__"):
+        for axis in axes:
+            arrays[axis] = np.concatenate([np.asarray(column, dtype="<f8") for column in results[axis]])
+        arrays["lengths"] = np.array([len(column) for column in first], dtype="<i8")
+    else:
+        for axis in axes:
+            arrays[axis] = np.asarray(results[axis], dtype="<f8")
+
+    metadata["length"] = len(arrays[axes[0]])
+    metadata["bounds"] = {
+        axis: [float(np.nanmin(arrays[axis])), float(np.nanmax(arrays[axis]))] if len(arrays[axis]) else None
+        for axis in axes
+    }
+
+    buffer = BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return metadata, buffer.getvalue()
+
+
+def unpack_results(results, trajectory):
+    with np.load(BytesIO(bytes(trajectory))) as data:
+        arrays = {name: data[name] for name in data.files}
+
+    lengths = arrays.pop("lengths", None)
+    if lengths is None:
+        columns = {axis: column.tolist() for axis, column in arrays.items()}
+    else:
+        offsets = np.cumsum(lengths)[:-1]
+        columns = {axis: [part.tolist() for part in np.split(column, offsets)] for axis, column in arrays.items()}
+    return {**columns, **results}
+
+
+def pack_trajectories(apps, schema_editor):
+    Simulation = apps.get_model("simulations", "Simulation")
+    for simulation in Simulation.objects.filter(trajectory__isnull=True).iterator(chunk_size=100):
+        if not isinstance(simulation.results, dict) or "x" not in simulation.results:
+            continue
+        simulation.results, simulation.trajectory = pack_results(simulation.results)
+        simulation.save(update_fields=["results", "trajectory"])
+
+
+def unpack_trajectories(apps, schema_editor):
+    Simulation = apps.get_model("simulations", "Simulation")
+    for simulation in Simulation.objects.filter(trajectory__isnull=False).iterator(chunk_size=100):
+        results = unpack_results(simulation.results, simulation.trajectory)
+        results.pop("length", None)
+        results.pop("bounds", None)
+        simulation.results = results
+        simulation.trajectory = None
+        simulation.save(update_fields=["results", "trajectory"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0003_simulationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='trajectory',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(pack_trajectories, unpack_trajectories),
+    ]
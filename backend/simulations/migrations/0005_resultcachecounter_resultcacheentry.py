@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:53
+
+import django.utils.timezone
+import simulations.encoders
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0004_simulation_trajectory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultCacheCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, unique=True)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResultCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('results', models.JSONField(encoder=simulations.encoders.TrajectoryJSONEncoder)),
+                ('trajectory', models.BinaryField(blank=True, null=True)),
+                ('is_stable', models.BooleanField(default=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
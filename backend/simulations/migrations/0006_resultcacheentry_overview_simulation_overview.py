@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:55
+
+from io import BytesIO
+
+import numpy as np
+from django.db import migrations, models
+
+# A frozen copy of the overview format `simulations.storage` wrote when this
+# migration was added: later changes to that module must not change what
+# the migration does.
+OVERVIEW_SIZES = (1000, 4000, 16000, 64000, 256000)
+
+
+def decimate(columns, max_points):
+    length = len(next(iter(columns.values())))
+    buckets = max(max_points // (2 * len(columns)), 1)
+    size = -(-length // buckets)
+    starts = np.arange(buckets) * size
+    selected = [np.array([0, length - 1])]
+    for column in columns.values():
+        padded = np.pad(np.asarray(column, dtype=float), (0, buckets * size - length), mode="edge").reshape(buckets, size)
+        selected.append(starts + np.argmin(padded, axis=1))
+        selected.append(starts + np.argmax(padded, axis=1))
+    return np.unique(np.minimum(np.concatenate(selected), length - 1))
+
+
+def build_overview(columns):
+    length = len(next(iter(columns.values())))
+    levels = {}
+    for size in OVERVIEW_SIZES:
+        if size >= length:
+            break
+        index = decimate(columns, size)
+        levels[f"{size}_index"] = index
+        levels.update({f"{size}_{axis}": column[index] for axis, column in columns.items()})
+    if not levels:
+        return None
+
+    buffer = BytesIO()
+    np.savez_compressed(buffer, **levels)
+    return buffer.getvalue()
+
+
+def build_overviews(apps, schema_editor):
+    Simulation = apps.get_model("simulations", "Simulation")
+    pending = Simulation.objects.filter(trajectory__isnull=False, overview__isnull=True)
+    for simulation in pending.iterator(chunk_size=100):
+        with np.load(BytesIO(bytes(simulation.trajectory))) as data:
+            columns = {name: data[name] for name in data.files}
+        # Ensembles (with per-member "lengths") get no overview.
+        if "lengths" in columns:
+            continue
+        simulation.overview = build_overview(columns)
+        simulation.save(update_fields=["overview"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0005_resultcachecounter_resultcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resultcacheentry',
+            name='overview',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='overview',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(build_overviews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0006_resultcacheentry_overview_simulation_overview'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='simulation',
+            index=models.Index(fields=['user', '-created_at'], name='simulation_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0007_simulation_simulation_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='attractor',
+            field=models.CharField(blank=True, choices=[('fixed_point', 'Fixed Point'), ('cycle', 'Cycle')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='period',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0008_simulation_attractor_period'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimulationSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.PositiveBigIntegerField()),
+                ('length', models.PositiveBigIntegerField()),
+                ('trajectory', models.BinaryField()),
+                ('overview', models.BinaryField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('simulation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='simulations.simulation')),
+            ],
+            options={
+                'ordering': ['start'],
+                'constraints': [models.UniqueConstraint(fields=('simulation', 'start'), name='simulation_segment_start_unique')],
+            },
+        ),
+    ]
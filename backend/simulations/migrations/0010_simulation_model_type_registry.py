@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0009_simulationsegment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='simulation',
+            name='model_type',
+            field=models.CharField(choices=[('lorenz', 'Lorenz Attractor'), ('henon', 'Henon Map'), ('thomas', 'Thomas Attractor'), ('rossler', 'Rossler Attractor'), ('chen', 'Chen Attractor'), ('duffing', 'Duffing Map')], max_length=40),
+        ),
+    ]
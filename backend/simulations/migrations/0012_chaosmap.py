@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0011_computecharge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChaosMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_type', models.CharField(choices=[('lorenz', 'Lorenz Attractor'), ('henon', 'Henon Map'), ('thomas', 'Thomas Attractor'), ('rossler', 'Rossler Attractor'), ('chen', 'Chen Attractor'), ('duffing', 'Duffing Map')], max_length=40)),
+                ('x_parameter', models.CharField(max_length=40)),
+                ('x_start', models.FloatField()),
+                ('x_stop', models.FloatField()),
+                ('y_parameter', models.CharField(max_length=40)),
+                ('y_start', models.FloatField()),
+                ('y_stop', models.FloatField()),
+                ('resolution', models.PositiveIntegerField()),
+                ('params', models.JSONField(default=dict)),
+                ('steps', models.PositiveIntegerField()),
+                ('transient', models.PositiveIntegerField()),
+                ('interval', models.PositiveIntegerField()),
+                ('perturbation', models.FloatField()),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done')], default='running', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChaosMapChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('values', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('chaos_map', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='simulations.chaosmap')),
+            ],
+            options={
+                'ordering': ['index'],
+                'constraints': [models.UniqueConstraint(fields=('chaos_map', 'index'), name='chaos_map_chunk_index_unique')],
+            },
+        ),
+    ]
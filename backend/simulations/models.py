@@ -1,19 +1,206 @@
 from django.contrib.auth.models import User
+import numpy as np
 from django.db import models
+from django.utils import timezone
+
+from . import registry, storage
+from .encoders import TrajectoryJSONEncoder
 
 
 class Simulation(models.Model):
-    class ModelTypes(models.TextChoices):
-        LORENZ = "lorenz", ("Lorenz Attractor")
-        HENON = "henon", ("Henon Map")
-        THOMAS = "thomas", ("Thomas Attractor")
+    ModelTypes = models.TextChoices("ModelTypes", registry.choices())
+
+    class Attractors(models.TextChoices):
+        FIXED_POINT = "fixed_point", ("Fixed Point")
+        CYCLE = "cycle", ("Cycle")
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="simulations")
     model_type = models.CharField(max_length=40, choices=ModelTypes.choices)
     created_at = models.DateTimeField(auto_now_add=True)
     input_params = models.JSONField()
-    results = models.JSONField()
+    results = models.JSONField(encoder=TrajectoryJSONEncoder)
+    trajectory = models.BinaryField(null=True, blank=True, editable=False)
+    overview = models.BinaryField(null=True, blank=True, editable=False)
+    is_stable = models.BooleanField(default=True)
+    attractor = models.CharField(max_length=20, choices=Attractors.choices, blank=True, default="")
+    period = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="simulation_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model_type} by {self.user.username} at {self.created_at}"
+
+    def get_results(self, start=0, end=None, max_points=None):
+        """
+        `results` with the coordinate columns from `trajectory` merged back in,
+        optionally limited to points `[start, end)` and reduced to `max_points`.
+        """
+        if self.results.get("bins"):
+            # Density maps have no points to window.
+            return storage.unpack_results(self.results, self.trajectory)
+        if self.results.get("segments"):
+            segments = list(self.segments.defer("trajectory"))
+            pieces = [(0, segments[0].start, lambda: self.trajectory, self.overview)]
+            pieces += [
+                (segment.start, segment.length, lambda segment=segment: segment.trajectory, segment.overview)
+                for segment in segments
+            ]
+            return storage.read_pieces(self.results, pieces, start, end, max_points)
+        if not start and end is None and max_points is None:
+            return storage.unpack_results(self.results, self.trajectory)
+        return storage.read_window(self.results, lambda: self.trajectory, self.overview, start, end, max_points)
+
+
+class SimulationSegment(models.Model):
+    """Points appended to a `Simulation` by extending it, stored without rewriting its `trajectory`."""
+
+    simulation = models.ForeignKey(Simulation, on_delete=models.CASCADE, related_name="segments")
+    start = models.PositiveBigIntegerField()
+    length = models.PositiveBigIntegerField()
+    trajectory = models.BinaryField(editable=False)
+    overview = models.BinaryField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["start"]
+        constraints = [
+            models.UniqueConstraint(fields=["simulation", "start"], name="simulation_segment_start_unique"),
+        ]
+
+    def __str__(self):
+        return f"Simulation #{self.simulation_id} points {self.start}-{self.start + self.length}"
+
+
+class SimulationJob(models.Model):
+    class Statuses(models.TextChoices):
+        QUEUED = "queued", ("Queued")
+        RUNNING = "running", ("Running")
+        DONE = "done", ("Done")
+        FAILED = "failed", ("Failed")
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="simulation_jobs")
+    status = models.CharField(max_length=20, choices=Statuses.choices, default=Statuses.QUEUED)
+    progress = models.FloatField(default=0.0)
+    input_params = models.JSONField()
+    simulation = models.OneToOneField(Simulation, on_delete=models.SET_NULL, null=True, blank=True, related_name="job")
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.input_params.get('model')} job #{self.pk} ({self.status})"
+
+
+class ResultCacheEntry(models.Model):
+    """A computed trajectory shared by all runs with the same canonical input (see `result_cache`)."""
+
+    key = models.CharField(max_length=64, unique=True)
+    results = models.JSONField(encoder=TrajectoryJSONEncoder)
+    trajectory = models.BinaryField(null=True, blank=True, editable=False)
+    overview = models.BinaryField(null=True, blank=True, editable=False)
     is_stable = models.BooleanField(default=True)
+    size = models.PositiveBigIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.size} bytes, {self.hits} hits)"
+
+
+class ResultCacheCounter(models.Model):
+    name = models.CharField(max_length=20, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class ComputeCharge(models.Model):
+    """
+    Estimated CPU seconds of one admitted run (see `admission`). Open while the run
+    is in flight, then settled to the time it actually took.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="compute_charges")
+    job = models.OneToOneField(SimulationJob, on_delete=models.CASCADE, null=True, blank=True, related_name="charge")
+    seconds = models.FloatField()
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="compute_charge_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.seconds:.2f} s by {self.user.username} at {self.created_at}"
+
+
+class ChaosMap(models.Model):
+    """
+    Largest Lyapunov exponent over a grid of two parameters of one system, filled
+    in chunk by chunk by `manage.py chaos_map` (see `chaos`). Cell `k` of the
+    `resolution` x `resolution` grid is row `k // resolution` (the y parameter)
+    and column `k % resolution` (the x parameter).
+    """
+
+    class Statuses(models.TextChoices):
+        RUNNING = "running", ("Running")
+        DONE = "done", ("Done")
+
+    model_type = models.CharField(max_length=40, choices=Simulation.ModelTypes.choices)
+    x_parameter = models.CharField(max_length=40)
+    x_start = models.FloatField()
+    x_stop = models.FloatField()
+    y_parameter = models.CharField(max_length=40)
+    y_start = models.FloatField()
+    y_stop = models.FloatField()
+    resolution = models.PositiveIntegerField()
+    params = models.JSONField(default=dict)
+    steps = models.PositiveIntegerField()
+    transient = models.PositiveIntegerField()
+    interval = models.PositiveIntegerField()
+    perturbation = models.FloatField()
+    chunk_size = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=Statuses.choices, default=Statuses.RUNNING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.model_type} chaos map #{self.pk} over {self.x_parameter}, {self.y_parameter} ({self.status})"
+
+    @property
+    def chunk_count(self):
+        return -(-self.resolution ** 2 // self.chunk_size)
+
+    def grid(self):
+        """The (resolution, resolution) float32 grid of exponents; NaN for diverged and not yet computed cells."""
+        values = np.full(self.resolution ** 2, np.nan, dtype=np.float32)
+        for index, blob in self.chunks.values_list("index", "values"):
+            start = index * self.chunk_size
+            chunk = np.frombuffer(blob, dtype="<f4")
+            values[start:start + len(chunk)] = chunk
+        return values.reshape(self.resolution, self.resolution)
+
+
+class ChaosMapChunk(models.Model):
+    """Exponents of cells `[index * chunk_size, (index + 1) * chunk_size)` of a `ChaosMap`, little-endian float32."""
+
+    chaos_map = models.ForeignKey(ChaosMap, on_delete=models.CASCADE, related_name="chunks")
+    index = models.PositiveIntegerField()
+    values = models.BinaryField(editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["index"]
+        constraints = [
+            models.UniqueConstraint(fields=["chaos_map", "index"], name="chaos_map_chunk_index_unique"),
+        ]
 
     def __str__(self):
-        return f"{self.model_type} by {self.user.username} at {self.created_at}"
\ No newline at end of file
+        return f"Chaos map #{self.chaos_map_id} chunk {self.index}"
@@ -1,15 +1,82 @@
 import math
+from array import array
+
+import numpy as np
 
 # ------------------------------
 # КОНСТАНТИ
 # ------------------------------
 MAX_VALUE = 1e3  # граничне значення координат для перевірки стабільності
+METHODS = ("euler", "rk4", "rk45")  # методи інтегрування неперервних моделей
+RTOL = 1e-6  # відносна похибка за замовчуванням для rk45
+ATOL = 1e-9  # абсолютна похибка за замовчуванням для rk45
+MIN_STEP = 1e-12  # мінімальний внутрішній крок rk45
+PROGRESS_INTERVAL = 10000  # як часто (у кроках) викликати колбек progress
+RK45_PROGRESS_INTERVAL = 1000  # те саме для внутрішніх кроків rk45, яких на одну точку може бути багато
+ENSEMBLE_PROGRESS_INTERVAL = 100  # те саме для ансамблів і розгорток, де крок рахує всі траєкторії разом
+CHUNK_SIZE = 1000  # розмір порції точок для потокової видачі
+DENSITY_CHUNK_SIZE = 100000  # розмір порції точок для карти густини
+DENSITY_MARGIN = 0.05  # запас меж карти густини, визначених за першою порцією
+SETTLE_INTERVAL = 100  # як часто (у кроках) перевіряти вихід на нерухому точку чи цикл
+SETTLE_WINDOW = 100  # скільки останніх кроків поспіль має триматися повторення, щоб вважати його встановленим
+SETTLE_CYCLES = 4  # мінімальна кількість повних циклів у цьому вікні для довгих періодів
+SETTLE_TIME = 50.0  # для потоків: скільки одиниць часу поспіль швидкість має лишатися малою
+MAX_PERIOD = 32  # найбільший період циклу, який розпізнає henon_map
+TWIN_PERTURBATION = 1e-8  # початкова відстань між еталонною та збуреною траєкторіями
+TWIN_INTERVAL = 10  # як часто (у кроках) перенормовувати збурену траєкторію
+SECTION_ITERATIONS = 4  # ітерації Ньютона для уточнення моменту перетину площини
+
+
+# ------------------------------
+# Колонкові буфери траєкторій
+# ------------------------------
+def _columns(axes, size):
+    """Попередньо виділені буфери float64, по одному на кожну вісь."""
+    return {axis: array("d", [0.0]) * size for axis in axes}
+
+
+def _trim(columns, length):
+    """Обрізає буфери на місці до фактичної кількості точок (без копіювання)."""
+    for column in columns.values():
+        del column[length:]
+    return columns
+
+
+def _period(buffers, length, tol, max_period, window=SETTLE_WINDOW):
+    """
+    Найменший період p ≤ max_period, для якого кожна з останніх
+    max(window, SETTLE_CYCLES * p) точок повторює точку на p кроків
+    раніше з точністю tol по кожній координаті (p = 1 — нерухома точка).
+    Хаотична орбіта може ненадовго пройти поруч нестійкого циклу, тож
+    одного збігу за один цикл недостатньо — повторення має протриматися
+    все вікно. Повертає None, якщо траєкторія ще не встановилася.
+    """
+    for p in range(1, max_period + 1):
+        span = max(window, SETTLE_CYCLES * p)
+        if span + p > length:
+            break
+        if all(
+            abs(column[length - 1 - k] - column[length - 1 - k - p]) <= tol
+            for column in buffers for k in range(span)
+        ):
+            return p
+    return None
+
+
+def _rest(buffers, length, tol, dt):
+    """
+    Нерухома точка потоку: 1, якщо |dx/dt| ≤ tol по кожній координаті
+    впродовж останніх SETTLE_TIME одиниць часу, інакше None. Поруч сідла
+    траєкторія може майже зупинитися, але ненадовго — звідси довге вікно.
+    """
+    return _period(buffers, length, tol * dt, 1, max(SETTLE_WINDOW, math.ceil(SETTLE_TIME / dt)))
 
 
 # ------------------------------
 # 1. Аттрактор Лоренца
 # ------------------------------
-def lorenz_attractor(x0, y0, z0, sigma=10.0, rho=28.0, beta=8/3, dt=0.01, steps=1000):
+def lorenz_attractor(x0, y0, z0, sigma=10.0, rho=28.0, beta=8/3, dt=0.01, steps=1000,
+                     method="euler", rtol=RTOL, atol=ATOL, progress=None, settle_tol=None):
     """
     Модель Лоренца:
         dx/dt = σ(y - x)
@@ -18,14 +85,33 @@ def lorenz_attractor(x0, y0, z0, sigma=10.0, rho=28.0, beta=8/3, dt=0.01, steps=
 
     Параметри:
         sigma, rho, beta — параметри системи
-        dt — крок інтегрування
+        dt — крок інтегрування (для rk45 — інтервал між збереженими точками)
         steps — кількість кроків симуляції
+        method — euler, rk4 або rk45
+        rtol, atol — допустимі похибки для rk45
+        progress — необов'язковий колбек, що отримує частку виконаних кроків
+        settle_tol — якщо задано, інтегрування зупиняється, щойно швидкість
+                     |dx/dt| по кожній координаті (зміна за крок, поділена на dt)
+                     протягом SETTLE_TIME не перевищує settle_tol
+                     (нерухома точка); у результаті тоді period = 1
     """
+    if method != "euler":
+        def rhs(x, y, z):
+            return sigma * (y - x), x * (rho - z) - y, x * y - beta * z
+
+        return _integrate_ode(rhs, (x0, y0, z0), dt, steps, method, rtol, atol, "Lorenz", progress, settle_tol)
+
     x, y, z = x0, y0, z0
-    result = []
+    columns = _columns(("x", "y", "z"), steps)
+    xs, ys, zs = columns.values()
+    length = steps
     stable = True
+    period = None
 
     for step in range(steps):
+        if progress is not None and step % PROGRESS_INTERVAL == 0:
+            progress(step / steps)
+
         dx = sigma * (y - x)
         dy = x * (rho - z) - y
         dz = x * y - beta * z
@@ -38,62 +124,104 @@ def lorenz_attractor(x0, y0, z0, sigma=10.0, rho=28.0, beta=8/3, dt=0.01, steps=
         if any(abs(v) > MAX_VALUE or math.isnan(v) for v in (x, y, z)):
             print(f"[!] Warning: Lorenz model diverged at step {step}")
             stable = False
+            length = step
             break
 
-        result.append((x, y, z))
+        xs[step], ys[step], zs[step] = x, y, z
+
+        if settle_tol is not None and step and step % SETTLE_INTERVAL == 0:
+            period = _rest((xs, ys, zs), step + 1, settle_tol, dt)
+            if period:
+                length = step + 1
+                break
 
     return {
         "stable": stable,
-        "points": result
+        "columns": _trim(columns, length),
+        "period": period
     }
 
 
 # ------------------------------
 # 2. Мапа Хенона
 # ------------------------------
-def henon_map(x0, y0, a=1.4, b=0.3, steps=1000):
+def henon_map(x0, y0, a=1.4, b=0.3, steps=1000, progress=None, settle_tol=None):
     """
     Модель Хенона:
         x_{n+1} = 1 - a * x_n^2 + y_n
         y_{n+1} = b * x_n
+
+    settle_tol — якщо задано, ітерації зупиняються, щойно орбіта з точністю
+    settle_tol вийшла на нерухому точку або цикл періоду до MAX_PERIOD
+    і втримується на ньому все вікно перевірки (див. _period);
+    знайдений період повертається як period.
     """
     x, y = x0, y0
-    result = []
+    columns = _columns(("x", "y"), steps)
+    xs, ys = columns.values()
+    length = steps
     stable = True
+    period = None
 
     for step in range(steps):
+        if progress is not None and step % PROGRESS_INTERVAL == 0:
+            progress(step / steps)
+
         x_next = 1 - a * x * x + y
         y_next = b * x
 
         if any(abs(v) > MAX_VALUE or math.isnan(v) for v in (x_next, y_next)):
             print(f"[!] Warning: Henon map diverged at step {step}")
             stable = False
+            length = step
             break
 
         x, y = x_next, y_next
-        result.append((x, y))
+        xs[step], ys[step] = x, y
+
+        if settle_tol is not None and step and step % SETTLE_INTERVAL == 0:
+            period = _period((xs, ys), step + 1, settle_tol, MAX_PERIOD)
+            if period:
+                length = step + 1
+                break
 
     return {
         "stable": stable,
-        "points": result
+        "columns": _trim(columns, length),
+        "period": period
     }
 
 
 # ------------------------------
 # 3. Аттрактор Томаса
 # ------------------------------
-def thomas_attractor(x0, y0, z0, b=0.18, dt=0.01, steps=1000):
+def thomas_attractor(x0, y0, z0, b=0.18, dt=0.01, steps=1000,
+                     method="euler", rtol=RTOL, atol=ATOL, progress=None, settle_tol=None):
     """
     Модель Томаса:
         dx/dt = -b * x + sin(y)
         dy/dt = -b * y + sin(z)
         dz/dt = -b * z + sin(x)
+
+    Параметри method, rtol, atol, progress, settle_tol — як у lorenz_attractor.
     """
+    if method != "euler":
+        def rhs(x, y, z):
+            return -b * x + math.sin(y), -b * y + math.sin(z), -b * z + math.sin(x)
+
+        return _integrate_ode(rhs, (x0, y0, z0), dt, steps, method, rtol, atol, "Thomas", progress, settle_tol)
+
     x, y, z = x0, y0, z0
-    result = []
+    columns = _columns(("x", "y", "z"), steps)
+    xs, ys, zs = columns.values()
+    length = steps
     stable = True
+    period = None
 
     for step in range(steps):
+        if progress is not None and step % PROGRESS_INTERVAL == 0:
+            progress(step / steps)
+
         dx = -b * x + math.sin(y)
         dy = -b * y + math.sin(z)
         dz = -b * z + math.sin(x)
@@ -105,11 +233,761 @@ def thomas_attractor(x0, y0, z0, b=0.18, dt=0.01, steps=1000):
         if any(abs(v) > MAX_VALUE or math.isnan(v) for v in (x, y, z)):
             print(f"[!] Warning: Thomas model diverged at step {step}")
             stable = False
+            length = step
+            break
+
+        xs[step], ys[step], zs[step] = x, y, z
+
+        if settle_tol is not None and step and step % SETTLE_INTERVAL == 0:
+            period = _rest((xs, ys, zs), step + 1, settle_tol, dt)
+            if period:
+                length = step + 1
+                break
+
+    return {
+        "stable": stable,
+        "columns": _trim(columns, length),
+        "period": period
+    }
+
+# ------------------------------
+# Потокова (порційна) видача траєкторій
+# ------------------------------
+def stream(integrator, initial, steps, chunk_size=CHUNK_SIZE, **params):
+    """
+    Генератор над будь-якою з функцій lorenz_attractor, henon_map, thomas_attractor:
+    інтегрує порціями по chunk_size кроків, продовжуючи з останньої точки
+    попередньої порції, і віддає колонки кожної порції одразу після обчислення.
+
+    Значення, що повертає генератор (StopIteration.value), — ознака стабільності.
+    """
+    state = tuple(initial)
+    done = 0
+
+    while done < steps:
+        count = min(chunk_size, steps - done)
+        result = integrator(*state, steps=count, **params)
+        columns = result["columns"]
+        done += count
+
+        if len(columns["x"]):
+            yield columns
+            state = tuple(column[-1] for column in columns.values())
+
+        if not result["stable"]:
+            return False
+
+    return True
+
+
+# ------------------------------
+# Карти густини
+# ------------------------------
+def density(integrator, initial, steps, axes=(0, 1), bins=512, bounds=None,
+            chunk_size=DENSITY_CHUNK_SIZE, progress=None, **params):
+    """
+    Двовимірна гістограма відвідувань траєкторії без збереження самої траєкторії:
+    інтегрує порціями по chunk_size кроків (як stream) і додає кожну порцію
+    до сітки bins × bins. axes — номери двох координат проєкції.
+
+    bounds — межі сітки ((min, max), (min, max)); якщо не задано, визначаються
+    за першою порцією з запасом DENSITY_MARGIN. Точки поза межами не
+    потрапляють у сітку, а лише рахуються в outside.
+
+    Повертає:
+        stable — чи не розбіглася траєкторія
+        density — сітка лічильників (bins, bins), перший індекс — перша вісь
+        bounds — межі сітки
+        length — кількість обчислених точок
+        outside — скільки з них не потрапило в сітку
+    """
+    state = tuple(initial)
+    grid = np.zeros((bins, bins), dtype=np.int64)
+    done = outside = 0
+    stable = True
+
+    while done < steps:
+        if progress is not None:
+            progress(done / steps)
+        count = min(chunk_size, steps - done)
+        result = integrator(*state, steps=count, **params)
+        columns = list(result["columns"].values())
+        first, second = (np.asarray(columns[axis], dtype=float) for axis in axes)
+        done += len(first)
+
+        if len(first):
+            if bounds is None:
+                bounds = tuple(_padded_bounds(column) for column in (first, second))
+            counts, _, _ = np.histogram2d(first, second, bins=bins, range=bounds)
+            grid += counts.astype(np.int64)
+            outside += len(first) - int(counts.sum())
+            state = tuple(column[-1] for column in columns)
+
+        if not result["stable"]:
+            stable = False
+            break
+
+    if bounds is None:
+        bounds = ((0.0, 1.0), (0.0, 1.0))
+    return {
+        "stable": stable,
+        "density": grid,
+        "bounds": tuple(tuple(float(v) for v in pair) for pair in bounds),
+        "length": done,
+        "outside": outside,
+    }
+
+
+def _padded_bounds(column):
+    lo, hi = float(column.min()), float(column.max())
+    margin = (hi - lo) * DENSITY_MARGIN or 0.5
+    return lo - margin, hi + margin
+
+
+# ------------------------------
+# 4. Методи Рунге–Кутти
+# ------------------------------
+# Таблиця Батчера Дормана–Принса 5(4)
+DOPRI_C = (0, 1/5, 3/10, 4/5, 8/9, 1)
+DOPRI_A = (
+    (),
+    (1/5,),
+    (3/40, 9/40),
+    (44/45, -56/15, 32/9),
+    (19372/6561, -25360/2187, 64448/6561, -212/729),
+    (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+)
+DOPRI_B = (35/384, 0, 500/1113, 125/192, -2187/6784, 11/84)
+# Різниця між розв'язками 5-го та 4-го порядку (останній коефіцієнт — для стадії FSAL)
+DOPRI_E = (-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40)
+# Коефіцієнти неперервного розширення 4-го порядку (dense output)
+DOPRI_P = (
+    (1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432),
+    (0, 0, 0, 0),
+    (0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799),
+    (0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072),
+    (0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632),
+    (0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844),
+    (0, 40617522/29380423, -110615467/29380423, 69997945/29380423),
+)
+
+
+def _is_diverged(state):
+    return any(abs(v) > MAX_VALUE or math.isnan(v) for v in state)
+
+
+def _combine(state, h, coefficients, stages):
+    """state + h * Σ c_i * k_i для кортежів координат."""
+    return tuple(
+        v + h * sum(c * k[j] for c, k in zip(coefficients, stages) if c)
+        for j, v in enumerate(state)
+    )
+
+
+def _euler_step(rhs, state, h):
+    return tuple(v + h * d for v, d in zip(state, rhs(*state)))
+
+
+def _rk4_step(rhs, state, h):
+    k1 = rhs(*state)
+    k2 = rhs(*_combine(state, h, (0.5,), (k1,)))
+    k3 = rhs(*_combine(state, h, (0.5,), (k2,)))
+    k4 = rhs(*_combine(state, h, (1,), (k3,)))
+    return _combine(state, h, (1/6, 1/3, 1/3, 1/6), (k1, k2, k3, k4))
+
+
+def _dopri_step(rhs, state, h, k1):
+    """
+    Один крок Дормана–Принса. Повертає новий стан і всі сім стадій;
+    остання стадія дорівнює похідній у новому стані (FSAL).
+    """
+    stages = [k1]
+    for a in DOPRI_A[1:]:
+        stages.append(rhs(*_combine(state, h, a, stages)))
+    new_state = _combine(state, h, DOPRI_B, stages)
+    stages.append(rhs(*new_state))
+    return new_state, stages
+
+
+def _dopri_dense(state, h, stages, theta):
+    """Значення розв'язку в точці t + theta * h усередині щойно зробленого кроку."""
+    powers = (theta, theta ** 2, theta ** 3, theta ** 4)
+    weights = tuple(sum(p * q for p, q in zip(row, powers)) for row in DOPRI_P)
+    return _combine(state, h, weights, stages)
+
+
+def _integrate_ode(rhs, state, dt, steps, method, rtol, atol, name, progress=None, settle_tol=None):
+    """
+    Інтегрування неперервної моделі методом euler чи rk4 (фіксований крок dt)
+    або rk45 (адаптивний крок, точки зберігаються через кожні dt
+    за допомогою неперервного розширення).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown integration method: {method}")
+
+    columns = _columns(("x", "y", "z")[:len(state)], steps)
+    buffers = tuple(columns.values())
+    length = steps
+    stable = True
+    period = None
+
+    if method in ("euler", "rk4"):
+        advance = _euler_step if method == "euler" else _rk4_step
+        for step in range(steps):
+            if progress is not None and step % PROGRESS_INTERVAL == 0:
+                progress(step / steps)
+
+            state = advance(rhs, state, dt)
+
+            if _is_diverged(state):
+                print(f"[!] Warning: {name} model diverged at step {step}")
+                stable = False
+                length = step
+                break
+
+            for column, v in zip(buffers, state):
+                column[step] = v
+
+            if settle_tol is not None and step and step % SETTLE_INTERVAL == 0:
+                period = _rest(buffers, step + 1, settle_tol, dt)
+                if period:
+                    length = step + 1
+                    break
+
+        return {
+            "stable": stable,
+            "columns": _trim(columns, length),
+            "period": period
+        }
+
+    t = 0.0
+    t_end = dt * steps
+    h = dt
+    k1 = rhs(*state)
+    sample = 1
+    reported = 0
+    checked = 0
+    attempts = 0
+
+    while sample <= steps:
+        # Між збереженими точками може бути скільки завгодно внутрішніх кроків (великий dt, мала rtol).
+        attempts += 1
+        if progress is not None and attempts % RK45_PROGRESS_INTERVAL == 0:
+            progress((sample - 1) / steps)
+
+        h = min(h, t_end - t)
+        new_state, stages = _dopri_step(rhs, state, h, k1)
+
+        # --- Оцінка локальної похибки ---
+        error = math.sqrt(sum(
+            (h * sum(e * k[j] for e, k in zip(DOPRI_E, stages) if e)
+             / (atol + rtol * max(abs(v), abs(w)))) ** 2
+            for j, (v, w) in enumerate(zip(state, new_state))
+        ) / len(state))
+
+        if math.isnan(error) or error > 1:
+            factor = 0.2 if math.isnan(error) else max(0.2, 0.9 * error ** -0.2)
+            h *= factor
+            if h < MIN_STEP:
+                print(f"[!] Warning: {name} model step size underflow at t={t}")
+                stable = False
+                length = sample - 1
+                break
+            continue
+
+        # --- Точки, що потрапили всередину прийнятого кроку ---
+        diverged = False
+        while sample <= steps and sample * dt <= t + h + 1e-12 * dt:
+            point = _dopri_dense(state, h, stages, (sample * dt - t) / h)
+            if _is_diverged(point):
+                diverged = True
+                break
+            for column, v in zip(buffers, point):
+                column[sample - 1] = v
+            sample += 1
+
+        if diverged:
+            print(f"[!] Warning: {name} model diverged at step {sample - 1}")
+            stable = False
+            length = sample - 1
             break
 
-        result.append((x, y, z))
+        if progress is not None and sample - 1 - reported >= PROGRESS_INTERVAL:
+            reported = sample - 1
+            progress(reported / steps)
+
+        if settle_tol is not None and sample - 1 - checked >= SETTLE_INTERVAL:
+            checked = sample - 1
+            period = _rest(buffers, checked, settle_tol, dt)
+            if period:
+                length = checked
+                break
+
+        t += h
+        state, k1 = new_state, stages[-1]
+        h *= min(5.0, 0.9 * error ** -0.2) if error > 0 else 5.0
 
     return {
         "stable": stable,
-        "points": result
-    }
\ No newline at end of file
+        "columns": _trim(columns, length),
+        "period": period
+    }
+
+
+# ------------------------------
+# 5. Ансамблі траєкторій (NumPy)
+# ------------------------------
+def _integrate_ensemble(step, initial, steps, name, progress=None):
+    """
+    Спільний цикл для ансамблевого режиму: усі N траєкторій
+    просуваються одночасно як масив форми (N, dim).
+
+    step — функція, що приймає масив (N, dim) і повертає новий стан
+    initial — масив початкових умов форми (N, dim)
+    progress — колбек progress(частка), викликається кожні ENSEMBLE_PROGRESS_INTERVAL кроків
+
+    Повертає:
+        stable — булева маска (N,) траєкторій, що не розійшлися
+        lengths — кількість збережених точок для кожної траєкторії
+        columns — масив (dim, N, steps): columns[j, i] — неперервна колонка
+                  осі j для траєкторії i; після розбіжності заповнена NaN
+                  і має бути обрізана за lengths
+    """
+    state = np.array(initial, dtype=float)
+    if state.ndim != 2:
+        raise ValueError("initial conditions must be an (N, dim) array")
+
+    count, dim = state.shape
+    columns = np.full((dim, count, steps), np.nan)
+    alive = np.ones(count, dtype=bool)
+    lengths = np.full(count, steps, dtype=np.int64)
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        for i in range(steps):
+            if progress is not None and i % ENSEMBLE_PROGRESS_INTERVAL == 0:
+                progress(i / steps)
+
+            new_state = step(state)
+
+            # --- Перевірка стабільності для кожної траєкторії ---
+            diverged = alive & ~(np.abs(new_state) <= MAX_VALUE).all(axis=1)
+            if diverged.any():
+                lengths[diverged] = i
+                alive &= ~diverged
+
+            if not alive.any():
+                break
+
+            state = new_state
+            columns[:, alive, i] = state[alive].T
+
+    if not alive.all():
+        print(f"[!] Warning: {name} ensemble: {count - int(alive.sum())} of {count} trajectories diverged")
+
+    return {
+        "stable": alive,
+        "lengths": lengths,
+        "columns": columns
+    }
+
+
+def _ensemble_stepper(rhs, dt, method):
+    """Крок ансамблю для неперервної моделі: явний Ейлер або rk4."""
+    if method == "euler":
+        return lambda state: state + rhs(state) * dt
+    if method == "rk4":
+        def step(state):
+            k1 = rhs(state)
+            k2 = rhs(state + 0.5 * dt * k1)
+            k3 = rhs(state + 0.5 * dt * k2)
+            k4 = rhs(state + dt * k3)
+            return state + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        return step
+    raise ValueError(f"Ensembles support only euler and rk4 methods, got: {method}")
+
+
+# ------------------------------
+# 6. Біфуркаційні діаграми
+# ------------------------------
+def _sweep(step, initial, count, transient, samples, record, progress=None):
+    """
+    Інтегрує count копій системи з однаковою початковою умовою (кожна — зі
+    своїм значенням параметра), відкидає перші transient кроків і передає
+    кожен наступний стан у record(step, state, alive).
+
+    Повертає булеву маску (count,) значень параметра без розбіжності.
+    """
+    state = np.tile(np.asarray(initial, dtype=float), (count, 1))
+    alive = np.ones(count, dtype=bool)
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        for i in range(transient + samples):
+            if progress is not None and i % ENSEMBLE_PROGRESS_INTERVAL == 0:
+                progress(i / (transient + samples))
+
+            new_state = step(state)
+
+            # --- Розбіжні траєкторії зупиняються на останньому скінченному стані ---
+            alive &= (np.abs(new_state) <= MAX_VALUE).all(axis=1)
+            if not alive.any():
+                break
+            state = np.where(alive[:, None], new_state, state)
+
+            if i >= transient:
+                record(i - transient, state, alive)
+
+    return alive
+
+
+def _grouped(indices, values):
+    """Об'єднує записані порції у плоскі масиви, впорядковані за номером параметра."""
+    if not indices:
+        return np.array([], dtype=np.int64), np.array([], dtype=float)
+    indices, values = np.concatenate(indices), np.concatenate(values)
+    order = np.argsort(indices, kind="stable")
+    return indices[order], values[order]
+
+
+def map_bifurcation(step, initial, count, transient=1000, samples=200, progress=None):
+    """
+    Біфуркаційна діаграма дискретного відображення: step — векторизований крок
+    для count копій, параметри якого можуть бути масивами (count,) значень.
+    Після transient ітерацій записуються samples значень першої змінної
+    (для Хенона — x) для кожного значення параметра.
+
+    Повертає:
+        stable — маска (count,) параметрів без розбіжності
+        index — номер параметра для кожної записаної точки
+        values — записані значення
+    """
+    indices, values = [], []
+
+    def record(i, state, alive):
+        indices.append(np.flatnonzero(alive))
+        values.append(state[alive, 0])
+
+    stable = _sweep(step, initial, count, transient, samples, record, progress)
+    index, value = _grouped(indices, values)
+    return {"stable": stable, "index": index, "values": value}
+
+
+def flow_bifurcation(rhs, initial, count, dt=0.01, method="euler", transient=5000, samples=5000, progress=None):
+    """
+    Біфуркаційна діаграма неперервної системи: rhs — векторизована права
+    частина, як у map_bifurcation. Після transient кроків протягом samples
+    кроків записуються локальні максимуми останньої змінної (для Лоренца —
+    відображення z_max), формат результату — як у map_bifurcation.
+    """
+    indices, values = [], []
+    history = {}
+
+    def record(i, state, alive):
+        last = state[:, -1]
+        if i >= 2:
+            peak = alive & (history["v1"] > history["v2"]) & (history["v1"] >= last)
+            indices.append(np.flatnonzero(peak))
+            values.append(history["v1"][peak])
+        history["v2"], history["v1"] = history.get("v1"), last
+
+    stable = _sweep(_ensemble_stepper(rhs, dt, method), initial, count, transient, samples, record, progress)
+    index, value = _grouped(indices, values)
+    return {"stable": stable, "index": index, "values": value}
+
+
+# ------------------------------
+# 7. Довільні системи (див. registry.py)
+# ------------------------------
+def flow(rhs, initial, dt=0.01, steps=1000, method="euler", rtol=RTOL, atol=ATOL,
+         name="Flow", progress=None, settle_tol=None):
+    """
+    Неперервна система з правою частиною rhs(*state) -> кортеж похідних.
+    Параметри та результат — як у lorenz_attractor.
+    """
+    return _integrate_ode(rhs, tuple(initial), dt, steps, method, rtol, atol, name, progress, settle_tol)
+
+
+def iterate(step, initial, steps=1000, name="Map", progress=None, settle_tol=None):
+    """
+    Дискретне відображення step(*state) -> наступний стан.
+    Параметри та результат — як у henon_map.
+    """
+    state = tuple(initial)
+    columns = _columns(("x", "y", "z")[:len(state)], steps)
+    buffers = tuple(columns.values())
+    length = steps
+    stable = True
+    period = None
+
+    for i in range(steps):
+        if progress is not None and i % PROGRESS_INTERVAL == 0:
+            progress(i / steps)
+
+        state = step(*state)
+
+        if _is_diverged(state):
+            print(f"[!] Warning: {name} map diverged at step {i}")
+            stable = False
+            length = i
+            break
+
+        for column, v in zip(buffers, state):
+            column[i] = v
+
+        if settle_tol is not None and i and i % SETTLE_INTERVAL == 0:
+            period = _period(buffers, i + 1, settle_tol, MAX_PERIOD)
+            if period:
+                length = i + 1
+                break
+
+    return {
+        "stable": stable,
+        "columns": _trim(columns, length),
+        "period": period
+    }
+
+
+def flow_ensemble(rhs, initial, dt=0.01, steps=1000, method="euler", name="Flow", progress=None):
+    """Ансамбль неперервної системи; rhs приймає і повертає масив (N, dim)."""
+    return _integrate_ensemble(_ensemble_stepper(rhs, dt, method), initial, steps, name, progress)
+
+
+def map_ensemble(step, initial, steps=1000, name="Map", progress=None):
+    """Ансамбль дискретного відображення; step приймає і повертає масив (N, dim)."""
+    return _integrate_ensemble(step, initial, steps, name, progress)
+
+
+# ------------------------------
+# 8. Чутливість до початкових умов
+# ------------------------------
+def stepper(rhs, dt, method="euler"):
+    """Один крок неперервної системи rhs(*state) для twin: явний Ейлер або rk4."""
+    if method == "euler":
+        return lambda state: _euler_step(rhs, state, dt)
+    if method == "rk4":
+        return lambda state: _rk4_step(rhs, state, dt)
+    raise ValueError(f"Twin trajectories support only euler and rk4 methods, got: {method}")
+
+
+def twin(advance, initial, steps=1000, perturbation=TWIN_PERTURBATION, interval=TWIN_INTERVAL, dt=1.0,
+         name="Twin", progress=None):
+    """
+    Еталонна траєкторія та збурена (зсунута на perturbation однаково по всіх осях)
+    крокують разом: advance(state) -> наступний стан, для відображень dt = 1.
+    Кожні interval кроків вимірюється відстань d між ними, а збурена траєкторія
+    повертається на відстань perturbation уздовж того ж напрямку (перенормування
+    Бенеттіна), тож відстань ніколи не насичується розміром аттрактора.
+
+    Повертає:
+        stable — чи не розбіглася жодна з траєкторій
+        time — момент кожного перенормування
+        separation — ln відстані, накопиченої без перенормувань: ln perturbation + Σ ln(d / perturbation)
+        lyapunov — оцінка найбільшого показника Ляпунова: нахил separation за часом
+    """
+    reference = tuple(float(v) for v in initial)
+    offset = perturbation / math.sqrt(len(reference))
+    perturbed = tuple(v + offset for v in reference)
+    times, separation = array("d"), array("d")
+    growth = 0.0
+    measured = 0
+    stable = True
+
+    for step in range(1, steps + 1):
+        if progress is not None and step % PROGRESS_INTERVAL == 0:
+            progress(step / steps)
+
+        reference = advance(reference)
+        perturbed = advance(perturbed)
+
+        if _is_diverged(reference) or _is_diverged(perturbed):
+            print(f"[!] Warning: {name} twin trajectories diverged at step {step}")
+            stable = False
+            break
+
+        if step % interval and step != steps:
+            continue
+
+        distance = math.dist(reference, perturbed)
+        if distance == 0:
+            # Траєкторії злилися (наприклад, на нерухомій точці): починаємо збурення заново.
+            distance = 1e-300
+            perturbed = tuple(v + offset for v in reference)
+        else:
+            scale = perturbation / distance
+            perturbed = tuple(r + (p - r) * scale for r, p in zip(reference, perturbed))
+
+        growth += math.log(distance / perturbation)
+        measured = step
+        times.append(step * dt)
+        separation.append(math.log(perturbation) + growth)
+
+    return {
+        "stable": stable,
+        "time": times,
+        "separation": separation,
+        "lyapunov": growth / (measured * dt) if measured else None,
+    }
+
+
+def twin_ensemble(step, initial, count, steps=1000, perturbation=TWIN_PERTURBATION, interval=TWIN_INTERVAL,
+                  dt=1.0, transient=0):
+    """
+    twin для count незалежних систем разом (наприклад, для сітки параметрів):
+    step — крок ансамблю для масиву (2 * count, dim), де перші count рядків —
+    еталонні траєкторії, а наступні count — збурені; параметри step мають бути
+    масивами (2 * count,) з тими самими значеннями для обох половин.
+    initial — спільний початковий стан (dim,). Перші transient кроків
+    лише наближають траєкторії до аттрактора, і тільки потім додається збурення.
+
+    Повертає:
+        stable — маска (count,) систем, траєкторії яких не розбіглися
+        lyapunov — оцінки (count,) найбільшого показника Ляпунова, NaN для розбіжних
+    """
+    reference = np.tile(np.asarray(initial, dtype=float), (count, 1))
+    dim = reference.shape[1]
+    offset = perturbation / math.sqrt(dim)
+    alive = np.ones(count, dtype=bool)
+    growth = np.zeros(count)
+    measured = 0
+
+    def check(state):
+        # Розбіжні системи «паркуються» в нулі, щоб не рахувати далі з inf і NaN.
+        finite = (np.abs(state) <= MAX_VALUE).all(axis=1)
+        alive[:] &= finite[:count] & finite[count:]
+        state[np.concatenate([~alive, ~alive])] = 0.0
+
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        state = np.concatenate([reference, reference])
+        for i in range(1, transient + 1):
+            state = step(state)
+            if i % interval == 0:
+                check(state)
+        check(state)
+        state[count:] = state[:count] + offset
+
+        for i in range(1, steps + 1):
+            state = step(state)
+            if i % interval and i != steps:
+                continue
+
+            check(state)
+            delta = state[count:] - state[:count]
+            distance = np.sqrt((delta * delta).sum(axis=1))
+            merged = distance == 0
+            distance[merged] = 1e-300
+            growth += np.log(distance / perturbation)
+            state[count:] = np.where(
+                merged[:, None], state[:count] + offset, state[:count] + delta * (perturbation / distance)[:, None]
+            )
+            measured = i
+
+    lyapunov = growth / (measured * dt) if measured else np.full(count, np.nan)
+    return {"stable": alive, "lyapunov": np.where(alive, lyapunov, np.nan)}
+
+
+def flow_twin_ensemble(rhs, initial, count, dt=0.01, method="euler", **options):
+    """twin_ensemble для неперервної моделі: rhs — векторизована права частина."""
+    return twin_ensemble(_ensemble_stepper(rhs, dt, method), initial, count, dt=dt, **options)
+
+
+# ------------------------------
+# 9. Перерізи Пуанкаре та відображення максимумів
+# ------------------------------
+def _hermite(s0, s1, f0, f1, h, theta):
+    """
+    Кубічний ермітів сплайн кроку s0 -> s1 з похідними f0, f1: стан у точці
+    theta ∈ [0, 1] і його похідна за theta.
+    """
+    t2 = theta * theta
+    t3 = t2 * theta
+    h00, h10, h01, h11 = 2 * t3 - 3 * t2 + 1, t3 - 2 * t2 + theta, 3 * t2 - 2 * t3, t3 - t2
+    d00, d10, d11 = 6 * t2 - 6 * theta, 3 * t2 - 4 * theta + 1, 3 * t2 - 2 * theta
+    state = tuple(h00 * a + h10 * h * fa + h01 * b + h11 * h * fb for a, b, fa, fb in zip(s0, s1, f0, f1))
+    slope = tuple(d00 * (a - b) + d10 * h * fa + d11 * h * fb for a, b, fa, fb in zip(s0, s1, f0, f1))
+    return state, slope
+
+
+def _crossing(rhs, s0, s1, axis, value, h):
+    """Точка перетину площини state[axis] = value між станами кроку s0 і s1 (по різні боки площини)."""
+    f0, f1 = rhs(*s0), rhs(*s1)
+    theta = (value - s0[axis]) / (s1[axis] - s0[axis])
+    for _ in range(SECTION_ITERATIONS):
+        state, slope = _hermite(s0, s1, f0, f1, h, theta)
+        if slope[axis] == 0:
+            break
+        theta = min(max(theta - (state[axis] - value) / slope[axis], 0.0), 1.0)
+    return _hermite(s0, s1, f0, f1, h, theta)[0]
+
+
+def poincare_section(rhs, initial, axis=2, value=0.0, direction=1, dt=0.01, steps=1000, method="euler",
+                     name="Flow", progress=None):
+    """
+    Переріз Пуанкаре неперервної системи rhs(*state) площиною state[axis] = value.
+    Зберігаються лише точки перетину: якщо стани кроку лежать по різні боки
+    площини, момент перетину уточнюється ітераціями Ньютона по кубічному
+    ермітовому сплайну кроку (похідні — з rhs), тож точка лежить на площині
+    з точністю, не гіршою за сам метод. direction: 1 — лише перетини в бік
+    зростання state[axis], -1 — в бік спадання, 0 — обидва.
+
+    Повертає:
+        stable — чи не розбіглася траєкторія
+        columns — координати точок перетину
+    """
+    advance = stepper(rhs, dt, method)
+    state = tuple(float(v) for v in initial)
+    columns = {variable: array("d") for variable in ("x", "y", "z")[:len(state)]}
+    buffers = tuple(columns.values())
+    stable = True
+
+    for step in range(1, steps + 1):
+        if progress is not None and step % PROGRESS_INTERVAL == 0:
+            progress(step / steps)
+
+        previous, state = state, advance(state)
+
+        if _is_diverged(state):
+            print(f"[!] Warning: {name} section diverged at step {step}")
+            stable = False
+            break
+
+        before, after = previous[axis] - value, state[axis] - value
+        if (direction >= 0 and before < 0 <= after) or (direction <= 0 and before > 0 >= after):
+            for column, v in zip(buffers, _crossing(rhs, previous, state, axis, value, dt)):
+                column.append(v)
+
+    return {"stable": stable, "columns": columns}
+
+
+def return_map(rhs, initial, axis=2, dt=0.01, steps=1000, method="euler", name="Flow", progress=None):
+    """
+    Послідовні локальні максимуми state[axis] (для Лоренца — відображення
+    z_max(n) -> z_max(n + 1)). Вершина максимуму уточнюється параболою через
+    три сусідні стани, тож вона не прив'язана до сітки кроків.
+
+    Повертає:
+        stable — чи не розбіглася траєкторія
+        maxima — значення послідовних максимумів
+    """
+    advance = stepper(rhs, dt, method)
+    state = tuple(float(v) for v in initial)
+    maxima = array("d")
+    before, current = None, state[axis]
+    stable = True
+
+    for step in range(1, steps + 1):
+        if progress is not None and step % PROGRESS_INTERVAL == 0:
+            progress(step / steps)
+
+        state = advance(state)
+
+        if _is_diverged(state):
+            print(f"[!] Warning: {name} return map diverged at step {step}")
+            stable = False
+            break
+
+        after = state[axis]
+        if before is not None and before < current >= after:
+            # Кривизна (before - 2 * current + after) тут завжди від'ємна.
+            maxima.append(current - (after - before) ** 2 / (8 * (before - 2 * current + after)))
+        before, current = current, after
+
+    return {"stable": stable, "maxima": maxima}
@@ -0,0 +1,257 @@
+"""
+Declarative registry of dynamical systems.
+
+Every system declares its kind (a continuous `flow` or a discrete `map`),
+state variables, parameters with defaults, the right-hand side (or next
+state) of every variable as an expression, and a default initial state.
+Expressions may use the variables, the parameters, numbers, arithmetic
+operators and the functions in `FUNCTIONS`; they are parsed and checked
+once, then compiled into a scalar kernel for single trajectories and a
+vectorized NumPy kernel for ensembles. Compiled kernels are cached.
+
+Systems that name a hand-written `kernel` in `physics` (Lorenz, Henon,
+Thomas) keep using it for single trajectories; every other system runs on the
+generic `physics.flow` / `physics.iterate` engines. All of them use the
+compiled NumPy kernels for ensembles.
+"""
+import ast
+import keyword
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from . import physics
+
+FLOW = "flow"
+MAP = "map"
+VARIABLES = ("x", "y", "z")
+FUNCTIONS = ("sin", "cos", "tan", "exp", "log", "sqrt", "tanh", "sinh", "cosh", "arctan", "abs")
+CONSTANTS = {"pi": math.pi, "e": math.e}
+MAX_EXPRESSION_LENGTH = 500
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod, ast.USub, ast.UAdd,
+)
+_SCALAR_NAMESPACE = {
+    **{name: getattr(math, name) for name in FUNCTIONS if hasattr(math, name)},
+    "arctan": math.atan, "abs": abs, **CONSTANTS, "__builtins__": {},
+}
+_VECTOR_NAMESPACE = {
+    **{name: getattr(np, name) for name in FUNCTIONS}, **CONSTANTS, "_empty_like": np.empty_like, "__builtins__": {},
+}
+
+
+def parse_expression(source, names):
+    """
+    Parses one right-hand side expression and checks that it only uses the
+    allowed syntax and `names`. Returns the normalized source text.
+    """
+    if not isinstance(source, str) or len(source) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"Expressions must be strings of at most {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression {source!r}: {e.msg}") from None
+
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in expression {source!r}: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool) or not isinstance(node.value, (int, float))):
+            raise ValueError(f"Only numeric constants are allowed in expression {source!r}")
+        if isinstance(node, ast.Call) and (
+            not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords or len(node.args) != 1
+        ):
+            raise ValueError(f"Only one-argument calls of {', '.join(FUNCTIONS)} are allowed in {source!r}")
+        if isinstance(node, ast.Name) and node.id not in names and node.id not in FUNCTIONS and node.id not in CONSTANTS:
+            raise ValueError(f"Unknown name {node.id!r} in expression {source!r}")
+
+    return ast.unparse(tree)
+
+
+@lru_cache(maxsize=None)
+def compile_kernel(variables, parameters, expressions, vectorized):
+    """
+    Compiles checked expressions into a factory: called with the parameter
+    values, it returns the kernel. Scalar kernels take the state variables as
+    arguments and return a tuple; vectorized kernels take and return an
+    (N, dim) array, and their parameters may be scalars or (N,) arrays.
+    """
+    names = set(variables) | set(parameters)
+    bodies = [parse_expression(expression, names) for expression in expressions]
+    arguments = ", ".join(parameters)
+
+    if vectorized:
+        lines = [f"def make({arguments}):", "    def kernel(state):"]
+        lines += [f"        {variable} = state[:, {j}]" for j, variable in enumerate(variables)]
+        lines += ["        out = _empty_like(state)"]
+        lines += [f"        out[:, {j}] = {body}" for j, body in enumerate(bodies)]
+        lines += ["        return out", "    return kernel"]
+        namespace = dict(_VECTOR_NAMESPACE)
+    else:
+        lines = [
+            f"def make({arguments}):",
+            f"    def kernel({', '.join(variables)}):",
+            f"        return ({', '.join(bodies)},)",
+            "    return kernel",
+        ]
+        namespace = dict(_SCALAR_NAMESPACE)
+
+    exec(compile("\n".join(lines), "<simulation system>", "exec"), namespace)
+    return namespace["make"]
+
+
+class System:
+    def __init__(self, name, label, kind, parameters, expressions, initial, required=("initial",), dt=0.01,
+                 kernel=None):
+        self.name = name
+        self.label = label
+        self.kind = kind
+        self.parameters = dict(parameters)
+        self.variables = VARIABLES[:len(expressions)]
+        self.expressions = tuple(expressions)
+        self.initial = list(initial)
+        self.required = tuple(required)
+        self.dt = dt
+        self.kernel = kernel
+
+        for parameter in self.parameters:
+            if (not parameter.isidentifier() or keyword.iskeyword(parameter) or parameter.startswith("_")
+                    or parameter in VARIABLES or parameter in FUNCTIONS or parameter in CONSTANTS):
+                raise ValueError(f"Invalid parameter name for {name}: {parameter!r}")
+
+        # Checks the declaration once, at import time.
+        for vectorized in (False, True):
+            compile_kernel(self.variables, tuple(self.parameters), self.expressions, vectorized)
+
+    @property
+    def function(self):
+        """Single-trajectory function: the hand-written `physics` kernel if there is one, else `integrate`."""
+        return getattr(physics, self.kernel) if self.kernel else self.integrate
+
+    @property
+    def title(self):
+        return self.label.split()[0]
+
+    @property
+    def dimension(self):
+        return len(self.variables)
+
+    def values(self, params):
+        """Parameter values from a request's `params`, defaults filled in."""
+        return {name: float(params.get(name, default)) for name, default in self.parameters.items()}
+
+    def scalar(self, values):
+        return compile_kernel(self.variables, tuple(self.parameters), self.expressions, False)(**values)
+
+    def vector(self, values):
+        return compile_kernel(self.variables, tuple(self.parameters), self.expressions, True)(**values)
+
+    def integrate(self, *initial, steps=1000, progress=None, dt=None, method="euler", rtol=physics.RTOL,
+                  atol=physics.ATOL, settle_tol=None, **values):
+        """Single trajectory on the generic engines; same signature and result as the `physics` kernels."""
+        if self.kind == MAP:
+            return physics.iterate(self.scalar(values), initial, steps, self.title, progress, settle_tol)
+        return physics.flow(
+            self.scalar(values), initial, self.dt if dt is None else dt, steps, method, rtol, atol,
+            self.title, progress, settle_tol,
+        )
+
+    def ensemble(self, initial, steps=1000, dt=None, method="euler", progress=None, **values):
+        if self.kind == MAP:
+            return physics.map_ensemble(self.vector(values), initial, steps, self.title, progress)
+        return physics.flow_ensemble(self.vector(values), initial, self.dt if dt is None else dt, steps, method,
+                                     self.title, progress)
+
+    def bifurcation(self, initial, transient=1000, samples=1000, dt=None, method="euler", progress=None, **values):
+        """
+        Parameter sweep: `values` may hold (P,) arrays, one copy of the system runs per value
+        (see `physics.map_bifurcation` and `physics.flow_bifurcation`).
+        """
+        count = np.broadcast(*values.values()).size
+        vector = self.vector(values)
+        if self.kind == MAP:
+            return physics.map_bifurcation(vector, initial, count, transient, samples, progress)
+        return physics.flow_bifurcation(
+            vector, initial, count, self.dt if dt is None else dt, method, transient, samples, progress
+        )
+
+    def lyapunov(self, initial, count, steps=1000, dt=None, method="euler", **options):
+        """
+        Largest Lyapunov exponents of `count` copies started at `initial`, whose
+        parameter values in `options` may be (count,) arrays (see `physics.twin_ensemble`).
+        """
+        values = {name: options.pop(name, default) for name, default in self.parameters.items()}
+        # The reference and the perturbed copies are stacked in one (2 * count, dim) ensemble.
+        vector = self.vector({name: np.tile(value, 2) if np.ndim(value) else value for name, value in values.items()})
+        if self.kind == MAP:
+            return physics.twin_ensemble(vector, initial, count, steps, **options)
+        return physics.flow_twin_ensemble(
+            vector, initial, count, self.dt if dt is None else dt, method, steps=steps, **options
+        )
+
+
+SYSTEMS = {}
+
+
+def register(system):
+    SYSTEMS[system.name] = system
+    return system
+
+
+def get(name):
+    try:
+        return SYSTEMS[name]
+    except KeyError:
+        raise ValueError(f"Unknown model: {name}") from None
+
+
+def choices():
+    """`(member name, (value, label))` pairs for `Simulation.ModelTypes`."""
+    return [(name.upper(), (name, system.label)) for name, system in SYSTEMS.items()]
+
+
+register(System(
+    "lorenz", "Lorenz Attractor", FLOW,
+    parameters={"sigma": 10.0, "rho": 28.0, "beta": 8 / 3},
+    expressions=("sigma * (y - x)", "x * (rho - z) - y", "x * y - beta * z"),
+    initial=[1, 1, 1],
+    required=("sigma", "rho", "beta", "initial"),
+    kernel="lorenz_attractor",
+))
+register(System(
+    "henon", "Henon Map", MAP,
+    parameters={"a": 1.4, "b": 0.3},
+    expressions=("1 - a * x * x + y", "b * x"),
+    initial=[0.1, 0.3],
+    required=("a", "b", "initial"),
+    kernel="henon_map",
+))
+register(System(
+    "thomas", "Thomas Attractor", FLOW,
+    parameters={"b": 0.18},
+    expressions=("-b * x + sin(y)", "-b * y + sin(z)", "-b * z + sin(x)"),
+    initial=[1, 1, 1],
+    required=("b", "initial"),
+    kernel="thomas_attractor",
+))
+register(System(
+    "rossler", "Rossler Attractor", FLOW,
+    parameters={"a": 0.2, "b": 0.2, "c": 5.7},
+    expressions=("-y - z", "x + a * y", "b + z * (x - c)"),
+    initial=[1, 1, 1],
+))
+register(System(
+    "chen", "Chen Attractor", FLOW,
+    parameters={"a": 35.0, "b": 3.0, "c": 28.0},
+    expressions=("a * (y - x)", "(c - a) * x - x * z + c * y", "x * y - b * z"),
+    initial=[-0.1, 0.5, -0.6],
+    dt=0.002,
+))
+register(System(
+    "duffing", "Duffing Map", MAP,
+    parameters={"a": 2.75, "b": 0.2},
+    expressions=("y", "-b * x + a * y - y ** 3"),
+    initial=[0.1, 0.1],
+))
@@ -0,0 +1,107 @@
+import json
+import struct
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer
+
+from .encoders import TrajectoryJSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """One JSON document per line; `encode` is also used for every chunk of a stream."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def encode(self, event, data):
+        return json.dumps({"event": event, **data}, cls=TrajectoryJSONEncoder) + "\n"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.encode("error", data).encode()
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Prometheus text exposition format; the view returns the rendered text. Errors stay plain text too."""
+
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode()
+        return "\n".join(f"# {key}: {value}" for key, value in data.items()).encode() + b"\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Server-sent events: the event name goes to `event:`, the payload to `data:`."""
+
+    media_type = "text/event-stream"
+    format = "sse"
+
+    def encode(self, event, data):
+        return f"event: {event}\ndata: {json.dumps(data, cls=TrajectoryJSONEncoder)}\n\n"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.encode("error", data).encode()
+
+
+class TrajectoryBinaryRenderer(BaseRenderer):
+    """
+    Little-endian columnar trajectories for `SimulationDetailView`:
+
+        b"TRAJ", uint32 header length, UTF-8 JSON header, padding to 8 bytes,
+        then every column back to back, each padded to a multiple of 8 bytes.
+
+    The header is the detail response without the coordinate columns; its
+    `columns` list gives the name, dtype, offset (from the end of the padded
+    header) and length of each column. Coordinates use `?dtype=` (float32 by
+    default), `index` is uint32. Ensembles are concatenated and get `lengths`.
+    A density map is one uint32 `density` column of `bins` × `bins` counts, row-major.
+    """
+
+    media_type = "application/x-trajectory"
+    format = "binary"
+    charset = None
+    render_style = "binary"
+
+    MAGIC = b"TRAJ"
+    COLUMNS = ("x", "y", "z", "index", "density")
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        request = (renderer_context or {}).get("request")
+        dtype = request.query_params.get("dtype", "float32") if request is not None else "float32"
+        header = dict(data or {})
+        results = dict(header.pop("results", None) or {})
+
+        arrays = []
+        for name in self.COLUMNS:
+            if name not in results:
+                continue
+            column = results.pop(name)
+            if isinstance(column, list) and column and hasattr(column[0], "__len__"):
+                results.setdefault("lengths", [len(part) for part in column])
+                column = np.concatenate(column)
+            if name == "density":
+                arrays.append((name, np.asarray(column).astype("<u4").ravel()))
+                continue
+            arrays.append((name, np.asarray(column).astype("<u4" if name == "index" else np.dtype(dtype).newbyteorder("<"))))
+
+        if results:
+            header["results"] = results
+        header["columns"] = []
+        offset = 0
+        for name, array in arrays:
+            header["columns"].append({"name": name, "dtype": array.dtype.str, "offset": offset, "length": len(array)})
+            offset += _padded(array.nbytes)
+
+        encoded = json.dumps(header, cls=TrajectoryJSONEncoder).encode()
+        parts = [self.MAGIC, struct.pack("<I", len(encoded)), encoded, bytes(_padded(8 + len(encoded)) - 8 - len(encoded))]
+        for _, array in arrays:
+            parts.append(array.tobytes())
+            parts.append(bytes(_padded(array.nbytes) - array.nbytes))
+        return b"".join(parts)
+
+
+def _padded(size):
+    return -(-size // 8) * 8
@@ -0,0 +1,208 @@
+"""
+Content-addressed cache of computed trajectories.
+
+Validated create payloads are canonicalized (defaults filled in, numbers
+normalized to floats, options that do not affect the result dropped) and
+hashed; identical requests from any user reuse the stored blob instead of
+integrating again. Entries are evicted least-recently-used first once their
+total size exceeds `SIMULATION_RESULT_CACHE_MAX_BYTES`.
+
+Keys include `RESULT_VERSION`: bump it whenever the integrators, the registry
+or the stored format change what a given input produces, so entries computed
+by older code are no longer hit (they age out through eviction).
+"""
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import jobs, storage, timing
+from .models import ResultCacheCounter, ResultCacheEntry
+from .runner import run_simulation, simulation_call
+from .serializers import OUTPUTS
+
+COUNTERS = ("hits", "misses", "evictions")
+RESULT_VERSION = 1
+
+
+def canonical_input(validated_data):
+    _, initial, kwargs = simulation_call(validated_data)
+    if kwargs.get("method", "euler") != "rk45":
+        kwargs.pop("rtol", None)
+        kwargs.pop("atol", None)
+
+    return {
+        "version": RESULT_VERSION,
+        "model": str(validated_data.get("model")),
+        "steps": int(validated_data.get("steps")),
+        "initial": [float(v) for v in initial],
+        "params": {name: float(v) if isinstance(v, (int, float)) else v for name, v in kwargs.items()},
+        "dtype": settings.SIMULATION_RESULTS_DTYPE,
+        **{output: dict(validated_data[output]) for output in OUTPUTS if validated_data.get(output)},
+    }
+
+
+def result_key(validated_data):
+    canonical = json.dumps(canonical_input(validated_data), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _count(name, amount=1):
+    if not ResultCacheCounter.objects.filter(name=name).update(value=F("value") + amount):
+        try:
+            ResultCacheCounter.objects.create(name=name, value=amount)
+        except IntegrityError:
+            ResultCacheCounter.objects.filter(name=name).update(value=F("value") + amount)
+
+
+def get(key):
+    entry = ResultCacheEntry.objects.filter(key=key).first()
+    if entry is None:
+        _count("misses")
+        return None
+
+    ResultCacheEntry.objects.filter(pk=entry.pk).update(hits=F("hits") + 1, last_used_at=timezone.now())
+    _count("hits")
+    return entry
+
+
+def put(key, packed, stable):
+    trajectory, overview = packed["trajectory"], packed["overview"]
+    metadata = {name: value for name, value in packed["results"].items() if name != "color"}
+    ResultCacheEntry.objects.get_or_create(key=key, defaults={
+        "results": metadata,
+        "trajectory": trajectory,
+        "overview": overview,
+        "is_stable": stable,
+        "size": len(trajectory or b"") + len(overview or b""),
+    })
+    evict()
+
+
+def evict(max_bytes=None):
+    max_bytes = settings.SIMULATION_RESULT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    total = ResultCacheEntry.objects.aggregate(total=Sum("size"))["total"] or 0
+    if total <= max_bytes:
+        return 0
+
+    evicted = []
+    for pk, size in ResultCacheEntry.objects.order_by("last_used_at").values_list("pk", "size").iterator():
+        if total <= max_bytes:
+            break
+        evicted.append(pk)
+        total -= size
+
+    ResultCacheEntry.objects.filter(pk__in=evicted).delete()
+    _count("evictions", len(evicted))
+    return len(evicted)
+
+
+def _run(validated_data, progress=None):
+    results, stable = run_simulation(validated_data, progress=progress)
+    with timing.phase("pack"):
+        return storage.pack_results(results), stable
+
+
+def _stored(entry, color):
+    results = {**entry.results, "color": color}
+    return {
+        "results": results, "trajectory": entry.trajectory, "overview": entry.overview,
+        **storage.settled(results),
+    }, entry.is_stable
+
+
+def cached_simulation(validated_data, progress=None):
+    """
+    `run_simulation` behind the cache. Returns the `Simulation` storage kwargs
+    (`results`, `trajectory`) and the stability flag.
+    """
+    if not settings.SIMULATION_RESULT_CACHE_MAX_BYTES:
+        return _run(validated_data, progress)
+
+    with timing.phase("cache"):
+        key = result_key(validated_data)
+        entry = get(key)
+    if entry is not None:
+        return _stored(entry, validated_data.get("color"))
+
+    packed, stable = _run(validated_data, progress)
+    with timing.phase("cache"):
+        put(key, packed, stable)
+    return packed, stable
+
+
+async def acached_simulation(validated_data, progress=None):
+    """`cached_simulation` for async views: the run goes to the compute pool (`jobs.offload`)."""
+    if not settings.SIMULATION_RESULT_CACHE_MAX_BYTES:
+        return await jobs.offload(_run, validated_data, progress)
+
+    with timing.phase("cache"):
+        key = result_key(validated_data)
+        entry = await sync_to_async(get)(key)
+    if entry is not None:
+        return _stored(entry, validated_data.get("color"))
+
+    packed, stable = await jobs.offload(_run, validated_data, progress)
+    with timing.phase("cache"):
+        await sync_to_async(put)(key, packed, stable)
+    return packed, stable
+
+
+def cached_batch(items, run_many):
+    """
+    `cached_simulation` for a list of validated payloads. Cache misses (once
+    per distinct input) are computed together by `run_many(payloads)`, which
+    returns `(packed, stable)` or an exception per payload; so does this.
+    """
+    if not settings.SIMULATION_RESULT_CACHE_MAX_BYTES:
+        return run_many(items)
+
+    keys = [result_key(item) for item in items]
+    entries = {entry.key: entry for entry in ResultCacheEntry.objects.filter(key__in=set(keys))}
+    if entries:
+        ResultCacheEntry.objects.filter(pk__in=[entry.pk for entry in entries.values()]).update(
+            hits=F("hits") + 1, last_used_at=timezone.now()
+        )
+        _count("hits", sum(key in entries for key in keys))
+
+    missing = {}
+    for key, item in zip(keys, items):
+        if key not in entries:
+            missing.setdefault(key, item)
+    if missing:
+        _count("misses", len(missing))
+
+    computed = dict(zip(missing, run_many(list(missing.values()))))
+    for key, outcome in computed.items():
+        if not isinstance(outcome, Exception):
+            put(key, *outcome)
+
+    outcomes = []
+    for key, item in zip(keys, items):
+        if key in entries:
+            outcomes.append(_stored(entries[key], item.get("color")))
+        elif isinstance(computed[key], Exception):
+            outcomes.append(computed[key])
+        else:
+            packed, stable = computed[key]
+            outcomes.append(({**packed, "results": {**packed["results"], "color": item.get("color")}}, stable))
+    return outcomes
+
+
+def stats():
+    counters = dict.fromkeys(COUNTERS, 0)
+    counters.update(ResultCacheCounter.objects.filter(name__in=COUNTERS).values_list("name", "value"))
+    lookups = counters["hits"] + counters["misses"]
+    usage = ResultCacheEntry.objects.aggregate(size=Sum("size"))
+
+    return {
+        **counters,
+        "hit_ratio": counters["hits"] / lookups if lookups else 0.0,
+        "entries": ResultCacheEntry.objects.count(),
+        "size_bytes": usage["size"] or 0,
+        "max_bytes": settings.SIMULATION_RESULT_CACHE_MAX_BYTES,
+    }
@@ -0,0 +1,336 @@
+from array import array
+
+import numpy as np
+from django.db import transaction
+
+from . import admission, physics, registry, storage, timing
+from .models import Simulation, SimulationSegment
+
+# Points a stream holds before storing them: the first block creates the `Simulation`,
+# each later one is appended as a `SimulationSegment`.
+STREAM_BLOCK_SIZE = 100 * physics.CHUNK_SIZE
+
+
+def integration_options(params):
+    return {
+        "method": params.get("method", "euler"),
+        "rtol": float(params.get("rtol", physics.RTOL)),
+        "atol": float(params.get("atol", physics.ATOL)),
+    }
+
+
+def settle_options(params):
+    if "settle_tol" not in params:
+        return {}
+    return {"settle_tol": float(params["settle_tol"])}
+
+
+def simulation_call(validated_data):
+    """
+    Resolves a validated `SimulationCreateSerializer` payload into the physics
+    function, its initial state and keyword arguments (everything but `steps`).
+    """
+    system = registry.get(validated_data.get("model"))
+    params = validated_data.get("params", {})
+    initial = params.get("initial", system.initial)
+    kwargs = system.values(params)
+
+    if system.kind == registry.FLOW:
+        kwargs["dt"] = float(params.get("dt", system.dt))
+        kwargs.update(integration_options(params))
+    kwargs.update(settle_options(params))
+
+    return system.function, initial, kwargs
+
+
+def run_simulation(validated_data, progress=None):
+    """
+    Runs the physics for a validated `SimulationCreateSerializer` payload.
+
+    Returns the `results` dict to store on `Simulation` and the stability flag.
+    A trajectory that settled early (see `params.settle_tol`) is cut at the point
+    of detection and gets `attractor` and `period`: the remaining points repeat
+    its last `period` points.
+    """
+    if validated_data.get("density"):
+        return run_density(validated_data, progress)
+    if validated_data.get("lyapunov"):
+        return run_twin(validated_data, progress)
+    if validated_data.get("section"):
+        return run_section(validated_data, progress)
+
+    function, initial, kwargs = simulation_call(validated_data)
+    with timing.phase("integrate"):
+        result_data = function(*initial, steps=validated_data.get("steps"), progress=progress, **kwargs)
+
+    results = {
+        **result_data["columns"],
+        "color": validated_data.get("color"),
+        "final_state": final_state(result_data["columns"]),
+    }
+    period = result_data.get("period")
+    if period:
+        results["attractor"] = Simulation.Attractors.FIXED_POINT if period == 1 else Simulation.Attractors.CYCLE
+        results["period"] = period
+
+    return results, result_data["stable"]
+
+
+def run_density(validated_data, progress=None):
+    """
+    Density-map output of `run_simulation`: the run is accumulated chunk by chunk
+    into the `density` grid, without keeping its points. `bounds` are per axis,
+    as for trajectories; `length` counts the computed points.
+    """
+    options = validated_data["density"]
+    function, initial, kwargs = simulation_call(validated_data)
+    kwargs.pop("settle_tol", None)
+    axes = [registry.VARIABLES.index(axis) for axis in options["axes"]]
+
+    with timing.phase("integrate"):
+        result_data = physics.density(
+            function, initial, validated_data.get("steps"), axes=axes, bins=options["bins"],
+            bounds=options.get("bounds"), progress=progress, **kwargs,
+        )
+
+    results = {
+        "color": validated_data.get("color"),
+        "density": result_data["density"],
+        "axes": list(options["axes"]),
+        "bins": options["bins"],
+        "bounds": dict(zip(options["axes"], (list(pair) for pair in result_data["bounds"]))),
+        "length": result_data["length"],
+        "outside": result_data["outside"],
+    }
+    return results, result_data["stable"]
+
+
+def run_twin(validated_data, progress=None):
+    """
+    Sensitivity output of `run_simulation`: a reference run and a perturbed twin
+    stepped in lockstep (see `physics.twin`). Like bifurcation diagrams, the
+    results hold one point per renormalization: `x` is the time, `y` the log of
+    the accumulated separation; `lyapunov` is the exponent estimate.
+    """
+    options = validated_data["lyapunov"]
+    system = registry.get(validated_data.get("model"))
+    params = validated_data.get("params", {})
+    kernel = system.scalar(system.values(params))
+
+    if system.kind == registry.FLOW:
+        dt = float(params.get("dt", system.dt))
+        advance = physics.stepper(kernel, dt, params.get("method", "euler"))
+    else:
+        dt = 1.0
+
+        def advance(state):
+            return kernel(*state)
+
+    with timing.phase("integrate"):
+        result_data = physics.twin(
+            advance, params.get("initial", system.initial), validated_data.get("steps"),
+            perturbation=options["perturbation"], interval=options["interval"], dt=dt,
+            name=system.title, progress=progress,
+        )
+
+    results = {
+        "x": result_data["time"],
+        "y": result_data["separation"],
+        "color": validated_data.get("color"),
+        "lyapunov": result_data["lyapunov"],
+    }
+    return results, result_data["stable"]
+
+
+def run_section(validated_data, progress=None):
+    """
+    Section output of `run_simulation`: only the points of the Poincaré section
+    (`x`, `y`, `z` of every crossing) or, for `kind` "maxima", the return map of
+    successive maxima (`x` the n-th maximum, `y` the next one).
+    """
+    options = validated_data["section"]
+    system = registry.get(validated_data.get("model"))
+    params = validated_data.get("params", {})
+    axis = system.variables.index(options["axis"])
+    kwargs = {
+        "dt": float(params.get("dt", system.dt)), "steps": validated_data.get("steps"),
+        "method": params.get("method", "euler"), "name": system.title, "progress": progress,
+    }
+    initial = params.get("initial", system.initial)
+    rhs = system.scalar(system.values(params))
+
+    with timing.phase("integrate"):
+        if options["kind"] == "maxima":
+            result_data = physics.return_map(rhs, initial, axis, **kwargs)
+            columns = {"x": result_data["maxima"][:-1], "y": result_data["maxima"][1:]}
+        else:
+            direction = {"up": 1, "down": -1, "both": 0}[options["direction"]]
+            result_data = physics.poincare_section(rhs, initial, axis, options["value"], direction, **kwargs)
+            columns = result_data["columns"]
+
+    results = {**columns, "color": validated_data.get("color"), "section": dict(options)}
+    return results, result_data["stable"]
+
+
+def run_packed(validated_data, timeout=None):
+    """
+    `run_simulation` plus `storage.pack_results`: compact, picklable output for pool
+    workers. The run is stopped after `timeout` seconds, if given.
+    """
+    progress = admission.deadline(timeout) if timeout else None
+    results, stable = run_simulation(validated_data, progress=progress)
+    return storage.pack_results(results), stable
+
+
+def final_state(columns):
+    """Last point of a trajectory in full precision, the state `extend_simulation` continues from."""
+    if not len(columns["x"]):
+        return None
+    return [float(column[-1]) for column in columns.values()]
+
+
+def extend_simulation(simulation, steps, progress=None):
+    """
+    Continues a stored single-trajectory `Simulation` from its `final_state`
+    for `steps` more steps. Returns the new columns, the stability flag and
+    the detected `period` (see `run_simulation`).
+    """
+    function, _, kwargs = simulation_call(simulation.input_params)
+    result_data = function(*simulation.results["final_state"], steps=steps, progress=progress, **kwargs)
+
+    return result_data["columns"], result_data["stable"], result_data.get("period")
+
+
+def stream_simulation(validated_data, chunk_size=physics.CHUNK_SIZE):
+    """Generator of column chunks for `validated_data`; returns the stability flag when exhausted."""
+    function, initial, kwargs = simulation_call(validated_data)
+    kwargs.pop("settle_tol", None)
+    return physics.stream(function, initial, validated_data.get("steps"), chunk_size, **kwargs)
+
+
+def next_chunk(chunks):
+    """
+    `next(chunks)` for a `stream_simulation` generator as `(chunk, None)`, or `(None, stable)`
+    once it is exhausted: a StopIteration cannot be passed through an executor's future.
+    """
+    try:
+        return next(chunks), None
+    except StopIteration as stop:
+        return None, stop.value
+
+
+class StreamRecorder:
+    """
+    Stores a streamed trajectory while it is produced, so a stream holds at
+    most `STREAM_BLOCK_SIZE` points whatever its length. Until `finish` the
+    stored `Simulation` is partial; `discard` deletes it if the stream fails.
+    """
+
+    def __init__(self, user, validated_data):
+        self.user = user
+        self.validated_data = validated_data
+        axes = ("x", "y", "z")[:len(validated_data["params"]["initial"])]
+        self.columns = {axis: array("d") for axis in axes}
+        self.simulation = None
+        self.finished = False
+
+    def add(self, chunk):
+        """Buffers `chunk`; True once a full block is waiting for `flush`."""
+        for axis, column in chunk.items():
+            self.columns[axis].extend(column)
+        return len(self.columns["x"]) >= STREAM_BLOCK_SIZE
+
+    def flush(self):
+        columns = self.columns
+        if self.simulation is None:
+            results = {**columns, "color": self.validated_data.get("color"), "final_state": final_state(columns)}
+            self.simulation = Simulation.objects.create(
+                user=self.user,
+                model_type=self.validated_data.get("model"),
+                input_params=self.validated_data,
+                **storage.pack_results(results),
+            )
+        elif len(columns["x"]):
+            simulation = self.simulation
+            offset = simulation.results["length"]
+            with transaction.atomic():
+                SimulationSegment.objects.create(
+                    simulation=simulation, start=offset, length=len(columns["x"]), **storage.pack_segment(columns)
+                )
+                simulation.results = {
+                    **simulation.results,
+                    "length": offset + len(columns["x"]),
+                    "bounds": storage.merge_bounds(simulation.results["bounds"], columns),
+                    "final_state": final_state(columns),
+                    "segments": simulation.results.get("segments", 0) + 1,
+                }
+                simulation.save(update_fields=["results"])
+        self.columns = {axis: array("d") for axis in columns}
+
+    def finish(self, stable):
+        """Stores the remaining points and the stability flag; returns the `Simulation`."""
+        self.flush()
+        self.simulation.is_stable = stable
+        self.simulation.save(update_fields=["is_stable"])
+        self.finished = True
+        return self.simulation
+
+    def discard(self):
+        if self.simulation is not None and not self.finished:
+            self.simulation.delete()
+            self.simulation = None
+
+
+def run_ensemble(validated_data, progress=None):
+    """Same as `run_simulation` for a validated `SimulationEnsembleSerializer` payload."""
+    system = registry.get(validated_data.get("model"))
+    params = validated_data.get("params", {})
+    kwargs = system.values(params)
+    if system.kind == registry.FLOW:
+        kwargs.update(dt=float(params.get("dt", system.dt)), method=params.get("method", "euler"))
+
+    result_data = system.ensemble(params.get("initial"), steps=validated_data.get("steps"), progress=progress, **kwargs)
+
+    columns = result_data["columns"]
+    lengths = result_data["lengths"]
+    results = {
+        axis: [columns[j, i, :length] for i, length in enumerate(lengths)]
+        for j, axis in enumerate(system.variables)
+    }
+    results["stable"] = result_data["stable"]
+    results["color"] = validated_data.get("color")
+
+    return results, bool(result_data["stable"].all())
+
+
+def run_bifurcation(validated_data, progress=None):
+    """
+    Runs a parameter sweep for a validated `SimulationBifurcationSerializer` payload.
+
+    The results hold one point per recorded sample: `x` is the parameter value,
+    `y` the post-transient sample (the first variable of maps, e.g. Henon x;
+    maxima of the last variable of flows, e.g. Lorenz z).
+    """
+    system = registry.get(validated_data.get("model"))
+    parameter = validated_data.get("parameter")
+    params = validated_data.get("params", {})
+    values = np.linspace(validated_data["start"], validated_data["stop"], validated_data["resolution"])
+
+    kwargs = {**system.values(params), parameter: values}
+    if system.kind == registry.FLOW:
+        kwargs.update(dt=float(params.get("dt", system.dt)), method=params.get("method", "euler"))
+
+    result_data = system.bifurcation(
+        params.get("initial", system.initial), transient=validated_data["transient"],
+        samples=validated_data["samples"], progress=progress, **kwargs,
+    )
+
+    stable = result_data["stable"]
+    results = {
+        "x": values[result_data["index"]],
+        "y": result_data["values"],
+        "color": validated_data.get("color"),
+        "parameter": parameter,
+        "diverged": values[~stable],
+    }
+    return results, bool(stable.all())
\ No newline at end of file
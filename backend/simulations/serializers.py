@@ -1,5 +1,65 @@
+import numpy as np
 from rest_framework import serializers
-from .models import Simulation
+from . import physics, registry, storage, timing
+from .models import ChaosMap, Simulation, SimulationJob
+
+
+MAX_ENSEMBLE_SIZE = 10000
+MAX_BATCH_SIZE = 100
+ENSEMBLE_METHODS = ("euler", "rk4")
+MAX_BIFURCATION_RESOLUTION = 2000
+MAX_BIFURCATION_STEPS = 100000
+MAX_DENSITY_BINS = 2048
+MAX_LYAPUNOV_INTERVAL = 10000
+# Optional outputs of a create that replace the stored trajectory; at most one per run.
+OUTPUTS = ("density", "lyapunov", "section")
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class DensitySerializer(serializers.Serializer):
+    """Density-map output: a `bins` × `bins` histogram of the run projected on `axes`."""
+    bins = serializers.IntegerField(default=512, min_value=2, max_value=MAX_DENSITY_BINS)
+    axes = serializers.ListField(
+        child=serializers.ChoiceField(choices=registry.VARIABLES), min_length=2, max_length=2, default=["x", "y"]
+    )
+    bounds = serializers.ListField(
+        child=serializers.ListField(child=serializers.FloatField(), min_length=2, max_length=2),
+        min_length=2, max_length=2, required=False,
+    )
+
+    def validate(self, data):
+        if data["axes"][0] == data["axes"][1]:
+            raise serializers.ValidationError({"axes": "axes must be two different variables"})
+        if any(lo >= hi for lo, hi in data.get("bounds", [])):
+            raise serializers.ValidationError({"bounds": "every bound must be a [min, max] pair with min < max"})
+        return data
+
+
+class LyapunovSerializer(serializers.Serializer):
+    """Twin-trajectory output: separation of a run and its `perturbation`, renormalized every `interval` steps."""
+    perturbation = serializers.FloatField(default=physics.TWIN_PERTURBATION, min_value=1e-15, max_value=1e-2)
+    interval = serializers.IntegerField(default=physics.TWIN_INTERVAL, min_value=1, max_value=MAX_LYAPUNOV_INTERVAL)
+
+
+class SectionSerializer(serializers.Serializer):
+    """
+    Poincaré-section output: only the crossings of the plane `axis` = `value` in `direction`
+    (`kind` "plane"), or the return map of successive maxima of `axis` (`kind` "maxima").
+    """
+    kind = serializers.ChoiceField(choices=["plane", "maxima"], default="plane")
+    axis = serializers.ChoiceField(choices=registry.VARIABLES, default="z")
+    value = serializers.FloatField(default=0.0)
+    direction = serializers.ChoiceField(choices=["up", "down", "both"], default="up")
+
+    def validate(self, data):
+        if data["kind"] == "maxima":
+            # Not used by return maps; dropped so they do not split the result cache.
+            data.pop("value")
+            data.pop("direction")
+        return data
 
 
 class SimulationCreateSerializer(serializers.Serializer):
@@ -7,36 +67,126 @@ class SimulationCreateSerializer(serializers.Serializer):
     steps = serializers.IntegerField(default=1000, min_value=1)
     color = serializers.CharField(max_length=20, default="#0000ff")
     params = serializers.JSONField()
+    density = DensitySerializer(required=False)
+    lyapunov = LyapunovSerializer(required=False)
+    section = SectionSerializer(required=False)
 
     def validate(self, data):
-        model = data.get("model")
+        system = registry.get(data.get("model"))
         params = data.get("params", {})
 
-        if model == Simulation.ModelTypes.LORENZ:
-            required_params = {"sigma", "rho", "beta", "initial"}
-            if not required_params.issubset(params.keys()):
-                raise serializers.ValidationError(f"Lorenz model requires: {', '.join(required_params)}")
-            if not (isinstance(params["initial"], list) and len(params["initial"]) == 3):
-                raise serializers.ValidationError("Initial conditions for Lorenz must be a list of 3 numbers")
-            if 'dt' in params and (not isinstance(params.get('dt'), (int, float)) or params.get('dt') <= 0):
-                raise serializers.ValidationError({"dt": "dt must be a positive number"})
-        elif model == Simulation.ModelTypes.HENON:
-            required_params = {"a", "b", "initial"}
-            if not required_params.issubset(params.keys()):
-                raise serializers.ValidationError(f"Henon model requires: {', '.join(required_params)}")
-            if not (isinstance(params["initial"], list) and len(params["initial"]) == 2):
-                raise serializers.ValidationError("Initial conditions for Henon must be a list of 2 numbers")
-        elif model == Simulation.ModelTypes.THOMAS:
-            required_params = {"b", "initial"}
-            if not required_params.issubset(params.keys()):
-                raise serializers.ValidationError(f"Thomas model requires: {', '.join(required_params)}")
-            if not (isinstance(params["initial"], list) and len(params["initial"]) == 3):
-                raise serializers.ValidationError("Initial conditions for Thomas must be a list of 3 numbers")
+        if "settle_tol" in params and (not isinstance(params["settle_tol"], (int, float)) or params["settle_tol"] <= 0):
+            raise serializers.ValidationError({"settle_tol": "settle_tol must be a positive number"})
+
+        if not set(system.required).issubset(params.keys()):
+            raise serializers.ValidationError(f"{system.title} model requires: {', '.join(system.required)}")
+        self.validate_initial_conditions(params["initial"], system.title, system.dimension)
+        if "density" in data and not set(data["density"]["axes"]) <= set(system.variables):
+            raise serializers.ValidationError({"density": f"{system.title} has only: {', '.join(system.variables)}"})
+        outputs = [output for output in OUTPUTS if output in data]
+        if len(outputs) > 1:
+            raise serializers.ValidationError(f"{' and '.join(outputs)} outputs cannot be combined")
+        if "lyapunov" in data and params.get("method", "euler") not in ENSEMBLE_METHODS:
+            raise serializers.ValidationError(
+                {"method": f"Twin trajectories support only: {', '.join(ENSEMBLE_METHODS)}"}
+            )
+        if "section" in data:
+            self.check_section(data["section"], system, params)
+        for name in system.parameters:
+            if name in params and not is_number(params[name]):
+                raise serializers.ValidationError({name: f"{name} must be a number"})
+
+        if system.kind == registry.MAP:
+            if params.get("method", "euler") != "euler":
+                raise serializers.ValidationError(
+                    {"method": f"{system.title} is a discrete map and supports only euler stepping"}
+                )
+        else:
             if 'dt' in params and (not isinstance(params.get('dt'), (int, float)) or params.get('dt') <= 0):
                 raise serializers.ValidationError({"dt": "dt must be a positive number"})
+            self.validate_integration_options(params)
+
+        return data
+
+    def check_section(self, section, system, params):
+        if system.kind != registry.FLOW:
+            raise serializers.ValidationError({"section": f"{system.title} is a discrete map, sections need a flow"})
+        if section["axis"] not in system.variables:
+            raise serializers.ValidationError({"section": f"{system.title} has only: {', '.join(system.variables)}"})
+        if params.get("method", "euler") not in ENSEMBLE_METHODS:
+            raise serializers.ValidationError({"method": f"Sections support only: {', '.join(ENSEMBLE_METHODS)}"})
+
+    def validate_integration_options(self, params):
+        if params.get("method", "euler") not in physics.METHODS:
+            raise serializers.ValidationError({"method": f"method must be one of: {', '.join(physics.METHODS)}"})
+        for tolerance in ("rtol", "atol"):
+            if tolerance in params and (not isinstance(params[tolerance], (int, float)) or params[tolerance] <= 0):
+                raise serializers.ValidationError({tolerance: f"{tolerance} must be a positive number"})
+
+    def validate_initial_conditions(self, initial, name, size):
+        if not (isinstance(initial, list) and len(initial) == size and all(is_number(v) for v in initial)):
+            raise serializers.ValidationError(f"Initial conditions for {name} must be a list of {size} numbers")
+
+
+class SimulationBatchSerializer(serializers.Serializer):
+    """A list of `SimulationCreateSerializer` payloads; each item is validated separately by the view."""
+    simulations = serializers.ListField(child=serializers.JSONField(), min_length=1, max_length=MAX_BATCH_SIZE)
+
 
+class SimulationEnsembleSerializer(SimulationCreateSerializer):
+    """Same payload as a single run, but `params.initial` is a list of initial conditions."""
+    density = None
+    lyapunov = None
+    section = None
+
+    def validate_integration_options(self, params):
+        if params.get("method", "euler") not in ENSEMBLE_METHODS:
+            raise serializers.ValidationError({"method": f"Ensembles support only: {', '.join(ENSEMBLE_METHODS)}"})
+
+    def validate_initial_conditions(self, initial, name, size):
+        if not (isinstance(initial, list) and 0 < len(initial) <= MAX_ENSEMBLE_SIZE):
+            raise serializers.ValidationError(
+                f"Ensemble initial conditions must be a list of 1 to {MAX_ENSEMBLE_SIZE} points"
+            )
+        for point in initial:
+            if not (isinstance(point, list) and len(point) == size
+                    and all(is_number(v) for v in point)):
+                raise serializers.ValidationError(
+                    f"Each initial condition for {name} must be a list of {size} numbers"
+                )
+
+
+class SimulationBifurcationSerializer(SimulationCreateSerializer):
+    """
+    Sweeps one parameter over `resolution` values in `[start, stop]`; the swept
+    parameter may be left out of `params`.
+    """
+    steps = None
+    density = None
+    lyapunov = None
+    section = None
+    parameter = serializers.CharField(max_length=20)
+    start = serializers.FloatField()
+    stop = serializers.FloatField()
+    resolution = serializers.IntegerField(default=500, min_value=2, max_value=MAX_BIFURCATION_RESOLUTION)
+    transient = serializers.IntegerField(default=1000, min_value=0, max_value=MAX_BIFURCATION_STEPS)
+    samples = serializers.IntegerField(default=1000, min_value=1, max_value=MAX_BIFURCATION_STEPS)
+    params = serializers.JSONField(default=dict)
+
+    def validate(self, data):
+        swept = registry.get(data["model"]).parameters
+        if data["parameter"] not in swept:
+            raise serializers.ValidationError({"parameter": f"parameter must be one of: {', '.join(swept)}"})
+
+        # The swept parameter only needs a placeholder for the per-model checks.
+        params = {data["parameter"]: data["start"], **data.get("params", {})}
+        super().validate({**data, "params": params})
         return data
 
+    def validate_integration_options(self, params):
+        if params.get("method", "euler") not in ENSEMBLE_METHODS:
+            raise serializers.ValidationError({"method": f"Sweeps support only: {', '.join(ENSEMBLE_METHODS)}"})
+
 
 class SimulationHistorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,7 +194,62 @@ class SimulationHistorySerializer(serializers.ModelSerializer):
         fields = ["id", "model_type", "created_at", "is_stable"]
 
 
+class SimulationHistoryQuerySerializer(serializers.Serializer):
+    model_type = serializers.ChoiceField(choices=Simulation.ModelTypes.choices, required=False)
+    is_stable = serializers.BooleanField(required=False, default=None, allow_null=True)
+
+
 class SimulationDetailSerializer(serializers.ModelSerializer):
+    results = serializers.SerializerMethodField()
+
     class Meta:
         model = Simulation
-        exclude = ["user"]
\ No newline at end of file
+        exclude = ["user", "trajectory", "overview"]
+
+    def get_results(self, obj):
+        with timing.phase("read"):
+            results = obj.get_results(**self.context.get("window", {}))
+        if self.context.get("precision") is not None:
+            results = storage.rounded(results, self.context["precision"])
+        return results
+
+
+class SimulationDetailQuerySerializer(serializers.Serializer):
+    start = serializers.IntegerField(min_value=0, default=0)
+    end = serializers.IntegerField(min_value=0, required=False)
+    max_points = serializers.IntegerField(min_value=2, required=False)
+    precision = serializers.IntegerField(min_value=0, max_value=15, required=False)
+    dtype = serializers.ChoiceField(choices=["float32", "float64"], required=False)
+
+    def validate(self, data):
+        if "end" in data and data["end"] < data["start"]:
+            raise serializers.ValidationError({"end": "end must not be less than start"})
+        return data
+
+
+class SimulationExtendSerializer(serializers.Serializer):
+    steps = serializers.IntegerField(min_value=1)
+
+
+class SimulationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SimulationJob
+        fields = ["id", "status", "progress", "error", "simulation", "created_at", "started_at", "finished_at"]
+
+class ChaosMapSerializer(serializers.ModelSerializer):
+    chunks_done = serializers.IntegerField(read_only=True)
+    chunks_total = serializers.IntegerField(source="chunk_count", read_only=True)
+
+    class Meta:
+        model = ChaosMap
+        fields = "__all__"
+
+
+class ChaosMapDetailSerializer(ChaosMapSerializer):
+    grid = serializers.SerializerMethodField()
+
+    def get_grid(self, obj):
+        """Rows of the y parameter, columns of the x parameter; null for diverged and pending cells."""
+        with timing.phase("read"):
+            grid = np.round(obj.grid().astype(float), 5)
+        return np.where(np.isnan(grid), None, grid).tolist()
@@ -0,0 +1,268 @@
+"""
+Compact storage of simulation trajectories.
+
+The coordinate columns of `Simulation.results` are kept in `Simulation.trajectory`
+as a compressed NumPy `.npz` blob; only small metadata (color, length, bounds,
+ensemble stability flags) stays in the `results` JSON.
+
+Density maps (see `runner.run_density`) keep their histogram grid in the
+blob instead, as a `density` array.
+
+Single trajectories also get `Simulation.overview`: a few min/max-bucketed
+reductions of increasing resolution, so downsampled reads never have to load
+the full trajectory.
+"""
+from io import BytesIO
+
+import numpy as np
+from django.conf import settings
+
+AXES = ("x", "y", "z")
+OVERVIEW_SIZES = (1000, 4000, 16000, 64000, 256000)
+
+
+def _is_ensemble(column):
+    return isinstance(column, (list, tuple)) and len(column) > 0 and hasattr(column[0], "__len__")
+
+
+def _bounds(column):
+    if not len(column):
+        return None
+    return [float(np.nanmin(column)), float(np.nanmax(column))]
+
+
+def pack_results(results, dtype=None):
+    """
+    Splits a `results` dict into JSON metadata and a columnar blob.
+
+    Returns the keyword arguments for `Simulation`: `results`, `trajectory`,
+    `overview` and the `settled` fields. A `density` grid goes to the blob on its
+    own; other dicts without coordinate columns are stored unchanged.
+    """
+    if "density" in results:
+        metadata = {key: value for key, value in results.items() if key != "density"}
+        grid = np.asarray(results["density"])
+        grid = grid.astype("<u4" if grid.max(initial=0) < 2 ** 32 else "<u8")
+        return {"results": metadata, "trajectory": _savez({"density": grid}), "overview": None, **settled(metadata)}
+
+    axes = [axis for axis in AXES if axis in results]
+    if not axes:
+        return {"results": results, "trajectory": None, "overview": None, **settled(results)}
+
+    dtype = np.dtype(dtype or settings.SIMULATION_RESULTS_DTYPE).newbyteorder("<")
+    metadata = {key: value for key, value in results.items() if key not in axes}
+    arrays = {}
+
+    if _is_ensemble(results[axes[0]]):
+        for axis in axes:
+            arrays[axis] = np.concatenate([np.asarray(column, dtype=dtype) for column in results[axis]])
+        arrays["lengths"] = np.array([len(column) for column in results[axes[0]]], dtype="<i8")
+    else:
+        for axis in axes:
+            arrays[axis] = np.asarray(results[axis], dtype=dtype)
+
+    metadata["length"] = len(arrays[axes[0]])
+    metadata["bounds"] = {axis: _bounds(arrays[axis]) for axis in axes}
+
+    overview = None
+    if "lengths" not in arrays:
+        overview = build_overview({axis: arrays[axis] for axis in axes})
+
+    return {"results": metadata, "trajectory": _savez(arrays), "overview": overview, **settled(metadata)}
+
+
+def pack_segment(columns, dtype=None):
+    """Blob and overview of a segment appended to a stored trajectory (see `SimulationSegment`)."""
+    dtype = np.dtype(dtype or settings.SIMULATION_RESULTS_DTYPE).newbyteorder("<")
+    arrays = {axis: np.asarray(column, dtype=dtype) for axis, column in columns.items()}
+    return {"trajectory": _savez(arrays), "overview": build_overview(arrays)}
+
+
+def merge_bounds(bounds, columns):
+    """`bounds` metadata widened to cover `columns`."""
+    merged = dict(bounds)
+    for axis, column in columns.items():
+        extra = _bounds(np.asarray(column, dtype=float))
+        if extra is None:
+            continue
+        current = merged.get(axis)
+        merged[axis] = extra if current is None else [min(current[0], extra[0]), max(current[1], extra[1])]
+    return merged
+
+
+def settled(results):
+    """`Simulation.attractor` and `period` for a trajectory that stopped early on a fixed point or cycle."""
+    return {"attractor": results.get("attractor") or "", "period": results.get("period")}
+
+
+def _savez(arrays):
+    buffer = BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def _loadz(blob):
+    with np.load(BytesIO(bytes(blob))) as data:
+        return {name: data[name] for name in data.files}
+
+
+def decimate(columns, max_points):
+    """
+    Min/max bucketing: splits the trajectory into equal buckets and keeps, in
+    every bucket, the points where each axis reaches its minimum and maximum,
+    so the envelope of the curve survives. Returns sorted point indices,
+    at most `max_points` of them (plus the first and last point).
+    """
+    length = len(next(iter(columns.values())))
+    buckets = max(max_points // (2 * len(columns)), 1)
+    if length <= max_points:
+        return np.arange(length)
+
+    size = -(-length // buckets)
+    starts = np.arange(buckets) * size
+    selected = [np.array([0, length - 1])]
+    for column in columns.values():
+        padded = np.pad(np.asarray(column, dtype=float), (0, buckets * size - length), mode="edge").reshape(buckets, size)
+        selected.append(starts + np.argmin(padded, axis=1))
+        selected.append(starts + np.argmax(padded, axis=1))
+
+    return np.unique(np.minimum(np.concatenate(selected), length - 1))
+
+
+def build_overview(columns):
+    length = len(next(iter(columns.values())))
+    levels = {}
+    for size in OVERVIEW_SIZES:
+        if size >= length:
+            break
+        index = decimate(columns, size)
+        levels[f"{size}_index"] = index
+        levels.update({f"{size}_{axis}": column[index] for axis, column in columns.items()})
+
+    return _savez(levels) if levels else None
+
+
+def _levels(overview):
+    arrays = _loadz(overview)
+    sizes = sorted({int(name.split("_")[0]) for name in arrays})
+    return [
+        {axis: arrays[f"{size}_{axis}"] for axis in AXES + ("index",) if f"{size}_{axis}" in arrays}
+        for size in sizes
+    ]
+
+
+def read_window(results, load_trajectory, overview=None, start=0, end=None, max_points=None):
+    """
+    Points `[start, end)` of a stored trajectory, reduced to at most `max_points`.
+
+    The finest precomputed overview level that fits is used when possible;
+    `load_trajectory` (a callable returning the blob) is only called when the
+    full-resolution data is really needed. The result includes `index`, the
+    positions of the returned points in the full trajectory.
+    """
+    length = results.get("length", 0)
+    end = length if end is None else min(end, length)
+    start = min(start, end)
+
+    if max_points is not None and end - start > max_points and overview is not None:
+        for level in reversed(_levels(overview)):
+            lo, hi = np.searchsorted(level["index"], [start, end])
+            window = {name: column[lo:hi] for name, column in level.items()}
+            if hi - lo <= max_points:
+                return {**window, **results}
+
+        # Even the coarsest level is too dense: reduce it further.
+        index = window.pop("index")
+        selected = decimate(window, max_points)
+        return {**{axis: column[selected] for axis, column in window.items()}, "index": index[selected], **results}
+
+    trajectory = load_trajectory()
+    if trajectory is None:
+        return results
+
+    columns = unpack_columns(trajectory)
+    if isinstance(columns["x"], list):
+        return {**_ensemble_window(columns, start, end, max_points), **results}
+
+    window = {axis: column[start:end] for axis, column in columns.items()}
+    index = np.arange(start, end)
+    if max_points is not None and end - start > max_points:
+        selected = decimate(window, max_points)
+        window = {axis: column[selected] for axis, column in window.items()}
+        index = index[selected]
+    return {**window, "index": index, **results}
+
+
+def read_pieces(results, pieces, start=0, end=None, max_points=None):
+    """
+    `read_window` for a trajectory stored as consecutive pieces: the original
+    `Simulation.trajectory` followed by its extension segments. `pieces` are
+    `(offset, length, load_trajectory, overview)` tuples in order; `max_points`
+    is shared between them in proportion to how much of the window they cover.
+    """
+    length = results.get("length", 0)
+    end = length if end is None else min(end, length)
+    start = min(start, end)
+    axes = [axis for axis in AXES if axis in results.get("bounds", {})]
+
+    parts = []
+    for offset, size, load_trajectory, overview in pieces:
+        lo, hi = max(start - offset, 0), min(end - offset, size)
+        if lo >= hi:
+            continue
+        budget = None if max_points is None else max(2, max_points * (hi - lo) // (end - start))
+        window = read_window({"length": size}, load_trajectory, overview, lo, hi, budget)
+        parts.append({**{axis: window[axis] for axis in axes}, "index": window["index"] + offset})
+
+    if not parts:
+        parts = [{name: np.empty(0) for name in axes + ["index"]}]
+    return {**{name: np.concatenate([part[name] for part in parts]) for name in axes + ["index"]}, **results}
+
+
+def _ensemble_window(columns, start, end, max_points):
+    """Applies the same window to every trajectory of an ensemble."""
+    axes = [axis for axis in AXES if axis in columns]
+    window = {axis: [] for axis in axes + ["index"]}
+    for trajectory in zip(*(columns[axis] for axis in axes)):
+        sliced = dict(zip(axes, (column[start:end] for column in trajectory)))
+        index = np.arange(start, start + len(sliced[axes[0]]))
+        if max_points is not None and len(index) > max_points:
+            selected = decimate(sliced, max_points)
+            sliced = {axis: column[selected] for axis, column in sliced.items()}
+            index = index[selected]
+        for axis in axes:
+            window[axis].append(sliced[axis])
+        window["index"].append(index)
+    return window
+
+
+def rounded(results, decimals):
+    """`results` with the coordinate columns rounded to `decimals` places, for shorter JSON."""
+    rounded = dict(results)
+    for axis in AXES:
+        if axis not in results:
+            continue
+        column = results[axis]
+        if isinstance(column, list) and column and hasattr(column[0], "__len__"):
+            rounded[axis] = [np.round(np.asarray(part, dtype=float), decimals) for part in column]
+        else:
+            rounded[axis] = np.round(np.asarray(column, dtype=float), decimals)
+    return rounded
+
+
+def unpack_columns(trajectory):
+    """Decodes a blob from `pack_results` into its coordinate columns."""
+    arrays = _loadz(trajectory)
+
+    lengths = arrays.pop("lengths", None)
+    if lengths is not None:
+        offsets = np.cumsum(lengths)[:-1]
+        arrays = {axis: np.split(column, offsets) for axis, column in arrays.items()}
+    return arrays
+
+
+def unpack_results(results, trajectory):
+    """Inverse of `pack_results`: metadata with the coordinate columns merged back in."""
+    if trajectory is None:
+        return results
+    return {**unpack_columns(bytes(trajectory)), **results}
@@ -1,16 +1,36 @@
+import asyncio
+import gzip
+import json
+import struct
+import threading
+import time
+import warnings
+from datetime import timedelta
+import numpy as np
 import pytest
 from unittest.mock import patch
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core import signals
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import CommandError, call_command
+from django.db import close_old_connections, connection
+from django.test import AsyncClient, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from simulations.models import Simulation
+from simulations import admission, chaos, physics, registry, result_cache, runner, storage, timing
+from simulations.models import ChaosMap, ComputeCharge, ResultCacheEntry, Simulation, SimulationJob, SimulationSegment
 
 pytestmark = pytest.mark.django_db
 
 
 class TestSimulationCreateViewUnit:
-    @patch('simulations.views.physics.lorenz_attractor')
+    @patch('simulations.runner.physics.lorenz_attractor')
     def test_create_lorenz_simulation_success_unit(self, mock_lorenz, mock_user, api_client_unit):
-        mock_lorenz.return_value = {'stable': True, 'points': [(1, 2, 3), (4, 5, 6)]}
+        mock_lorenz.return_value = {'stable': True, 'columns': {'x': [1, 4], 'y': [2, 5], 'z': [3, 6]}}
         
         url = reverse('simulation-create')
         data = {
@@ -40,9 +60,9 @@ class TestSimulationCreateViewUnit:
         assert response.data["model_type"] == "lorenz"
         assert response.data["is_stable"] is True
 
-    @patch('simulations.views.physics.henon_map')
+    @patch('simulations.runner.physics.henon_map')
     def test_create_unstable_simulation_unit(self, mock_henon, mock_user, api_client_unit):
-        mock_henon.return_value = {'stable': False, 'points': []}
+        mock_henon.return_value = {'stable': False, 'columns': {'x': [], 'y': []}}
 
         url = reverse('simulation-create')
         data = {
@@ -82,4 +102,1460 @@ class TestSimulationCreateViewUnit:
         response = api_client_unit.post(url, data, format='json')
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST, "Має бути помилка 400 BAD REQUEST"
-        assert "Lorenz model requires" in str(response.data)
\ No newline at end of file
+        assert "Lorenz model requires" in str(response.data)
+
+
+class TestSimulationEnsemble:
+    def test_lorenz_ensemble_matches_single_trajectories(self):
+        initial = [[1.0, 1.0, 1.0], [-2.0, 0.5, 20.0]]
+        lorenz = registry.get("lorenz")
+        ensemble = lorenz.ensemble(initial, steps=200, **lorenz.parameters)
+
+        assert ensemble["stable"].all()
+        for i, point in enumerate(initial):
+            single = physics.lorenz_attractor(*point, steps=200)
+            assert np.allclose(ensemble["columns"][:, i, :], list(single["columns"].values()))
+
+    def test_ensemble_divergence_mask(self):
+        ensemble = registry.get("henon").ensemble([[0.1, 0.1], [50.0, 50.0]], steps=100, a=1.4, b=0.3)
+
+        assert ensemble["stable"].tolist() == [True, False]
+        single = physics.henon_map(50.0, 50.0, steps=100)
+        assert ensemble["lengths"].tolist() == [100, len(single["columns"]["x"])]
+
+    def test_create_ensemble_stores_single_record(self, mock_user, api_client_unit):
+        url = reverse('simulation-ensemble')
+        data = {
+            "model": "thomas",
+            "steps": 50,
+            "params": {"b": 0.18, "initial": [[1, 1, 1], [0.5, 0.1, -0.2], [2, 0, 1]]}
+        }
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Simulation.objects.count() == 1
+        results = response.json()["results"]
+        assert len(results["x"]) == 3
+        assert all(len(trajectory) == 50 for trajectory in results["z"])
+        assert results["stable"] == [True, True, True]
+
+    def test_create_ensemble_invalid_initial(self, mock_user, api_client_unit):
+        url = reverse('simulation-ensemble')
+        data = {
+            "model": "henon",
+            "params": {"a": 1.4, "b": 0.3, "initial": [[0.1, 0.1], [0.1]]}
+        }
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Simulation.objects.count() == 0
+
+
+class TestIntegrationMethods:
+    def test_rk45_dense_output_matches_fine_reference(self):
+        reference = physics.lorenz_attractor(1, 1, 1, dt=0.001, steps=1000, method="rk4")
+        coarse = physics.lorenz_attractor(1, 1, 1, dt=0.1, steps=10, method="rk45", rtol=1e-9, atol=1e-12)
+
+        assert coarse["stable"] is True
+        assert len(coarse["columns"]["x"]) == 10
+        assert all(
+            np.allclose(coarse["columns"][axis], reference["columns"][axis][99::100], atol=1e-6) for axis in "xyz"
+        )
+
+    def test_rk4_is_more_accurate_than_euler(self):
+        def final_point(**kwargs):
+            columns = physics.thomas_attractor(1, 1, 1, **kwargs)["columns"]
+            return np.array([column[-1] for column in columns.values()])
+
+        reference = final_point(dt=0.001, steps=5000, method="rk4")
+        euler = final_point(dt=0.05, steps=100)
+        rk4 = final_point(dt=0.05, steps=100, method="rk4")
+
+        assert np.abs(rk4 - reference).max() < np.abs(euler - reference).max() / 100
+
+    def test_create_with_rk45_method(self, mock_user, api_client_unit):
+        url = reverse('simulation-create')
+        data = {
+            "model": "lorenz",
+            "steps": 20,
+            "params": {
+                "sigma": 10.0, "rho": 28.0, "beta": 2.667, "dt": 0.05,
+                "method": "rk45", "rtol": 1e-8, "initial": [1, 1, 1]
+            }
+        }
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data["results"]["x"]) == 20
+
+    @pytest.mark.parametrize("params, field", [
+        ({"sigma": 10.0, "rho": 28.0, "beta": 2.667, "initial": [1, 1, 1], "method": "leapfrog"}, "method"),
+        ({"b": 0.18, "initial": [1, 1, 1], "method": "rk45", "atol": -1}, "atol"),
+    ])
+    def test_create_invalid_integration_options(self, mock_user, api_client_unit, params, field):
+        url = reverse('simulation-create')
+        model = "lorenz" if "sigma" in params else "thomas"
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, {"model": model, "params": params}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert field in response.data
+
+    def test_henon_rejects_integration_method(self, mock_user, api_client_unit):
+        url = reverse('simulation-create')
+        data = {"model": "henon", "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1], "method": "rk4"}}
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestTrajectoryColumns:
+    def test_columns_are_trimmed_on_divergence(self):
+        result = physics.henon_map(50.0, 50.0, steps=100)
+
+        assert result["stable"] is False
+        assert all(len(column) == 0 for column in result["columns"].values())
+
+    def test_create_stores_columns(self, mock_user, api_client_unit):
+        url = reverse('simulation-create')
+        data = {"model": "henon", "steps": 10, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        stored = Simulation.objects.get().get_results()
+        expected = physics.henon_map(0.1, 0.1, steps=10)["columns"]
+        assert stored["x"].tolist() == expected["x"].tolist()
+        assert response.json()["results"]["y"] == expected["y"].tolist()
+
+
+class TestEarlyTermination:
+    @pytest.mark.parametrize("a, period", [(0.2, 1), (0.5, 2), (0.95, 4)])
+    def test_henon_stops_on_fixed_point_or_cycle(self, a, period):
+        result = physics.henon_map(0.1, 0.1, a=a, steps=100000, settle_tol=1e-9)
+
+        assert result["period"] == period
+        x = result["columns"]["x"]
+        assert len(x) < 100000
+        assert abs(x[-1] - x[-1 - period]) <= 1e-9
+
+    @pytest.mark.parametrize("settle_tol", [1e-2, 1e-3])
+    def test_chaotic_map_runs_full_length(self, settle_tol):
+        # The a=1.4 orbit shadows its unstable cycles (periods 2, 13, ...) now and then.
+        result = physics.henon_map(0.1, 0.1, a=1.4, b=0.3, steps=300000, settle_tol=settle_tol)
+
+        assert result["period"] is None
+        assert len(result["columns"]["x"]) == 300000
+
+    @pytest.mark.parametrize("method", ["euler", "rk4"])
+    @pytest.mark.parametrize("settle_tol", [5e-2, 1e-2, 1e-3])
+    def test_chaotic_flow_runs_full_length(self, method, settle_tol):
+        # A step of dt=0.01 moves far less than settle_tol; this orbit also lingers near a saddle.
+        result = physics.thomas_attractor(0.1, 0, -0.1, b=0.18, steps=100000, method=method, settle_tol=settle_tol)
+
+        assert result["period"] is None
+        assert len(result["columns"]["x"]) == 100000
+
+    @pytest.mark.parametrize("method", ["euler", "rk4", "rk45"])
+    def test_thomas_stops_on_fixed_point(self, method):
+        result = physics.thomas_attractor(1, 1, 1, b=1.2, steps=100000, method=method, settle_tol=1e-9)
+
+        assert result["period"] == 1
+        x = result["columns"]["x"]
+        assert len(x) < 100000
+        assert abs(x[-1] - x[-2]) / 0.01 <= 1e-9
+
+    def test_create_records_attractor(self, mock_user, api_client_unit):
+        url = reverse('simulation-create')
+        data = {"model": "henon", "steps": 100000, "params": {"a": 0.5, "b": 0.3, "initial": [0.1, 0.1], "settle_tol": 1e-9}}
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        simulation = Simulation.objects.get()
+        assert (simulation.attractor, simulation.period) == ("cycle", 2)
+        assert response.data["results"]["period"] == 2
+        assert response.data["results"]["length"] < 100000
+
+    def test_invalid_tolerance_is_rejected(self, mock_user, api_client_unit):
+        url = reverse('simulation-create')
+        data = {"model": "henon", "steps": 100, "params": {"a": 0.5, "b": 0.3, "initial": [0.1, 0.1], "settle_tol": 0}}
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "settle_tol" in response.data
+
+
+class TestSimulationExtend:
+    @pytest.fixture
+    def created(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "lorenz", "steps": 300, "params": {"sigma": 10, "rho": 28, "beta": 8 / 3, "initial": [1, 1, 1]}}
+        response = api_client_unit.post(reverse('simulation-create'), data, format='json')
+        return Simulation.objects.get(pk=response.data["id"])
+
+    def test_extension_matches_a_single_long_run(self, created, api_client_unit):
+        url = reverse('simulation-extend', args=[created.pk])
+        trajectory = bytes(created.trajectory)
+
+        first = api_client_unit.post(url, {"steps": 200}, format='json')
+        second = api_client_unit.post(url, {"steps": 500}, format='json')
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert second.json()["results"]["index"][0] == 500
+        created.refresh_from_db()
+        assert bytes(created.trajectory) == trajectory
+        assert SimulationSegment.objects.filter(simulation=created).count() == 2
+        assert created.input_params["steps"] == 1000
+
+        expected = physics.lorenz_attractor(1, 1, 1, steps=1000)["columns"]
+        stored = created.get_results()
+        assert stored["length"] == 1000
+        assert np.array_equal(stored["z"], expected["z"])
+        assert stored["bounds"]["z"] == [min(expected["z"]), max(expected["z"])]
+
+    def test_window_spans_segments(self, created, api_client_unit):
+        api_client_unit.post(reverse('simulation-extend', args=[created.pk]), {"steps": 700}, format='json')
+
+        response = api_client_unit.get(reverse('simulation-detail', args=[created.pk]), {"start": 250, "end": 350})
+        results = response.json()["results"]
+        assert results["index"] == list(range(250, 350))
+
+        created.refresh_from_db()
+        reduced = created.get_results(max_points=100)
+        assert len(reduced["index"]) <= 100
+        assert reduced["index"][0] == 0 and reduced["index"][-1] == 999
+
+    def test_unstable_simulation_is_rejected(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "henon", "steps": 100, "params": {"a": 1.4, "b": 0.3, "initial": [50, 50]}}
+        pk = api_client_unit.post(reverse('simulation-create'), data, format='json').data["id"]
+
+        response = api_client_unit.post(reverse('simulation-extend', args=[pk]), {"steps": 10}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_other_users_simulation_is_not_found(self, created, api_client_unit):
+        other = User.objects.create_user(username="other", password="password")
+        api_client_unit.force_authenticate(user=other)
+
+        response = api_client_unit.post(reverse('simulation-extend', args=[created.pk]), {"steps": 10}, format='json')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestModelRegistry:
+    @pytest.mark.parametrize("expression", [
+        "__import__('os').system('true')", "x.__class__", "[x, y]", "(lambda: x)()", "q * x", "sin(x, y)", "'x'",
+    ])
+    def test_unsafe_or_unknown_expressions_are_rejected(self, expression):
+        with pytest.raises(ValueError):
+            registry.parse_expression(expression, {"x", "y"})
+
+    def test_vectorized_kernel_matches_scalar_kernel(self):
+        system = registry.get("rossler")
+        values = system.values({"c": 4.0})
+        state = np.array([[1.0, 2.0, 3.0], [-0.5, 0.25, 2.0]])
+
+        vectorized = system.vector(values)(state)
+
+        assert np.allclose(vectorized, [system.scalar(values)(*row) for row in state])
+        assert registry.compile_kernel(system.variables, tuple(system.parameters), system.expressions, True) is (
+            registry.compile_kernel(system.variables, tuple(system.parameters), system.expressions, True)
+        )
+
+    @pytest.mark.parametrize("model, initial", [("rossler", [1, 1, 1]), ("chen", [-0.1, 0.5, -0.6]), ("duffing", [0.1, 0.1])])
+    def test_registered_models_run_through_the_api(self, model, initial, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+
+        single = api_client_unit.post(reverse('simulation-create'), {
+            "model": model, "steps": 2000, "params": {"initial": initial, "method": "euler"},
+        }, format='json')
+        ensemble = api_client_unit.post(reverse('simulation-ensemble'), {
+            "model": model, "steps": 500, "params": {"initial": [initial, [v + 0.01 for v in initial]]},
+        }, format='json')
+
+        assert single.status_code == ensemble.status_code == status.HTTP_201_CREATED
+        assert single.data["is_stable"] and ensemble.data["is_stable"]
+        assert single.data["results"]["length"] == 2000
+        assert len(ensemble.json()["results"]["x"]) == 2
+
+    def test_non_numeric_parameter_is_rejected(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "rossler", "steps": 10, "params": {"initial": [1, 1, 1], "c": "5.7"}}
+
+        response = api_client_unit.post(reverse('simulation-create'), data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "c" in response.data
+
+
+class TestSimulationJobs:
+    @pytest.fixture(autouse=True)
+    def inline_jobs(self, settings):
+        settings.SIMULATION_JOB_WORKERS = 0
+
+    def test_create_job_returns_accepted_and_stores_result(self, mock_user, api_client_unit):
+        url = reverse('simulation-job-create')
+        data = {"model": "henon", "steps": 100, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response["Location"] == reverse('simulation-job-detail', args=[response.data["id"]])
+
+        job = api_client_unit.get(response["Location"]).data
+        assert job["status"] == "done"
+        assert job["progress"] == 1.0
+        simulation = Simulation.objects.get(pk=job["simulation"])
+        assert simulation.user == mock_user
+        assert len(simulation.get_results()["x"]) == 100
+
+    @patch('simulations.runner.physics.thomas_attractor')
+    def test_failed_job_reports_error(self, mock_thomas, mock_user, api_client_unit):
+        mock_thomas.side_effect = OverflowError("math range error")
+        url = reverse('simulation-job-create')
+        data = {"model": "thomas", "params": {"b": 0.18, "initial": [1, 1, 1]}}
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        job = SimulationJob.objects.get(pk=response.data["id"])
+        assert job.status == SimulationJob.Statuses.FAILED
+        assert "math range error" in job.error
+        assert Simulation.objects.count() == 0
+
+    def test_job_of_another_user_is_hidden(self, mock_user, api_client_unit):
+        other = User.objects.create_user(username='other', password='password')
+        job = SimulationJob.objects.create(user=other, input_params={"model": "henon"})
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.get(reverse('simulation-job-detail', args=[job.pk]))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_physics_reports_progress(self):
+        reported = []
+
+        physics.henon_map(0.1, 0.1, steps=3 * physics.PROGRESS_INTERVAL, progress=reported.append)
+
+        assert reported == [0.0, 1 / 3, 2 / 3]
+
+
+class TestBatchCreate:
+    @pytest.fixture(autouse=True)
+    def inline_batches(self, settings):
+        settings.SIMULATION_BATCH_WORKERS = 0
+
+    def test_batch_reports_per_item_results_and_errors(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        henon = {"model": "henon", "steps": 200, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+        lorenz = {"model": "lorenz", "steps": 300, "params": {"sigma": 10, "rho": 28, "beta": 8 / 3, "initial": [1, 1, 1]}}
+        invalid = {"model": "henon", "steps": 10, "params": {"a": 1.4}}
+        non_numeric = {**henon, "params": {**henon["params"], "initial": ["a", 0.1]}}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client_unit.post(reverse('simulation-batch-create'), {
+                "simulations": [henon, invalid, lorenz, {**henon, "color": "#ff0000"}, non_numeric],
+            }, format='json')
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        statuses = [entry["status"] for entry in response.data["results"]]
+        assert statuses == [201, 400, 201, 201, 400]
+        assert "Henon model requires" in str(response.data["results"][1]["errors"]["non_field_errors"])
+        assert "list of 2 numbers" in str(response.data["results"][4]["errors"])
+        inserts = [q["sql"] for q in queries if q["sql"].startswith('INSERT INTO "simulations_simulation"')]
+        assert len(inserts) == 1
+
+        first, _, second, recolored, _ = (entry.get("simulation") for entry in response.data["results"])
+        stored = Simulation.objects.get(pk=second["id"]).get_results()
+        assert np.array_equal(stored["x"], physics.lorenz_attractor(1, 1, 1, steps=300)["columns"]["x"])
+        assert Simulation.objects.get(pk=recolored["id"]).results["color"] == "#ff0000"
+        assert Simulation.objects.get(pk=first["id"]).results["color"] == "#0000ff"
+        assert ResultCacheEntry.objects.count() == 2
+
+    def test_pool_workers_compute_the_batch(self, settings, mock_user, api_client_unit):
+        settings.SIMULATION_BATCH_WORKERS = 2
+        api_client_unit.force_authenticate(user=mock_user)
+        items = [
+            {"model": "henon", "steps": 100, "params": {"a": a, "b": 0.3, "initial": [0.1, 0.1]}}
+            for a in (1.0, 1.2, 1.4)
+        ]
+
+        response = api_client_unit.post(reverse('simulation-batch-create'), {"simulations": items}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        for item, entry in zip(items, response.data["results"]):
+            stored = Simulation.objects.get(pk=entry["simulation"]["id"]).get_results()
+            assert np.array_equal(stored["x"], physics.henon_map(0.1, 0.1, a=item["params"]["a"], steps=100)["columns"]["x"])
+
+    def test_batch_total_is_limited(self, settings, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        item = {"model": "henon", "steps": 2500, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+        # Every item fits the limit on its own, the three together do not.
+        settings.SIMULATION_MAX_REQUEST_SECONDS = 2.5 * admission.trajectory_cost(item).seconds
+
+        response = api_client_unit.post(reverse('simulation-batch-create'), {"simulations": [item] * 3}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "split it into smaller batches" in str(response.data["simulations"])
+        assert not Simulation.objects.exists()
+        assert not ComputeCharge.objects.exists()
+
+    def test_batch_size_is_limited(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(reverse('simulation-batch-create'), {"simulations": [{}] * 101}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestAdmissionControl:
+    HENON = {"model": "henon", "steps": 1000, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+
+    def test_cost_grows_with_steps_dimension_and_method(self):
+        lorenz = {"model": "lorenz", "steps": 1000, "params": {"initial": [1, 1, 1]}}
+        euler = admission.trajectory_cost(lorenz)
+
+        assert admission.trajectory_cost({**lorenz, "steps": 2000}).seconds == 2 * euler.seconds
+        assert admission.trajectory_cost(self.HENON).seconds < euler.seconds
+        assert admission.trajectory_cost({**lorenz, "params": {"method": "rk4", "initial": [1, 1, 1]}}).seconds > euler.seconds
+
+    def test_rk45_cost_follows_time_span_and_tolerance(self):
+        rk45 = {"model": "lorenz", "steps": 5, "params": {"method": "rk45", "initial": [1, 1, 1]}}
+        short = admission.trajectory_cost(rk45)
+        long = admission.trajectory_cost({**rk45, "params": {**rk45["params"], "dt": 20}})
+        tight = admission.trajectory_cost({**rk45, "params": {**rk45["params"], "dt": 20, "rtol": 1e-10}})
+
+        assert short.seconds < long.seconds < tight.seconds
+        assert tight.seconds > 1
+        assert tight.memory == short.memory
+
+    def test_large_runs_are_rejected_or_sent_to_the_job_queue(self, settings, mock_user, api_client_unit):
+        settings.SIMULATION_MAX_REQUEST_SECONDS = 0.001
+        settings.SIMULATION_JOB_WORKERS = 0
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(reverse('simulation-create'), self.HENON, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "submit it as a background job" in response.data["steps"]
+        assert Simulation.objects.count() == 0
+
+        response = api_client_unit.post(reverse('simulation-job-create'), self.HENON, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert SimulationJob.objects.get().status == SimulationJob.Statuses.DONE
+
+        response = api_client_unit.post(reverse('simulation-create'), {**self.HENON, "steps": 10 ** 9}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "MiB" in response.data["steps"]
+
+    def test_concurrent_runs_per_user_are_limited(self, settings, mock_user, api_client_unit):
+        settings.SIMULATION_USER_CONCURRENCY = 1
+        api_client_unit.force_authenticate(user=mock_user)
+        ComputeCharge.objects.create(
+            user=mock_user, seconds=0, created_at=timezone.now() - timedelta(seconds=settings.SIMULATION_USER_QUOTA_WINDOW + 1)
+        )
+
+        response = api_client_unit.post(reverse('simulation-create'), self.HENON, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+
+        ComputeCharge.objects.create(user=mock_user, seconds=0)
+        response = api_client_unit.post(reverse('simulation-create'), self.HENON, format='json')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+        other = User.objects.create_user(username='other', password='password')
+        api_client_unit.force_authenticate(user=other)
+        response = api_client_unit.post(reverse('simulation-create'), self.HENON, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_quota_is_charged_with_the_time_runs_took(self, settings, mock_user, api_client_unit):
+        settings.SIMULATION_USER_QUOTA_SECONDS = 100
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(reverse('simulation-create'), self.HENON, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        charge = ComputeCharge.objects.get()
+        assert charge.finished_at is not None
+        assert 0 < charge.seconds < 100
+
+        ComputeCharge.objects.filter(pk=charge.pk).update(seconds=100)
+        response = api_client_unit.post(reverse('simulation-create'), self.HENON, format='json')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert 0 < int(response["Retry-After"]) <= settings.SIMULATION_USER_QUOTA_WINDOW
+
+    def test_runs_over_their_wall_clock_budget_are_stopped(self, settings, mock_user, api_client_unit):
+        with pytest.raises(admission.BudgetExceeded):
+            physics.henon_map(0.1, 0.1, steps=3 * physics.PROGRESS_INTERVAL, progress=admission.deadline(-1))
+        with pytest.raises(admission.BudgetExceeded):
+            # Few stored points, but many internal rk45 steps between them.
+            physics.lorenz_attractor(1, 1, 1, dt=20, steps=5, method="rk45", rtol=1e-10, progress=admission.deadline(-1))
+
+        settings.SIMULATION_REQUEST_TIMEOUT = 0
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {**self.HENON, "steps": 3 * physics.PROGRESS_INTERVAL}
+
+        response = api_client_unit.post(reverse('simulation-create'), data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "wall-clock budget" in response.data["error"]
+        assert Simulation.objects.count() == 0
+        assert ComputeCharge.objects.get().finished_at is not None
+
+    def test_ensembles_and_sweeps_over_their_budget_are_stopped(self, settings, mock_user, api_client_unit):
+        henon = registry.get("henon")
+        with pytest.raises(admission.BudgetExceeded):
+            henon.ensemble([[0.1, 0.1]] * 10, steps=1000, progress=admission.deadline(-1), a=1.4, b=0.3)
+        with pytest.raises(admission.BudgetExceeded):
+            henon.bifurcation([0.1, 0.1], progress=admission.deadline(-1), a=np.linspace(1, 1.4, 10), b=0.3)
+
+        settings.SIMULATION_REQUEST_TIMEOUT = 0
+        api_client_unit.force_authenticate(user=mock_user)
+        ensemble = {**self.HENON, "params": {**self.HENON["params"], "initial": [[0.1, 0.1], [0.2, 0.2]]}}
+        sweep = {**self.HENON, "parameter": "a", "start": 1.0, "stop": 1.4, "resolution": 10}
+
+        responses = [
+            api_client_unit.post(reverse('simulation-ensemble'), ensemble, format='json'),
+            api_client_unit.post(reverse('simulation-bifurcation'), sweep, format='json'),
+        ]
+
+        for response in responses:
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert "wall-clock budget" in response.data["error"]
+        assert Simulation.objects.count() == 0
+
+
+class TestAsyncViews:
+    def test_create_history_and_detail_are_async(self):
+        from simulations.views import SimulationCreateView, SimulationDetailView, SimulationHistoryView
+
+        for view in (SimulationCreateView, SimulationHistoryView, SimulationDetailView):
+            assert iscoroutinefunction(view.as_view())
+
+    def test_reads_are_served_while_a_simulation_runs(self, mock_user):
+        stored = Simulation.objects.create(
+            user=mock_user, model_type="henon", input_params={},
+            **storage.pack_results({**physics.henon_map(0.1, 0.1, steps=100)["columns"], "color": "#0000ff"}),
+        )
+        data = {"model": "henon", "steps": 100, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+        released = threading.Event()
+        henon_map = physics.henon_map
+
+        def slow_henon(*args, **kwargs):
+            assert released.wait(10), "the read waited for the running simulation"
+            return henon_map(*args, **kwargs)
+
+        async def scenario():
+            client = AsyncClient()
+            await client.aforce_login(mock_user)
+            create = asyncio.ensure_future(
+                client.post(reverse('simulation-create'), data, content_type='application/json')
+            )
+            await asyncio.sleep(0.1)
+            detail = await client.get(reverse('simulation-detail', args=[stored.pk]))
+            history = await client.get(reverse('simulation-history'))
+            released.set()
+            return detail, history, await create
+
+        with patch('simulations.runner.physics.henon_map', side_effect=slow_henon):
+            detail, history, created = async_to_sync(scenario)()
+
+        assert detail.status_code == status.HTTP_200_OK
+        assert detail.json()["results"]["x"] == stored.get_results()["x"].tolist()
+        assert [entry["id"] for entry in history.json()["results"]] == [stored.pk]
+        assert created.status_code == status.HTTP_201_CREATED
+        assert "integrate" in created["Server-Timing"]
+
+
+def read_stream(response):
+    if not response.is_async:
+        return b"".join(response.streaming_content)
+
+    async def collect():
+        return b"".join([part async for part in response.streaming_content])
+    return async_to_sync(collect)()
+
+
+class TestSimulationStream:
+    def test_stream_matches_single_run(self):
+        chunks = physics.stream(physics.thomas_attractor, (1, 1, 1), 2500, chunk_size=1000, b=0.18, dt=0.01)
+        received = list(chunks)
+
+        assert [len(chunk["x"]) for chunk in received] == [1000, 1000, 500]
+        full = physics.thomas_attractor(1, 1, 1, b=0.18, dt=0.01, steps=2500)["columns"]
+        assert list(np.concatenate([chunk["z"] for chunk in received])) == list(full["z"])
+
+    def test_stream_returns_stability(self):
+        chunks = physics.stream(physics.henon_map, (50.0, 50.0), 5000, a=1.4, b=0.3)
+
+        with pytest.raises(StopIteration) as stop:
+            while True:
+                next(chunks)
+        assert stop.value.value is False
+
+    def test_stream_endpoint_ndjson(self, mock_user, api_client_unit):
+        url = reverse('simulation-stream')
+        data = {"model": "henon", "steps": 2500, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in read_stream(response).splitlines()]
+        assert [line["event"] for line in lines] == ["points", "points", "points", "done"]
+        simulation = Simulation.objects.get(pk=lines[-1]["id"])
+        assert simulation.get_results()["x"].tolist() == [x for line in lines[:-1] for x in line["x"]]
+
+    def test_stream_endpoint_sse(self, mock_user, api_client_unit):
+        url = reverse('simulation-stream')
+        data = {"model": "lorenz", "steps": 10, "params": {"sigma": 10, "rho": 28, "beta": 2.667, "initial": [1, 1, 1]}}
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json', HTTP_ACCEPT='text/event-stream')
+
+        body = read_stream(response).decode()
+        assert response["Content-Type"] == "text/event-stream"
+        assert body.startswith("event: points\ndata: ")
+        assert "event: done\n" in body
+        assert Simulation.objects.count() == 1
+
+    def test_stream_stores_blocks_as_they_are_produced(self, monkeypatch, mock_user, api_client_unit):
+        monkeypatch.setattr(runner, "STREAM_BLOCK_SIZE", 1000)
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "henon", "steps": 2500, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+
+        response = api_client_unit.post(reverse('simulation-stream'), data, format='json')
+        parts = iter(response.streaming_content)
+        first = next(parts)
+        # The first block is stored before the stream ends.
+        assert Simulation.objects.get().results["length"] == 1000
+
+        lines = [json.loads(line) for line in (first + b"".join(parts)).splitlines()]
+        simulation = Simulation.objects.get(pk=lines[-1]["id"])
+        assert simulation.segments.count() == 2
+        expected = physics.henon_map(0.1, 0.1, a=1.4, b=0.3, steps=2500)["columns"]
+        assert simulation.get_results()["x"].tolist() == expected["x"].tolist()
+        assert simulation.results["final_state"] == [expected["x"][-1], expected["y"][-1]]
+
+    def test_stream_cut_short_is_not_stored(self, monkeypatch, mock_user, api_client_unit):
+        monkeypatch.setattr(runner, "STREAM_BLOCK_SIZE", 1000)
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "henon", "steps": 2500, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+
+        response = api_client_unit.post(reverse('simulation-stream'), data, format='json')
+        parts = iter(response.streaming_content)
+        next(parts), next(parts)
+        response.close()
+
+        assert not Simulation.objects.exists()
+        assert ComputeCharge.objects.get(user=mock_user).finished_at is not None
+
+    def test_unread_stream_releases_its_charge(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "henon", "steps": 2500, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+
+        response = api_client_unit.post(reverse('simulation-stream'), data, format='json')
+        assert ComputeCharge.objects.get(user=mock_user).finished_at is None
+        response.close()
+
+        assert ComputeCharge.objects.get(user=mock_user).finished_at is not None
+        assert not Simulation.objects.exists()
+
+    def test_asgi_sends_the_first_chunk_before_the_run_finishes(self, mock_user):
+        client = Client()
+        client.force_login(mock_user)
+        body = json.dumps({"model": "henon", "steps": 300000, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}})
+        token = "a" * 32
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+            "path": reverse('simulation-stream'), "query_string": b"", "root_path": "",
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+            "headers": [
+                (b"host", b"testserver"), (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"cookie", f"sessionid={client.cookies['sessionid'].value}; csrftoken={token}".encode()),
+                (b"x-csrftoken", token.encode()),
+            ],
+        }
+        arrivals = []
+
+        async def scenario():
+            requests = [{"type": "http.request", "body": body.encode(), "more_body": False}]
+            finished = asyncio.Event()
+
+            async def receive():
+                if requests:
+                    return requests.pop()
+                await finished.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                if message["type"] == "http.response.body":
+                    arrivals.append(time.perf_counter())
+                    if not message.get("more_body"):
+                        finished.set()
+
+            started = time.perf_counter()
+            await ASGIHandler()(scope, receive, send)
+            return started
+
+        # As the test client does: these would close the connection of the test transaction.
+        signals.request_started.disconnect(close_old_connections)
+        signals.request_finished.disconnect(close_old_connections)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                started = async_to_sync(scenario)()
+        finally:
+            signals.request_started.connect(close_old_connections)
+            signals.request_finished.connect(close_old_connections)
+
+        assert len(arrivals) > 300
+        assert arrivals[0] - started < (arrivals[-1] - started) / 10
+        assert Simulation.objects.filter(user=mock_user).count() == 1
+
+    def test_wsgi_sends_the_first_chunk_before_the_run_finishes(self, mock_user):
+        client = Client()
+        client.force_login(mock_user)
+        body = json.dumps({"model": "henon", "steps": 300000, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}})
+        token = "a" * 32
+        environ = RequestFactory().post(
+            reverse('simulation-stream'), body, content_type="application/json",
+            HTTP_COOKIE=f"sessionid={client.cookies['sessionid'].value}; csrftoken={token}", HTTP_X_CSRFTOKEN=token,
+        ).environ
+        arrivals = []
+
+        signals.request_started.disconnect(close_old_connections)
+        signals.request_finished.disconnect(close_old_connections)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                started = time.perf_counter()
+                # As a WSGI server does: iterate the returned body, then close it.
+                result = WSGIHandler()(environ, lambda status, headers: None)
+                try:
+                    for _ in result:
+                        arrivals.append(time.perf_counter())
+                finally:
+                    result.close()
+        finally:
+            signals.request_started.connect(close_old_connections)
+            signals.request_finished.connect(close_old_connections)
+
+        assert len(arrivals) > 300
+        assert arrivals[0] - started < (arrivals[-1] - started) / 10
+        assert Simulation.objects.filter(user=mock_user).count() == 1
+
+
+class TestTrajectoryStorage:
+    def test_pack_keeps_only_metadata_in_json(self):
+        columns = physics.lorenz_attractor(1, 1, 1, steps=500)["columns"]
+
+        packed = storage.pack_results({**columns, "color": "#ff0000"})
+
+        assert set(packed["results"]) == {"color", "length", "bounds"}
+        assert packed["results"]["length"] == 500
+        assert packed["results"]["bounds"]["z"] == [min(columns["z"]), max(columns["z"])]
+        unpacked = storage.unpack_results(packed["results"], packed["trajectory"])
+        assert unpacked["x"].tolist() == columns["x"].tolist()
+
+    def test_pack_ensemble_keeps_ragged_trajectories(self):
+        results = {"x": [[1.0], [2.0, 3.0]], "y": [[4.0], [5.0, 6.0]], "stable": [True, False]}
+
+        packed = storage.pack_results(results, dtype="float32")
+        unpacked = storage.unpack_results(packed["results"], packed["trajectory"])
+
+        assert [column.tolist() for column in unpacked["y"]] == [[4.0], [5.0, 6.0]]
+        assert unpacked["y"][0].dtype == np.float32
+        assert unpacked["stable"] == [True, False]
+
+    def test_detail_output_is_unchanged(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "lorenz", "steps": 20, "params": {"sigma": 10, "rho": 28, "beta": 2.667, "initial": [1, 1, 1]}}
+        created = api_client_unit.post(reverse('simulation-create'), data, format='json').json()
+
+        detail = api_client_unit.get(reverse('simulation-detail', args=[created["id"]])).json()
+
+        expected = physics.lorenz_attractor(1, 1, 1, sigma=10, rho=28, beta=2.667, steps=20)["columns"]
+        assert detail["results"]["x"] == expected["x"].tolist()
+        assert detail["results"]["color"] == "#0000ff"
+        assert "trajectory" not in detail
+
+
+class TestResultCache:
+    payload = {"model": "lorenz", "steps": 50, "params": {"sigma": 10, "rho": 28, "beta": 2.5, "initial": [1, 1, 1]}}
+
+    def test_key_ignores_color_defaults_and_number_formatting(self):
+        a = {**self.payload, "color": "#ff0000", "params": {**self.payload["params"], "method": "euler"}}
+        b = {**self.payload, "color": "#00ff00", "params": {
+            "sigma": 10.0, "rho": 28.0, "beta": 2.5, "dt": 0.01, "initial": [1.0, 1.0, 1.0], "rtol": 1e-3
+        }}
+
+        assert result_cache.result_key(a) == result_cache.result_key(b)
+        assert result_cache.result_key(a) != result_cache.result_key({**self.payload, "steps": 51})
+
+    def test_key_changes_with_result_version(self, monkeypatch):
+        key = result_cache.result_key(self.payload)
+        monkeypatch.setattr(result_cache, "RESULT_VERSION", result_cache.RESULT_VERSION + 1)
+
+        assert result_cache.result_key(self.payload) != key
+
+    def test_repeat_request_from_another_user_reuses_result(self, mock_user, api_client_unit):
+        other = User.objects.create_user(username='other', password='password')
+        url = reverse('simulation-create')
+
+        with patch('simulations.runner.physics.lorenz_attractor', wraps=physics.lorenz_attractor) as lorenz:
+            api_client_unit.force_authenticate(user=mock_user)
+            first = api_client_unit.post(url, self.payload, format='json').json()
+            api_client_unit.force_authenticate(user=other)
+            second = api_client_unit.post(url, {**self.payload, "color": "#123456"}, format='json').json()
+
+        lorenz.assert_called_once()
+        assert second["results"]["x"] == first["results"]["x"]
+        assert second["results"]["color"] == "#123456"
+        assert Simulation.objects.filter(user=other).count() == 1
+        assert result_cache.stats()["hits"] == 1
+        assert result_cache.stats()["misses"] == 1
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for steps in (10, 20, 30):
+            result_cache.cached_simulation({**self.payload, "steps": steps, "color": "#000000"})
+        sizes = dict(ResultCacheEntry.objects.values_list("results__length", "size"))
+        result_cache.get(ResultCacheEntry.objects.get(results__length=10).key)
+
+        evicted = result_cache.evict(max_bytes=sizes[10] + sizes[30])
+
+        assert evicted == 1
+        assert sorted(ResultCacheEntry.objects.values_list("results__length", flat=True)) == [10, 30]
+        assert result_cache.stats()["evictions"] == 1
+
+    def test_stats_are_staff_only(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        assert api_client_unit.get(reverse('simulation-cache-stats')).status_code == status.HTTP_403_FORBIDDEN
+
+        mock_user.is_staff = True
+        mock_user.save()
+        response = api_client_unit.get(reverse('simulation-cache-stats'))
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data) >= {"hits", "misses", "evictions", "entries", "size_bytes"}
+
+
+class TestDetailDownsampling:
+    @pytest.fixture
+    def simulation(self, mock_user):
+        columns = physics.lorenz_attractor(1, 1, 1, steps=20000)["columns"]
+        return Simulation.objects.create(
+            user=mock_user, model_type="lorenz", input_params={},
+            **storage.pack_results({**columns, "color": "#0000ff"}),
+        )
+
+    def test_decimate_keeps_extremes(self):
+        columns = physics.thomas_attractor(1, 1, 1, steps=10000)["columns"]
+        arrays = {axis: np.asarray(column) for axis, column in columns.items()}
+
+        index = storage.decimate(arrays, 600)
+
+        assert len(index) <= 602
+        for column in arrays.values():
+            assert column.argmin() in index
+            assert column.argmax() in index
+
+    def test_max_points_uses_overview_without_trajectory(self, simulation, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        url = reverse('simulation-detail', args=[simulation.pk])
+
+        with patch.object(storage, 'unpack_columns', side_effect=AssertionError("full trajectory read")):
+            response = api_client_unit.get(url, {"max_points": 5000})
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.json()["results"]
+        assert 1000 < len(results["x"]) <= 5000
+        assert results["index"][0] == 0 and results["index"][-1] == 19999
+
+    def test_range_slice_is_exact(self, simulation, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        url = reverse('simulation-detail', args=[simulation.pk])
+
+        results = api_client_unit.get(url, {"start": 100, "end": 150}).json()["results"]
+
+        full = simulation.get_results()
+        assert results["index"] == list(range(100, 150))
+        assert results["z"] == full["z"][100:150].tolist()
+
+    def test_invalid_range_is_rejected(self, simulation, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        url = reverse('simulation-detail', args=[simulation.pk])
+
+        response = api_client_unit.get(url, {"start": 10, "end": 5})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestDetailConditionalGet:
+    @pytest.fixture
+    def simulation(self, mock_user):
+        columns = physics.lorenz_attractor(1, 1, 1, steps=2000)["columns"]
+        return Simulation.objects.create(
+            user=mock_user, model_type="lorenz", input_params={},
+            **storage.pack_results({**columns, "color": "#0000ff", "final_state": [1.0, 1.0, 1.0]}),
+        )
+
+    def test_revalidation_skips_the_results(self, simulation, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        url = reverse('simulation-detail', args=[simulation.pk])
+
+        first = api_client_unit.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            cached = api_client_unit.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        since = api_client_unit.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        windowed = api_client_unit.get(url, {"max_points": 100}, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        assert first.status_code == status.HTTP_200_OK
+        assert first["ETag"].startswith('"')
+        # Still extendable: the browser must revalidate.
+        assert "no-cache" in first["Cache-Control"] and "private" in first["Cache-Control"]
+        assert cached.status_code == since.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached["ETag"] == first["ETag"]
+        # Only the version query: no trajectory, overview or segment blobs.
+        sql = " ".join(query["sql"] for query in queries.captured_queries if "simulations_" in query["sql"])
+        assert '"trajectory"' not in sql and '"overview"' not in sql
+        assert windowed.status_code == status.HTTP_200_OK
+        assert windowed["ETag"] != first["ETag"]
+
+    def test_gzipped_responses_revalidate_with_their_weak_etag(self, simulation, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        url = reverse('simulation-detail', args=[simulation.pk])
+
+        plain = api_client_unit.get(url)
+        gzipped = api_client_unit.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        cached = api_client_unit.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=gzipped["ETag"])
+
+        assert gzipped["Content-Encoding"] == "gzip"
+        assert not plain["ETag"].startswith("W/")
+        assert gzipped["ETag"] == f'W/{plain["ETag"]}'
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_extending_changes_the_etag(self, simulation, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        simulation.input_params = {
+            "model": "lorenz", "steps": 2000, "params": {"sigma": 10, "rho": 28, "beta": 8 / 3, "initial": [1, 1, 1]},
+        }
+        simulation.save()
+        url = reverse('simulation-detail', args=[simulation.pk])
+        etag = api_client_unit.get(url)["ETag"]
+
+        extended = api_client_unit.post(reverse('simulation-extend', args=[simulation.pk]), {"steps": 100}, format='json')
+        response = api_client_unit.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert extended.status_code == status.HTTP_201_CREATED
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    def test_finished_runs_are_cached_long(self, mock_user, api_client_unit, settings):
+        api_client_unit.force_authenticate(user=mock_user)
+        simulation = Simulation.objects.create(
+            user=mock_user, model_type="henon", input_params={}, is_stable=False,
+            **storage.pack_results({"x": [0.1, 0.2], "y": [0.3, 0.4], "color": "#0000ff"}),
+        )
+
+        response = api_client_unit.get(reverse('simulation-detail', args=[simulation.pk]))
+
+        assert f"max-age={settings.SIMULATION_DETAIL_MAX_AGE}" in response["Cache-Control"]
+        assert "private" in response["Cache-Control"]
+
+
+def decode_trajectory(content):
+    assert content[:4] == b"TRAJ"
+    (size,) = struct.unpack("<I", content[4:8])
+    header = json.loads(content[8:8 + size])
+    start = -(-(8 + size) // 8) * 8
+    columns = {
+        column["name"]: np.frombuffer(content, column["dtype"], column["length"], start + column["offset"])
+        for column in header.pop("columns")
+    }
+    return header, columns
+
+
+class TestWireFormats:
+    @pytest.fixture
+    def simulation(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        columns = physics.lorenz_attractor(1, 1, 1, steps=5000)["columns"]
+        return Simulation.objects.create(
+            user=mock_user, model_type="lorenz", input_params={},
+            **storage.pack_results({**columns, "color": "#0000ff"}),
+        )
+
+    def test_binary_columns_round_trip(self, simulation, api_client_unit):
+        url = reverse('simulation-detail', args=[simulation.pk])
+
+        response = api_client_unit.get(url, {"start": 100, "end": 200, "dtype": "float64"},
+                                       HTTP_ACCEPT="application/x-trajectory", HTTP_ACCEPT_ENCODING="gzip")
+
+        assert response["Content-Type"] == "application/x-trajectory"
+        assert not response.has_header("Content-Encoding")
+        header, columns = decode_trajectory(response.content)
+        expected = simulation.get_results()
+        assert header["id"] == simulation.pk
+        assert header["results"]["length"] == 5000
+        assert columns["index"].dtype == np.dtype("<u4")
+        assert columns["index"].tolist() == list(range(100, 200))
+        assert np.array_equal(columns["z"], expected["z"][100:200])
+
+    def test_binary_float32_via_format_parameter(self, simulation, api_client_unit):
+        response = api_client_unit.get(reverse('simulation-detail', args=[simulation.pk]), {"format": "binary"})
+
+        _, columns = decode_trajectory(response.content)
+        assert columns["x"].dtype == np.dtype("<f4")
+        assert np.allclose(columns["x"], simulation.get_results()["x"], rtol=1e-6)
+        assert len(response.content) < len(api_client_unit.get(reverse('simulation-detail', args=[simulation.pk])).content) / 3
+
+    def test_json_precision(self, simulation, api_client_unit):
+        response = api_client_unit.get(reverse('simulation-detail', args=[simulation.pk]), {"precision": 3})
+
+        x = response.json()["results"]["x"]
+        assert x == np.round(simulation.get_results()["x"], 3).tolist()
+
+    def test_detail_is_gzip_compressed(self, simulation, api_client_unit):
+        response = api_client_unit.get(reverse('simulation-detail', args=[simulation.pk]), HTTP_ACCEPT_ENCODING="gzip")
+
+        assert response["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.content))["results"]["length"] == 5000
+
+    def test_stream_is_not_compressed(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "henon", "steps": 3000, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+
+        response = api_client_unit.post(reverse('simulation-stream'), data, format='json', HTTP_ACCEPT_ENCODING="gzip")
+
+        assert not response.has_header("Content-Encoding")
+        assert read_stream(response).endswith(b"}\n")
+
+
+class TestDatabaseProfile:
+    def test_concurrent_profile_pragmas(self, settings):
+        if settings.DATABASE_PROFILE != "concurrent":
+            pytest.skip("runs only under the concurrent storage profile")
+
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            synchronous = cursor.fetchone()[0]
+            cursor.execute("PRAGMA busy_timeout")
+            busy_timeout = cursor.fetchone()[0]
+
+        assert synchronous == 1
+        assert busy_timeout == 20000
+        assert connection.settings_dict["CONN_MAX_AGE"] > 0
+
+
+class TestSimulationHistory:
+    @pytest.fixture
+    def simulations(self, mock_user):
+        models = ["lorenz", "henon", "thomas"]
+        return [
+            Simulation.objects.create(
+                user=mock_user, model_type=models[i % 3], input_params={"i": i},
+                results={"x": [float(i)]}, is_stable=bool(i % 2),
+            )
+            for i in range(7)
+        ]
+
+    def test_history_is_cursor_paginated(self, simulations, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+
+        first = api_client_unit.get(reverse('simulation-history'), {"page_size": 4}).json()
+        second = api_client_unit.get(first["next"]).json()
+
+        assert [item["id"] for item in first["results"] + second["results"]] == [s.pk for s in reversed(simulations)]
+        assert second["next"] is None
+
+    def test_history_filters(self, simulations, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.get(reverse('simulation-history'), {"model_type": "lorenz", "is_stable": "false"})
+
+        expected = [s.pk for s in reversed(simulations) if s.model_type == "lorenz" and not s.is_stable]
+        assert [item["id"] for item in response.json()["results"]] == expected
+
+    def test_history_does_not_load_blobs(self, simulations, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+
+        with CaptureQueriesContext(connection) as queries:
+            api_client_unit.get(reverse('simulation-history'))
+
+        selects = [q["sql"] for q in queries if "simulations_simulation" in q["sql"]]
+        assert selects
+        assert not any(column in sql for sql in selects for column in ('"results"', '"trajectory"', '"input_params"'))
+
+    def test_history_rejects_unknown_model_type(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.get(reverse('simulation-history'), {"model_type": "pendulum"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestDensityMap:
+    def test_density_matches_histogram_of_the_full_trajectory(self):
+        columns = physics.henon_map(0.1, 0.1, steps=5000)["columns"]
+        bounds = ((-1.5, 1.5), (-0.5, 0.5))
+
+        result = physics.density(physics.henon_map, (0.1, 0.1), 5000, bins=64, bounds=bounds, chunk_size=1200)
+
+        expected, _, _ = np.histogram2d(columns["x"], columns["y"], bins=64, range=bounds)
+        assert np.array_equal(result["density"], expected)
+        assert result["length"] == 5000
+        assert result["outside"] == 0
+
+    def test_create_stores_only_the_grid(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {
+            "model": "henon", "steps": 300000, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]},
+            "density": {"bins": 128},
+        }
+
+        response = api_client_unit.post(reverse('simulation-create'), data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        results = response.data["results"]
+        assert np.asarray(results["density"]).shape == (128, 128)
+        assert np.asarray(results["density"]).sum() + results["outside"] == results["length"] == 300000
+        assert results["axes"] == ["x", "y"]
+        assert results["bounds"]["x"][0] < -1.2 and results["bounds"]["x"][1] > 1.2
+        simulation = Simulation.objects.get()
+        assert len(simulation.trajectory) < 128 * 128 * 4
+
+        binary = api_client_unit.get(reverse('simulation-detail', args=[simulation.pk]), {"max_points": 100},
+                                     HTTP_ACCEPT="application/x-trajectory")
+        header, columns = decode_trajectory(binary.content)
+        assert header["results"]["bins"] == 128
+        assert np.array_equal(columns["density"].reshape(128, 128), results["density"])
+
+        del data["density"]
+        trajectory = api_client_unit.post(reverse('simulation-create'), data, format='json')
+        assert len(trajectory.data["results"]["x"]) == 300000
+
+    def test_density_axes_must_belong_to_the_model(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {
+            "model": "henon", "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]},
+            "density": {"axes": ["x", "z"]},
+        }
+
+        response = api_client_unit.post(reverse('simulation-create'), data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Henon has only: x, y" in str(response.data)
+
+
+class TestTwinTrajectories:
+    def test_lyapunov_estimates_match_known_values(self):
+        henon = registry.get("henon").scalar({"a": 1.4, "b": 0.3})
+        result = physics.twin(lambda state: henon(*state), (0.1, 0.1), steps=50000)
+        assert result["lyapunov"] == pytest.approx(0.42, abs=0.02)
+        assert len(result["time"]) == len(result["separation"]) == 5000
+
+        lorenz = registry.get("lorenz").scalar({"sigma": 10.0, "rho": 28.0, "beta": 8 / 3})
+        result = physics.twin(physics.stepper(lorenz, 0.01, "rk4"), (1, 1, 1), steps=50000, dt=0.01)
+        assert result["lyapunov"] == pytest.approx(0.91, abs=0.1)
+
+        fixed_point = registry.get("lorenz").scalar({"sigma": 10.0, "rho": 0.5, "beta": 8 / 3})
+        result = physics.twin(physics.stepper(fixed_point, 0.01), (1, 1, 1), steps=5000, dt=0.01)
+        assert result["lyapunov"] < 0
+
+    def test_create_returns_the_separation_curve(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {
+            "model": "henon", "steps": 20000, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]},
+            "lyapunov": {"interval": 20},
+        }
+
+        response = api_client_unit.post(reverse('simulation-create'), data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        results = response.data["results"]
+        assert len(results["x"]) == 1000
+        assert results["x"][-1] == 20000
+        slope = (results["y"][-1] - results["y"][0]) / (results["x"][-1] - results["x"][0])
+        assert slope == pytest.approx(results["lyapunov"], abs=0.05)
+        assert "final_state" not in results
+
+    def test_twin_trajectories_need_fixed_steps(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {
+            "model": "lorenz", "params": {"sigma": 10, "rho": 28, "beta": 8 / 3, "initial": [1, 1, 1], "method": "rk45"},
+            "lyapunov": {},
+        }
+
+        response = api_client_unit.post(reverse('simulation-create'), data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Twin trajectories support only" in str(response.data)
+
+
+class TestPoincareSection:
+    def test_crossings_are_interpolated_onto_the_plane(self):
+        lorenz = registry.get("lorenz").scalar({"sigma": 10.0, "rho": 28.0, "beta": 8 / 3})
+
+        coarse = physics.poincare_section(lorenz, (1, 1, 1), axis=2, value=27, dt=0.01, steps=3000, method="rk4")
+        fine = physics.poincare_section(lorenz, (1, 1, 1), axis=2, value=27, dt=0.001, steps=30000, method="rk4")
+
+        assert coarse["stable"]
+        assert np.allclose(coarse["columns"]["z"], 27, atol=1e-9)
+        # Only upward crossings: dz/dt = xy - beta z > 0 there.
+        x, y = np.asarray(coarse["columns"]["x"]), np.asarray(coarse["columns"]["y"])
+        assert (x * y > 8 / 3 * 27).all()
+        assert np.allclose(coarse["columns"]["x"][:5], fine["columns"]["x"][:5], atol=1e-4)
+
+    def test_return_map_refines_the_maxima(self):
+        lorenz = registry.get("lorenz").scalar({"sigma": 10.0, "rho": 28.0, "beta": 8 / 3})
+        z = np.asarray(physics.lorenz_attractor(1, 1, 1, steps=5000, method="rk4")["columns"]["z"])
+        sampled = z[1:-1][(z[1:-1] > z[:-2]) & (z[1:-1] >= z[2:])]
+
+        maxima = np.asarray(physics.return_map(lorenz, (1, 1, 1), dt=0.01, steps=5000, method="rk4")["maxima"])
+
+        assert len(maxima) == len(sampled)
+        assert (maxima >= sampled - 1e-9).all()
+        assert np.allclose(maxima, sampled, atol=0.05)
+
+    def test_create_stores_only_the_section(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {
+            "model": "lorenz", "steps": 50000,
+            "params": {"sigma": 10, "rho": 28, "beta": 8 / 3, "initial": [1, 1, 1], "method": "rk4"},
+            "section": {"axis": "z", "value": 27},
+        }
+
+        plane = api_client_unit.post(reverse('simulation-create'), data, format='json')
+        maxima = api_client_unit.post(
+            reverse('simulation-create'), {**data, "section": {"kind": "maxima", "value": 5}}, format='json'
+        )
+
+        assert plane.status_code == maxima.status_code == status.HTTP_201_CREATED
+        results = plane.data["results"]
+        assert 100 < len(results["x"]) < 50000 / 50
+        assert results["section"] == {"kind": "plane", "axis": "z", "value": 27.0, "direction": "up"}
+        assert maxima.data["results"]["section"] == {"kind": "maxima", "axis": "z"}
+        assert np.array_equal(maxima.data["results"]["x"][1:], maxima.data["results"]["y"][:-1])
+
+    def test_sections_need_a_flow(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "henon", "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}, "section": {"axis": "x"}}
+
+        response = api_client_unit.post(reverse('simulation-create'), data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "sections need a flow" in str(response.data)
+
+
+class TestChaosMap:
+    def test_vectorized_estimates_match_single_twins(self):
+        henon = registry.get("henon")
+        a_values = np.array([1.0, 1.2, 1.4, 2.0])
+
+        result = henon.lyapunov((0.1, 0.1), len(a_values), steps=5000, a=a_values, b=0.3)
+
+        assert result["stable"].tolist() == [True, True, True, False]
+        assert np.isnan(result["lyapunov"][3])
+        for a, estimate in zip(a_values[:3], result["lyapunov"]):
+            kernel = henon.scalar({"a": a, "b": 0.3})
+            single = physics.twin(lambda state: kernel(*state), (0.1, 0.1), steps=5000)
+            assert estimate == pytest.approx(single["lyapunov"], abs=1e-6)
+
+    def test_command_resumes_an_interrupted_map(self):
+        arguments = ["henon", "a", "1.0", "1.4", "b", "0.2", "0.3"]
+        options = {"resolution": 8, "steps": 2000, "transient": 100, "chunk_size": 10, "workers": 0}
+
+        save_chunk = chaos.save_chunk
+
+        def interrupted(chaos_map, index, values):
+            if index == 3:
+                raise KeyboardInterrupt
+            save_chunk(chaos_map, index, values)
+
+        with patch.object(chaos, "save_chunk", side_effect=interrupted):
+            with pytest.raises(CommandError, match="rerun with --resume"):
+                call_command("chaos_map", *arguments, **options)
+        chaos_map = ChaosMap.objects.get()
+        assert chaos_map.status == ChaosMap.Statuses.RUNNING
+        assert chaos_map.chunks.count() == 3
+
+        with patch.object(chaos, "compute_chunk", wraps=chaos.compute_chunk) as compute_chunk:
+            call_command("chaos_map", *arguments, **options)
+
+        assert [call.args[1] for call in compute_chunk.call_args_list] == [3, 4, 5, 6]
+        chaos_map.refresh_from_db()
+        assert chaos_map.status == ChaosMap.Statuses.DONE
+        grid = chaos_map.grid()
+        assert grid.shape == (8, 8)
+        # a=1.0 is periodic, a=1.4 with b=0.3 chaotic.
+        assert grid[0, 0] < 0 < grid[7, 7]
+
+    def test_detail_returns_the_grid(self, mock_user, api_client_unit):
+        call_command("chaos_map", "henon", "a", "1.0", "1.4", "b", "0.2", "0.3",
+                     resolution=4, steps=1000, chunk_size=6, workers=0)
+        api_client_unit.force_authenticate(user=mock_user)
+        chaos_map = ChaosMap.objects.get()
+        chaos_map.chunks.filter(index=2).delete()
+
+        listing = api_client_unit.get(reverse('chaos-map-list'))
+        response = api_client_unit.get(reverse('chaos-map-detail', args=[chaos_map.pk]))
+
+        assert listing.data[0]["chunks_done"] == 2
+        assert listing.data[0]["chunks_total"] == 3
+        assert "grid" not in listing.data[0]
+        grid = response.data["grid"]
+        assert len(grid) == 4 and all(len(row) == 4 for row in grid)
+        assert grid[3][2:] == [None, None]
+        assert all(value is not None for row in grid[:3] for value in row)
+
+
+class TestBifurcation:
+    def test_henon_sweep_matches_single_runs(self):
+        a_values = np.array([0.3, 1.0, 1.4])
+
+        sweep = registry.get("henon").bifurcation([0.1, 0.1], transient=100, samples=50, a=a_values, b=0.3)
+
+        for i, a in enumerate(a_values):
+            single = physics.henon_map(0.1, 0.1, a=a, b=0.3, steps=150)["columns"]["x"]
+            assert np.allclose(sweep["values"][sweep["index"] == i], single[100:])
+
+    def test_lorenz_sweep_records_z_maxima(self):
+        lorenz = registry.get("lorenz")
+        sweep = lorenz.bifurcation(
+            [1, 1, 1], transient=2000, samples=2000, **{**lorenz.parameters, "rho": np.array([10.0, 28.0])}
+        )
+
+        assert sweep["stable"].tolist() == [True, True]
+        # rho=10 spirals into a fixed point, rho=28 is chaotic.
+        settling, chaotic = (sweep["values"][sweep["index"] == i] for i in (0, 1))
+        assert np.ptp(settling) < 0.1
+        assert np.ptp(chaotic) > 5
+
+    def test_bifurcation_endpoint(self, mock_user, api_client_unit):
+        url = reverse('simulation-bifurcation')
+        data = {
+            "model": "henon", "parameter": "a", "start": 1.0, "stop": 1.4,
+            "resolution": 40, "transient": 200, "samples": 30,
+            "params": {"b": 0.3, "initial": [0.1, 0.1]}
+        }
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        results = response.json()["results"]
+        assert len(results["x"]) == len(results["y"]) == 40 * 30
+        assert results["x"][0] == 1.0 and results["x"][-1] == 1.4
+        assert results["parameter"] == "a"
+
+    @pytest.mark.parametrize("model, parameter, start, stop", [
+        ("rossler", "c", 4.0, 6.0),
+        ("chen", "c", 20.0, 28.0),
+        ("duffing", "a", 2.5, 2.75),
+    ])
+    def test_registry_systems_can_be_swept(self, mock_user, api_client_unit, model, parameter, start, stop):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {
+            "model": model, "parameter": parameter, "start": start, "stop": stop,
+            "resolution": 5, "transient": 500, "samples": 500,
+            "params": {"initial": list(registry.get(model).initial)},
+        }
+
+        response = api_client_unit.post(reverse('simulation-bifurcation'), data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED, response.data
+        results = response.json()["results"]
+        assert results["parameter"] == parameter and results["diverged"] == []
+        assert len(results["x"]) == len(results["y"]) > 0
+        assert {results["x"][0], results["x"][-1]} <= {start, stop}
+
+    @pytest.mark.parametrize("data", [
+        {"model": "thomas", "parameter": "rho", "start": 0.1, "stop": 0.2, "params": {"initial": [1, 1, 1]}},
+        {"model": "lorenz", "parameter": "a", "start": 0.1, "stop": 0.2, "params": {"initial": [1, 1, 1]}},
+        {"model": "henon", "parameter": "a", "start": 1.0, "stop": 1.4, "resolution": 10 ** 6,
+         "params": {"b": 0.3, "initial": [0.1, 0.1]}},
+    ])
+    def test_bifurcation_rejects_invalid_sweeps(self, mock_user, api_client_unit, data):
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.post(reverse('simulation-bifurcation'), data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestRequestTiming:
+    @pytest.fixture(autouse=True)
+    def fresh_metrics(self):
+        timing.reset()
+        yield
+        timing.reset()
+
+    def test_create_reports_phases(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "henon", "steps": 100, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+
+        response = api_client_unit.post(reverse('simulation-create'), data, format='json')
+
+        phases = {entry.split(";")[0] for entry in response["Server-Timing"].split(", ")}
+        assert phases >= {"validate", "cache", "integrate", "pack", "db", "serialize", "read", "render", "total"}
+
+    def test_detail_and_history_report_phases(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "henon", "steps": 100, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+        pk = api_client_unit.post(reverse('simulation-create'), data, format='json').data["id"]
+
+        for url in (reverse('simulation-detail', args=[pk]), reverse('simulation-history')):
+            response = api_client_unit.get(url)
+            assert {"db", "serialize", "render", "total"} <= {
+                entry.split(";")[0] for entry in response["Server-Timing"].split(", ")
+            }
+
+    def test_history_labels_only_valid_model_types(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+
+        response = api_client_unit.get(reverse('simulation-history'), {"model_type": 'x"} 1\nfake_metric{a="'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        api_client_unit.get(reverse('simulation-history'), {"model_type": "henon"})
+
+        text = timing.render_metrics()
+        assert "fake_metric" not in text
+        assert 'endpoint="simulation-history",model="henon"' in text
+
+    def test_label_values_are_escaped(self):
+        timing.observe("simulation_request_steps", {"endpoint": "e", "model": 'a\\b"c\nd'}, 1)
+
+        assert 'model="a\\\\b\\"c\\nd"' in timing.render_metrics()
+
+    def test_metrics_are_staff_only_prometheus_text(self, mock_user, api_client_unit):
+        api_client_unit.force_authenticate(user=mock_user)
+        data = {"model": "henon", "steps": 5000, "params": {"a": 1.4, "b": 0.3, "initial": [0.1, 0.1]}}
+        api_client_unit.post(reverse('simulation-create'), data, format='json')
+        assert api_client_unit.get(reverse('simulation-metrics')).status_code == status.HTTP_403_FORBIDDEN
+
+        mock_user.is_staff = True
+        mock_user.save()
+        response = api_client_unit.get(reverse('simulation-metrics'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"].startswith("text/plain")
+        text = response.content.decode()
+        labels = 'endpoint="simulation-create",model="henon"'
+        assert f'simulation_request_phase_seconds_count{{{labels},phase="integrate"}} 1' in text
+        assert f'simulation_request_steps_bucket{{{labels},le="1000.0"}} 0' in text
+        assert f'simulation_request_steps_bucket{{{labels},le="10000.0"}} 1' in text
+        assert f"simulation_response_size_bytes_count{{{labels}}} 1" in text
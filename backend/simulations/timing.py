@@ -0,0 +1,158 @@
+"""
+Request phase timing.
+
+`ServerTimingMiddleware` opens a `RequestTimer` for every request. Views and
+the code they call wrap their phases in `phase(name)` and describe the
+request with `annotate(model, steps)`. The phases go back to the client in a
+`Server-Timing` header; annotated requests are also aggregated into
+histograms per endpoint, model and phase, rendered in the Prometheus text
+format by `render_metrics`.
+
+The histograms live in process memory: every server worker reports its own.
+"""
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+STEPS_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+
+METRICS = {
+    "simulation_request_phase_seconds": ("Time spent in each phase of a simulation API request.", PHASE_BUCKETS),
+    "simulation_response_size_bytes": ("Size of simulation API response bodies.", SIZE_BUCKETS),
+    "simulation_request_steps": ("Trajectory length handled by a simulation API request.", STEPS_BUCKETS),
+}
+
+_current = ContextVar("simulation_request_timer", default=None)
+_lock = Lock()
+_histograms = {}
+
+
+class RequestTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.model = None
+        self.steps = None
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing(self):
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items())
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+
+
+def start():
+    """Opens a timer for the current request; returns the token for `stop`."""
+    return _current.set(RequestTimer())
+
+
+def stop(token):
+    timer = _current.get()
+    _current.reset(token)
+    return timer
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def phase(name):
+    """Adds the time spent in the block to phase `name` of the current request, if any."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer = _current.get()
+        if timer is not None:
+            timer.add(name, time.perf_counter() - started)
+
+
+def annotate(model="", steps=None):
+    """Marks the current request for aggregation under `model` (and its step count)."""
+    timer = _current.get()
+    if timer is not None:
+        timer.model = str(model or "")
+        timer.steps = steps
+
+
+def observe(metric, labels, value):
+    key = (metric, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(METRICS[metric][1])
+        histogram.observe(value)
+
+
+def record(timer, endpoint, size=None):
+    """Aggregates a finished, annotated request into the histograms."""
+    labels = {"endpoint": endpoint, "model": timer.model}
+    for name, seconds in timer.phases.items():
+        observe("simulation_request_phase_seconds", {**labels, "phase": name}, seconds)
+    if size is not None:
+        observe("simulation_response_size_bytes", labels, size)
+    if timer.steps is not None:
+        observe("simulation_request_steps", labels, timer.steps)
+
+
+def _escape(value):
+    """A label value as the Prometheus text format quotes it."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+def _format_bound(bound):
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+def render_metrics():
+    with _lock:
+        snapshot = sorted(
+            (key, list(histogram.counts), histogram.sum, histogram.buckets)
+            for key, histogram in _histograms.items()
+        )
+
+    lines = []
+    for metric, (description, _) in METRICS.items():
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} histogram")
+        for (name, labels), counts, total, buckets in snapshot:
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, math.inf), counts):
+                cumulative += count
+                bucket_labels = _format_labels((*labels, ("le", _format_bound(bound))))
+                lines.append(f"{metric}_bucket{{{bucket_labels}}} {cumulative}")
+            lines.append(f"{metric}_sum{{{_format_labels(labels)}}} {total}")
+            lines.append(f"{metric}_count{{{_format_labels(labels)}}} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
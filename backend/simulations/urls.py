@@ -1,9 +1,26 @@
 from django.urls import path
-from .views import SimulationCreateView, SimulationHistoryView, SimulationDetailView
+from .views import (
+    SimulationCreateView, SimulationBatchCreateView, SimulationStreamView,
+    SimulationEnsembleView, SimulationBifurcationView,
+    SimulationHistoryView, SimulationDetailView, SimulationExtendView,
+    SimulationJobCreateView, SimulationJobDetailView, ChaosMapListView, ChaosMapDetailView,
+    ResultCacheStatsView, MetricsView,
+)
 
 
 urlpatterns = [
     path('create/', SimulationCreateView.as_view(), name='simulation-create'),
+    path('batch/', SimulationBatchCreateView.as_view(), name='simulation-batch-create'),
+    path('stream/', SimulationStreamView.as_view(), name='simulation-stream'),
+    path('ensemble/', SimulationEnsembleView.as_view(), name='simulation-ensemble'),
+    path('bifurcation/', SimulationBifurcationView.as_view(), name='simulation-bifurcation'),
     path('history/', SimulationHistoryView.as_view(), name='simulation-history'),
-    path('detail/<int:pk>/', SimulationDetailView.as_view(), name='simulation-detail')
+    path('detail/<int:pk>/', SimulationDetailView.as_view(), name='simulation-detail'),
+    path('detail/<int:pk>/extend/', SimulationExtendView.as_view(), name='simulation-extend'),
+    path('jobs/', SimulationJobCreateView.as_view(), name='simulation-job-create'),
+    path('jobs/<int:pk>/', SimulationJobDetailView.as_view(), name='simulation-job-detail'),
+    path('chaos-maps/', ChaosMapListView.as_view(), name='chaos-map-list'),
+    path('chaos-maps/<int:pk>/', ChaosMapDetailView.as_view(), name='chaos-map-detail'),
+    path('cache/', ResultCacheStatsView.as_view(), name='simulation-cache-stats'),
+    path('metrics/', MetricsView.as_view(), name='simulation-metrics'),
 ]
\ No newline at end of file
@@ -1,93 +1,568 @@
-from . import physics
-from .models import Simulation
+from . import admission, jobs, result_cache, storage, timing
+from .async_views import AsyncAPIViewMixin
+from .models import ChaosMap, Simulation, SimulationJob, SimulationSegment
+from .renderers import NDJSONRenderer, EventStreamRenderer, PrometheusRenderer, TrajectoryBinaryRenderer
+from .runner import (
+    StreamRecorder, extend_simulation, final_state, next_chunk, run_bifurcation, run_ensemble, run_packed,
+    stream_simulation,
+)
+import hashlib
+import json
+import time
+from asgiref.sync import sync_to_async
+from functools import partial
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, OuterRef, Q, Subquery
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from .serializers import SimulationCreateSerializer, SimulationHistorySerializer, SimulationDetailSerializer
+from rest_framework.settings import api_settings
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from .serializers import (
+    OUTPUTS,
+    SimulationCreateSerializer, SimulationBatchSerializer,
+    SimulationEnsembleSerializer, SimulationBifurcationSerializer,
+    SimulationHistorySerializer, SimulationHistoryQuerySerializer,
+    SimulationDetailSerializer, SimulationDetailQuerySerializer, SimulationExtendSerializer,
+    SimulationJobSerializer, ChaosMapSerializer, ChaosMapDetailSerializer,
+)
 
 
-class SimulationCreateView(APIView):
+class SimulationCreateView(AsyncAPIViewMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
+        serializer = SimulationCreateSerializer(data=request.data)
+        with timing.phase("validate"):
+            serializer.is_valid(raise_exception=True)
+
+        validated_data = serializer.validated_data
+        model = validated_data.get("model")
+        timing.annotate(model, validated_data.get("steps"))
+        cost = admission.trajectory_cost(validated_data)
+
+        async with admission.aadmitted(request.user, cost, settings.SIMULATION_MAX_REQUEST_SECONDS):
+            try:
+                packed, stable = await result_cache.acached_simulation(
+                    validated_data, progress=admission.deadline(settings.SIMULATION_REQUEST_TIMEOUT)
+                )
+
+                with timing.phase("db"):
+                    simulation = await Simulation.objects.acreate(
+                        user=request.user,
+                        model_type=model,
+                        input_params=validated_data,
+                        **packed,
+                        is_stable=stable,
+                    )
+
+                with timing.phase("serialize"):
+                    data = await jobs.offload(lambda: SimulationDetailSerializer(simulation).data)
+                return Response(data, status=201)
+            except Exception as e:
+                return Response({"error": f"Invalid input or computation error: {str(e)}"}, status=400)
+
+
+class SimulationBatchCreateView(APIView):
+    """
+    Creates many simulations in one request. Items are validated one by one; the
+    valid ones are computed across the batch process pool and stored with a single
+    `bulk_create`. The response has one entry per item, in order.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        serializer = SimulationBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        items = [SimulationCreateSerializer(data=item) for item in serializer.validated_data["simulations"]]
+        rejected = {}
+        with timing.phase("validate"):
+            valid = [index for index, item in enumerate(items) if item.is_valid()]
+            costs = {index: admission.trajectory_cost(items[index].validated_data) for index in valid}
+            for index in valid:
+                try:
+                    admission.check(costs[index], settings.SIMULATION_MAX_REQUEST_SECONDS)
+                except ValidationError as e:
+                    rejected[index] = e.detail
+            valid = [index for index in valid if index not in rejected]
+            total = sum((costs[index] for index in valid), admission.Cost(0, 0))
+            admission.check_batch(total, settings.SIMULATION_MAX_REQUEST_SECONDS)
+        payloads = [items[index].validated_data for index in valid]
+        timing.annotate("", sum(payload["steps"] for payload in payloads))
+
+        with admission.admitted(request.user, total):
+            run = partial(run_packed, timeout=settings.SIMULATION_REQUEST_TIMEOUT)
+            outcomes = dict(zip(valid, result_cache.cached_batch(payloads, partial(jobs.run_batch, run))))
+        simulations = {
+            index: Simulation(
+                user=request.user,
+                model_type=items[index].validated_data["model"],
+                input_params=items[index].validated_data,
+                **outcome[0],
+                is_stable=outcome[1],
+            )
+            for index, outcome in outcomes.items() if not isinstance(outcome, Exception)
+        }
+        with timing.phase("db"):
+            Simulation.objects.bulk_create(simulations.values())
+
+        entries = []
+        for index, item in enumerate(items):
+            if index in simulations:
+                entries.append({"status": 201, "simulation": SimulationHistorySerializer(simulations[index]).data})
+            elif index in outcomes:
+                entries.append({"status": 400, "errors": {"error": f"Invalid input or computation error: {outcomes[index]}"}})
+            elif index in rejected:
+                entries.append({"status": 400, "errors": rejected[index]})
+            else:
+                entries.append({"status": 400, "errors": item.errors})
+
+        if len(simulations) == len(items):
+            status = 201
+        elif simulations:
+            status = 207
+        else:
+            status = 400
+        return Response({"results": entries}, status=status)
+
+
+class StreamBody:
+    """
+    Body of a streamed response. Django calls `close` when it closes the
+    response, also when the client left before the first chunk and the
+    generator never started (its own `finally` would not run then).
+    """
+
+    def __init__(self, events, on_close):
+        self.events = events
+        self.on_close = on_close
+
+    def __iter__(self):
+        return self.events
+
+    def close(self):
+        self.events.close()
+        self.on_close()
+
+
+class AsyncStreamBody(StreamBody):
+    """`StreamBody` of an async generator, for ASGI."""
+    __iter__ = None
+
+    def __aiter__(self):
+        return self.events
+
+    def close(self):
+        # Django closes the response from a sync thread; the generator is left to the event loop.
+        self.on_close()
+
+
+class SimulationStreamView(AsyncAPIViewMixin, APIView):
+    """
+    Same payload as `SimulationCreateView`, but the trajectory is streamed as
+    NDJSON (default) or server-sent events in chunks while it is computed.
+    Points are stored block by block as they are produced (see `StreamRecorder`);
+    the `Simulation` is complete once the stream is exhausted and deleted if it is cut short.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, EventStreamRenderer]
+
+    async def post(self, request):
         serializer = SimulationCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        for output in OUTPUTS:
+            if serializer.validated_data.get(output):
+                return Response({output: "Only trajectories can be streamed"}, status=400)
+        charge = await sync_to_async(admission.admit)(
+            request.user, admission.trajectory_cost(serializer.validated_data), settings.SIMULATION_MAX_REQUEST_SECONDS
+        )
+
+        recorder = StreamRecorder(request.user, serializer.validated_data)
+        started = time.perf_counter()
+
+        def finish():
+            recorder.discard()
+            admission.release(charge, time.perf_counter() - started)
+
+        # Each server drains a body of the other kind completely before sending the first chunk of it.
+        if isinstance(request._request, ASGIRequest):
+            body = AsyncStreamBody(self.aevents(recorder, request.accepted_renderer), finish)
+        else:
+            body = StreamBody(self.events(recorder, request.accepted_renderer), finish)
+        response = StreamingHttpResponse(body, content_type=request.accepted_renderer.media_type)
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def events(self, recorder, renderer):
+        """The stream under WSGI: the server's thread computes the run as the client reads it."""
+        check_deadline = admission.deadline(settings.SIMULATION_REQUEST_TIMEOUT)
+        try:
+            chunks = stream_simulation(recorder.validated_data)
+            while True:
+                chunk, stable = next_chunk(chunks)
+                if chunk is None:
+                    break
+
+                check_deadline()
+                if recorder.add(chunk):
+                    recorder.flush()
+                yield renderer.encode("points", chunk)
+
+            simulation = recorder.finish(stable)
+            yield renderer.encode("done", {"id": simulation.pk, "is_stable": stable})
+        except Exception as e:
+            yield renderer.encode("error", {"error": f"Invalid input or computation error: {str(e)}"})
+
+    async def aevents(self, recorder, renderer):
+        """The stream under ASGI: chunks are computed in the compute pool, off the event loop."""
+        check_deadline = admission.deadline(settings.SIMULATION_REQUEST_TIMEOUT)
+        try:
+            chunks = stream_simulation(recorder.validated_data)
+            while True:
+                chunk, stable = await jobs.offload(next_chunk, chunks)
+                if chunk is None:
+                    break
+
+                check_deadline()
+                if recorder.add(chunk):
+                    await sync_to_async(recorder.flush)()
+                yield renderer.encode("points", chunk)
+
+            simulation = await sync_to_async(recorder.finish)(stable)
+            yield renderer.encode("done", {"id": simulation.pk, "is_stable": stable})
+        except Exception as e:
+            yield renderer.encode("error", {"error": f"Invalid input or computation error: {str(e)}"})
+
+
+class SimulationEnsembleView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = SimulationEnsembleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        validated_data = serializer.validated_data
+        model = validated_data.get("model")
+        cost = admission.ensemble_cost(validated_data)
+
+        with admission.admitted(request.user, cost, settings.SIMULATION_MAX_REQUEST_SECONDS):
+            try:
+                results_json, stable = run_ensemble(
+                    validated_data, progress=admission.deadline(settings.SIMULATION_REQUEST_TIMEOUT)
+                )
+
+                simulation = Simulation.objects.create(
+                    user=request.user,
+                    model_type=model,
+                    input_params=validated_data,
+                    **storage.pack_results(results_json),
+                    is_stable=stable,
+                )
+
+                serializer = SimulationDetailSerializer(simulation)
+                return Response(serializer.data, status=201)
+            except Exception as e:
+                return Response({"error": f"Invalid input or computation error: {str(e)}"}, status=400)
+
+
+class SimulationBifurcationView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = SimulationBifurcationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
         validated_data = serializer.validated_data
         model = validated_data.get("model")
-        steps = validated_data.get("steps")
-        color = validated_data.get("color")
-        params = validated_data.get("params", {})
+        cost = admission.bifurcation_cost(validated_data)
+
+        with admission.admitted(request.user, cost, settings.SIMULATION_MAX_REQUEST_SECONDS):
+            try:
+                results_json, stable = run_bifurcation(
+                    validated_data, progress=admission.deadline(settings.SIMULATION_REQUEST_TIMEOUT)
+                )
+
+                simulation = Simulation.objects.create(
+                    user=request.user,
+                    model_type=model,
+                    input_params=validated_data,
+                    **storage.pack_results(results_json),
+                    is_stable=stable,
+                )
+
+                serializer = SimulationDetailSerializer(simulation)
+                return Response(serializer.data, status=201)
+            except Exception as e:
+                return Response({"error": f"Invalid input or computation error: {str(e)}"}, status=400)
+
+
+class SimulationJobCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = SimulationCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        cost = admission.trajectory_cost(serializer.validated_data)
+        admission.check(cost, settings.SIMULATION_MAX_JOB_SECONDS)
+        with transaction.atomic():
+            job = SimulationJob.objects.create(user=request.user, input_params=serializer.validated_data)
+            admission.admit(request.user, cost, job=job)
+        jobs.enqueue(job)
+        job.refresh_from_db()
+
+        return Response(
+            SimulationJobSerializer(job).data,
+            status=202,
+            headers={"Location": reverse("simulation-job-detail", args=[job.pk])},
+        )
+
+
+class SimulationJobDetailView(RetrieveAPIView):
+    serializer_class = SimulationJobSerializer
+    permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        return SimulationJob.objects.filter(user=self.request.user)
+
+
+class SimulationHistoryPagination(CursorPagination):
+    ordering = "-created_at"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class SimulationHistoryView(AsyncAPIViewMixin, ListAPIView):
+    """Cursor-paginated, optionally filtered by `?model_type=` and `?is_stable=`."""
+    serializer_class = SimulationHistorySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = SimulationHistoryPagination
+
+    def get_filters(self):
+        query = SimulationHistoryQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        return {name: value for name, value in query.validated_data.items() if value is not None}
+
+    def get_queryset(self):
+        return (
+            Simulation.objects
+            .filter(user=self.request.user, **self.filters)
+            .only(*SimulationHistorySerializer.Meta.fields)
+            .order_by("-created_at")
+        )
+
+    async def get(self, request, *args, **kwargs):
+        # Validated first: only known model types become metric labels.
+        self.filters = self.get_filters()
+        timing.annotate(self.filters.get("model_type", ""))
+        with timing.phase("db"):
+            page = await sync_to_async(self.paginate_queryset)(self.get_queryset())
+        with timing.phase("serialize"):
+            data = self.get_serializer(page, many=True).data
+        return self.get_paginated_response(data)
+
+
+class SimulationDetailView(AsyncAPIViewMixin, RetrieveAPIView):
+    """
+    Supports `?start=&end=` point ranges and `?max_points=` downsampling of the trajectory
+    (density maps are always returned whole),
+    `?precision=` decimal places in JSON and the binary columnar format (`Accept:
+    application/x-trajectory` or `?format=binary`, with `?dtype=float32|float64`).
+    Responses carry an ETag and Last-Modified; conditional GETs get a 304.
+    The ETag is strong, except on gzipped responses: their bytes differ between requests
+    (`CompressionMiddleware` pads them against BREACH), so it arrives weak (`W/"..."`).
+    If-None-Match compares weakly, so revalidating with either form still gets a 304.
+    """
+    serializer_class = SimulationDetailSerializer
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, TrajectoryBinaryRenderer]
+
+    def get_queryset(self):
+        queryset = Simulation.objects.filter(user=self.request.user)
+        if "max_points" in self.request.query_params:
+            # Loaded on demand only if no precomputed overview level fits.
+            queryset = queryset.defer("trajectory")
+        return queryset
+
+    def get_serializer_context(self):
+        query = SimulationDetailQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        window = dict(query.validated_data)
+        precision = window.pop("precision", None)
+        window.pop("dtype", None)
+        return {**super().get_serializer_context(), "window": window, "precision": precision}
+
+    async def get(self, request, *args, **kwargs):
+        with timing.phase("db"):
+            version = await self.aget_version()
+        etag, last_modified = self.validators(version)
+        # Answered from the version alone: the results are never loaded for a 304.
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            with timing.phase("db"):
+                instance = await self.aget_object()
+            timing.annotate(instance.model_type, instance.results.get("length"))
+            with timing.phase("serialize"):
+                # May load the deferred trajectory or the segments.
+                data = await sync_to_async(lambda: self.get_serializer(instance).data)()
+            response = Response(data)
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        if version["extendable"]:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, private=True, max_age=settings.SIMULATION_DETAIL_MAX_AGE)
+        return response
+
+    async def aget_version(self):
+        """
+        What the response depends on besides the query: a simulation only changes
+        when it is extended, and every extension adds a later segment.
+        """
+        last_segment = SimulationSegment.objects.filter(simulation=OuterRef("pk")).order_by("-start")
         try:
-            result_data = {}
-            results_json = {}
-
-            if model == Simulation.ModelTypes.LORENZ:
-                sigma = float(params.get("sigma", 10))
-                rho = float(params.get("rho", 28))
-                beta = float(params.get("beta", 8 / 3))
-                x0, y0, z0 = params.get("initial", [1, 1, 1])
-                dt = float(params.get("dt", 0.01))
-
-                result_data = physics.lorenz_attractor(x0, y0, z0, sigma=sigma, rho=rho, beta=beta, dt=dt, steps=steps)
-                points = result_data.get("points", [])
-                if points:
-                    x, y, z = map(list, zip(*points))
-                    results_json = {"x": x, "y": y, "z": z, "color": color}
-                else:
-                    results_json = {"x": [], "y": [], "z": [], "color": color}
-            elif model == Simulation.ModelTypes.HENON:
-                a = float(params.get("a", 1.4))
-                b = float(params.get("b", 0.3))
-                x0, y0 = params.get("initial", [0.1, 0.3])
-
-                result_data = physics.henon_map(x0, y0, a=a, b=b, steps=steps)
-                points = result_data.get("points", [])
-                if points:
-                    x, y = map(list, zip(*points))
-                    results_json = {"x": x, "y": y, "color": color}
-                else:
-                    results_json = {"x": [], "y": [], "color": color}
-            elif model == Simulation.ModelTypes.THOMAS:
-                b = float(params.get("b", 0.18))
-                x0, y0, z0 = params.get("initial", [1, 1, 1])
-                dt = float(params.get("dt", 0.01))
-                
-                result_data = physics.thomas_attractor(x0, y0, z0, b=b, dt=dt, steps=steps)
-                points = result_data.get("points", [])
-                if points:
-                    x, y, z = map(list, zip(*points))
-                    results_json = {"x": x, "y": y, "z": z, "color": color}
-                else:
-                    results_json = {"x": [], "y": [], "z": [], "color": color}
-
-            simulation = Simulation.objects.create(
-                user=request.user,
-                model_type=model,
-                input_params=validated_data,
-                results=results_json,
-                is_stable=result_data["stable"],
+            return await (
+                Simulation.objects
+                .filter(user=self.request.user, pk=self.kwargs["pk"])
+                .annotate(
+                    extended_to=Subquery(last_segment.values("start")[:1]),
+                    extended_at=Subquery(last_segment.values("created_at")[:1]),
+                    extendable=ExpressionWrapper(
+                        Q(is_stable=True, results__has_key="final_state"), output_field=BooleanField()
+                    ),
+                )
+                .values("pk", "created_at", "extended_to", "extended_at", "extendable")
+                .aget()
+            )
+        except Simulation.DoesNotExist:
+            raise Http404
+
+    def validators(self, version):
+        """
+        ETag of this representation (version, query and media type) and the Last-Modified timestamp.
+        Strong for the uncompressed body; gzip compression weakens it.
+        """
+        representation = [
+            version["pk"], version["created_at"].isoformat(), version["extended_to"],
+            self.request.accepted_renderer.media_type, sorted(self.request.query_params.lists()),
+        ]
+        digest = hashlib.sha256(json.dumps(representation).encode()).hexdigest()
+        modified = version["extended_at"] or version["created_at"]
+        return f'"{digest[:32]}"', int(modified.timestamp())
+
+    async def aget_object(self):
+        try:
+            instance = await self.get_queryset().aget(pk=self.kwargs["pk"])
+        except Simulation.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+
+class SimulationExtendView(APIView):
+    """
+    Continues a simulation from its stored final state for `steps` more steps.
+    The new points are stored as a `SimulationSegment`; the response holds only them.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        serializer = SimulationExtendSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        steps = serializer.validated_data["steps"]
+
+        simulation = get_object_or_404(Simulation.objects.defer("trajectory", "overview"), pk=pk, user=request.user)
+        if not simulation.is_stable or not simulation.results.get("final_state"):
+            return Response({"error": "Only stable single-trajectory simulations can be extended"}, status=400)
+
+        cost = admission.trajectory_cost(simulation.input_params, steps)
+        charge = admission.admit(request.user, cost, settings.SIMULATION_MAX_REQUEST_SECONDS)
+        started = time.perf_counter()
+        try:
+            columns, stable, period = extend_simulation(
+                simulation, steps, progress=admission.deadline(settings.SIMULATION_REQUEST_TIMEOUT)
             )
+            offset = simulation.results["length"]
+            appended = len(columns["x"])
 
-            serializer = SimulationDetailSerializer(simulation)
-            return Response(serializer.data, status=201)
+            results = {
+                **simulation.results,
+                "length": offset + appended,
+                "bounds": storage.merge_bounds(simulation.results["bounds"], columns),
+                "final_state": final_state(columns) or simulation.results["final_state"],
+            }
+            results.pop("attractor", None)
+            results.pop("period", None)
+            if period:
+                results["attractor"] = Simulation.Attractors.FIXED_POINT if period == 1 else Simulation.Attractors.CYCLE
+                results["period"] = period
+
+            with transaction.atomic():
+                if appended:
+                    SimulationSegment.objects.create(
+                        simulation=simulation, start=offset, length=appended, **storage.pack_segment(columns)
+                    )
+                    results["segments"] = results.get("segments", 0) + 1
+
+                simulation.results = results
+                simulation.input_params = {**simulation.input_params, "steps": simulation.input_params["steps"] + steps}
+                simulation.is_stable = stable
+                for name, value in storage.settled(results).items():
+                    setattr(simulation, name, value)
+                simulation.save(update_fields=["results", "input_params", "is_stable", "attractor", "period"])
+        except IntegrityError:
+            return Response({"error": "The simulation was extended concurrently, retry the request"}, status=409)
         except Exception as e:
             return Response({"error": f"Invalid input or computation error: {str(e)}"}, status=400)
+        finally:
+            admission.release(charge, time.perf_counter() - started)
 
+        serializer = SimulationDetailSerializer(simulation, context={"window": {"start": offset}})
+        return Response(serializer.data, status=201)
 
-class SimulationHistoryView(ListAPIView):
-    serializer_class = SimulationHistorySerializer
+
+class ChaosMapListView(ListAPIView):
+    """Chaos maps computed by `manage.py chaos_map`, with their progress."""
+    serializer_class = ChaosMapSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Simulation.objects.filter(user=self.request.user).order_by("-created_at")
+        return ChaosMap.objects.annotate(chunks_done=Count("chunks")).order_by("-created_at")
 
 
-class SimulationDetailView(RetrieveAPIView):
-    serializer_class = SimulationDetailSerializer
+class ChaosMapDetailView(RetrieveAPIView):
+    """A chaos map with its grid of exponents so far."""
+    serializer_class = ChaosMapDetailSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Simulation.objects.filter(user=self.request.user)
\ No newline at end of file
+        return ChaosMap.objects.annotate(chunks_done=Count("chunks"))
+
+
+class ResultCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(result_cache.stats())
+
+
+class MetricsView(APIView):
+    """Request phase histograms of this server process in the Prometheus text format."""
+    permission_classes = [IsAdminUser]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request):
+        return Response(timing.render_metrics())
\ No newline at end of file
@@ -1,5 +1,5 @@
 import axios, { type AxiosResponse } from 'axios';
-import type { SimulationInputParams, SimulationDetail, SimulationHistoryItem } from './types/simulation';
+import type { SimulationInputParams, SimulationDetail, SimulationHistoryPage } from './types/simulation';
 
 const API_BASE_URL = '/api';
 
@@ -49,12 +49,61 @@ export const createSimulation = (data: SimulationInputParams): Promise<AxiosResp
     return apiClient.post('/simulations/create/', data);
 };
 
-export const fetchHistory = (): Promise<AxiosResponse<SimulationHistoryItem[]>> => {
-    return apiClient.get('/simulations/history/');
+// Pass the `next` link of the previous page to continue from its cursor
+export const fetchHistory = (next?: string | null): Promise<AxiosResponse<SimulationHistoryPage>> => {
+    const cursor = next ? new URL(next, window.location.origin).searchParams.get('cursor') : null;
+    return apiClient.get('/simulations/history/', { params: cursor ? { cursor } : undefined });
 };
 
-export const fetchSimulationDetail = (id: number): Promise<AxiosResponse<SimulationDetail>> => {
-    return apiClient.get(`/simulations/detail/${id}/`);
+const TYPED_ARRAYS = {
+    '<f4': Float32Array,
+    '<f8': Float64Array,
+    '<u4': Uint32Array,
+} as const;
+
+interface TrajectoryColumn {
+    name: 'x' | 'y' | 'z' | 'index' | 'density';
+    dtype: keyof typeof TYPED_ARRAYS;
+    offset: number;
+    length: number;
+}
+
+// Decodes the binary columnar detail format: "TRAJ", uint32 header length,
+// JSON header, then 8-byte aligned little-endian columns described by `header.columns`
+export const decodeTrajectory = (buffer: ArrayBuffer): SimulationDetail => {
+    const view = new DataView(buffer);
+    const magic = new TextDecoder().decode(new Uint8Array(buffer, 0, 4));
+    if (magic !== 'TRAJ') {
+        throw new Error('Not a trajectory response');
+    }
+    const headerLength = view.getUint32(4, true);
+    const { columns, ...header } = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+    const start = Math.ceil((8 + headerLength) / 8) * 8;
+
+    const results = { ...header.results };
+    for (const column of columns as TrajectoryColumn[]) {
+        const TypedArray = TYPED_ARRAYS[column.dtype];
+        const values = Array.from(new TypedArray(buffer, start + column.offset, column.length));
+        // Density maps come as one row-major column of bins × bins counts
+        results[column.name] = column.name === 'density'
+            ? Array.from({ length: results.bins }, (_, row) => values.slice(row * results.bins, (row + 1) * results.bins))
+            : values;
+    }
+    return { ...header, results };
+};
+
+export const fetchSimulationDetail = async (id: number): Promise<AxiosResponse<SimulationDetail>> => {
+    const response = await apiClient.get<ArrayBuffer>(`/simulations/detail/${id}/`, {
+        params: { dtype: 'float32' },
+        responseType: 'arraybuffer',
+        headers: { Accept: 'application/x-trajectory' },
+    });
+    return { ...response, data: decodeTrajectory(response.data) };
+};
+
+// Responds with only the appended points; their positions are in `results.index`
+export const extendSimulation = (id: number, steps: number): Promise<AxiosResponse<SimulationDetail>> => {
+    return apiClient.post(`/simulations/detail/${id}/extend/`, { steps });
 };
 
 export default apiClient;
\ No newline at end of file
@@ -10,6 +10,7 @@ interface SimulationHistoryProps {
 
 const SimulationHistory: React.FC<SimulationHistoryProps> = ({ onSelectSimulationId, refreshTrigger }) => {
     const [history, setHistory] = useState<SimulationHistoryItem[]>([]);
+    const [nextPage, setNextPage] = useState<string | null>(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
 
@@ -18,7 +19,8 @@ const SimulationHistory: React.FC<SimulationHistoryProps> = ({ onSelectSimulatio
         setError(null);
         try {
             const response = await fetchHistory();
-            setHistory(response.data);
+            setHistory(response.data.results);
+            setNextPage(response.data.next);
         } catch (err: unknown) {
             console.error('Failed to fetch history:', err);
             setError('Failed to load simulation history.');
@@ -27,6 +29,17 @@ const SimulationHistory: React.FC<SimulationHistoryProps> = ({ onSelectSimulatio
         }
     }, []);
 
+    const loadMore = async () => {
+        try {
+            const response = await fetchHistory(nextPage);
+            setHistory(prev => [...prev, ...response.data.results]);
+            setNextPage(response.data.next);
+        } catch (err: unknown) {
+            console.error('Failed to fetch history:', err);
+            setError('Failed to load simulation history.');
+        }
+    };
+
     useEffect(() => {
         loadHistory();
     }, [loadHistory, refreshTrigger]);
@@ -61,6 +74,11 @@ const SimulationHistory: React.FC<SimulationHistoryProps> = ({ onSelectSimulatio
                     </li>
                 ))}
             </ul>
+            {nextPage && (
+                <button type="button" className="load-more" onClick={loadMore}>
+                    Load more
+                </button>
+            )}
         </div>
     );
 };
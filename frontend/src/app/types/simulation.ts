@@ -1,4 +1,8 @@
-export type ModelType = 'lorenz' | 'henon' | 'thomas';
+export type ModelType = 'lorenz' | 'henon' | 'thomas' | 'rossler' | 'chen' | 'duffing';
+
+export type IntegrationMethod = 'euler' | 'rk4' | 'rk45';
+
+export type AttractorType = 'fixed_point' | 'cycle';
 
 export interface LorenzParams {
     sigma: number;
@@ -6,27 +10,60 @@ export interface LorenzParams {
     beta: number;
     initial: [number, number, number];
     dt?: number;
+    method?: IntegrationMethod;
+    rtol?: number;
+    atol?: number;
+    settle_tol?: number;
 }
 
 export interface HenonParams {
     a: number;
     b: number;
     initial: [number, number];
+    settle_tol?: number;
 }
 
 export interface ThomasParams {
     b: number;
     initial: [number, number, number];
     dt?: number;
+    method?: IntegrationMethod;
+    rtol?: number;
+    atol?: number;
+    settle_tol?: number;
 }
 
 export type SpecificParams = LorenzParams | HenonParams | ThomasParams;
 
+// Density-map output: the run is accumulated into a bins × bins histogram instead of being stored
+export interface DensityOptions {
+    bins?: number;
+    axes?: ['x' | 'y' | 'z', 'x' | 'y' | 'z'];
+    bounds?: [[number, number], [number, number]];
+}
+
+// Twin-trajectory output: separation from a perturbed copy of the run and the Lyapunov exponent estimate
+export interface LyapunovOptions {
+    perturbation?: number;
+    interval?: number;
+}
+
+// Poincaré-section output: crossings of the plane axis = value, or the return map of successive maxima of axis
+export interface SectionOptions {
+    kind?: 'plane' | 'maxima';
+    axis?: 'x' | 'y' | 'z';
+    value?: number;
+    direction?: 'up' | 'down' | 'both';
+}
+
 export interface SimulationInputParams<T extends SpecificParams = SpecificParams> {
     model: ModelType;
     steps?: number;
     color?: string;
     params: T;
+    density?: DensityOptions;
+    lyapunov?: LyapunovOptions;
+    section?: SectionOptions;
 }
 
 export interface SimulationResult {
@@ -34,6 +71,19 @@ export interface SimulationResult {
     y: number[];
     z?: number[]; 
     color: string;
+    index?: number[];
+    length?: number;
+    bounds?: Record<'x' | 'y' | 'z', [number, number] | null>;
+    attractor?: AttractorType;
+    period?: number;
+    final_state?: number[] | null;
+    segments?: number;
+    density?: number[][];
+    bins?: number;
+    axes?: ['x' | 'y' | 'z', 'x' | 'y' | 'z'];
+    outside?: number;
+    lyapunov?: number | null;
+    section?: SectionOptions;
 }
 
 export interface SimulationHistoryItem {
@@ -43,7 +93,15 @@ export interface SimulationHistoryItem {
     is_stable: boolean;
 }
 
+export interface SimulationHistoryPage {
+    next: string | null;
+    previous: string | null;
+    results: SimulationHistoryItem[];
+}
+
 export interface SimulationDetail extends SimulationHistoryItem {
     input_params: SimulationInputParams;
     results: SimulationResult;
+    attractor: AttractorType | '';
+    period: number | null;
 }
\ No newline at end of file